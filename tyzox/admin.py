@@ -1,7 +1,7 @@
 # tyzox/admin.py
 
 from django.contrib import admin
-from .models import Category, Product, Cart, CartItem, Order, OrderItem
+from .models import Category, Product, CoPurchase, ProductNeighbour, Cart, CartItem, Order, OrderItem
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
@@ -15,12 +15,28 @@ class ProductAdmin(admin.ModelAdmin):
     search_fields = ('name', 'description')
     prepopulated_fields = {'slug': ('name',)}
     filter_horizontal = ('related_products',)
+    # Se ajusta desde el dashboard (tyzox.inventory.adjust_stock)
+    readonly_fields = ('stock', 'stock_shards')
 
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
     list_display = ('id', 'user', 'created_at', 'total_price')
     list_filter = ('created_at', 'user')
 
+@admin.register(CoPurchase)
+class CoPurchaseAdmin(admin.ModelAdmin):
+    list_display = ('product', 'related', 'weight')
+    list_select_related = ('product', 'related')
+    raw_id_fields = ('product', 'related')
+    ordering = ('-weight',)
+
+@admin.register(ProductNeighbour)
+class ProductNeighbourAdmin(admin.ModelAdmin):
+    list_display = ('product', 'rank', 'neighbour', 'score')
+    list_select_related = ('product', 'neighbour')
+    raw_id_fields = ('product', 'neighbour')
+    ordering = ('product', 'rank')
+
 admin.site.register(Cart)
 admin.site.register(CartItem)
 admin.site.register(OrderItem)
\ No newline at end of file
@@ -1,6 +1,23 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_migrate
+
+
+def ensure_search_index(sender, using, **kwargs):
+    from django.db import connections
+    from .search import install_search_index
+    install_search_index(connections[using])
 
 
 class TyzoxConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'tyzox'
+
+    def ready(self):
+        # Vuelve a crear los triggers FTS de SQLite si una migración reconstruyó la tabla
+        post_migrate.connect(ensure_search_index, sender=self)
+        # Cuenta las consultas de cada petición para PerformanceMiddleware
+        from .middleware import install_query_recorder
+        connection_created.connect(install_query_recorder)
+        # Registran sus tareas en segundo plano (tyzox.jobs)
+        from . import recommendations, reports
@@ -0,0 +1,26 @@
+# tyzox/backends.py
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+UserModel = get_user_model()
+
+
+class EmailBackend(ModelBackend):
+    """
+    Autentica por email con una sola consulta sobre auth_user.email
+    (indexado en la migración 0011). El ModelBackend por defecto sigue
+    activo para el admin, que inicia sesión por nombre de usuario.
+    """
+    def authenticate(self, request, email=None, password=None, **kwargs):
+        if not email or password is None:
+            return None
+        user = UserModel._default_manager.filter(email=email).order_by('id').first()
+        if user is None:
+            # Calculamos un hash igualmente para que un email inexistente no
+            # responda más rápido que una contraseña incorrecta.
+            UserModel().set_password(password)
+            return None
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
@@ -0,0 +1,50 @@
+# tyzox/bulk.py
+
+from itertools import islice
+
+from django.db import connections, router
+
+
+def bulk_increment(model, unique_fields, increment_fields, rows, batch_size=None, using=None):
+    """
+    Inserta filas o, si ya existen, suma sus contadores en una sola sentencia:
+
+        INSERT ... ON CONFLICT (unique_fields)
+        DO UPDATE SET campo = tabla.campo + EXCLUDED.campo
+
+    `rows` son tuplas con los valores de `unique_fields` seguidos de los de
+    `increment_fields` (para claves foráneas se pasa el id). Debe existir una
+    restricción única sobre `unique_fields`. Funciona en PostgreSQL y SQLite.
+    Por defecto cada sentencia lleva tantas filas como permita el límite de
+    parámetros del motor (65535 en PostgreSQL).
+    """
+    if not rows:
+        return
+    using = using or router.db_for_write(model)
+    connection = connections[using]
+    qn = connection.ops.quote_name
+    opts = model._meta
+    table = qn(opts.db_table)
+    key_columns = [qn(opts.get_field(name).column) for name in unique_fields]
+    counter_columns = [qn(opts.get_field(name).column) for name in increment_fields]
+    columns = ', '.join(key_columns + counter_columns)
+    placeholder = '(' + ', '.join(['%s'] * (len(key_columns) + len(counter_columns))) + ')'
+    if batch_size is None:
+        max_params = connection.features.max_query_params or 65535
+        batch_size = max(1, max_params // (len(key_columns) + len(counter_columns)))
+    updates = ', '.join(f'{col} = {table}.{col} + EXCLUDED.{col}' for col in counter_columns)
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            sql = (
+                f'INSERT INTO {table} ({columns}) VALUES {", ".join([placeholder] * len(batch))} '
+                f'ON CONFLICT ({", ".join(key_columns)}) DO UPDATE SET {updates}'
+            )
+            cursor.execute(sql, [value for row in batch for value in row])
+
+
+def batched(iterable, size):
+    # Parte un iterable (p. ej. un .iterator() de QuerySet) en listas de `size`
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
@@ -0,0 +1,119 @@
+# tyzox/cache.py
+
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .routers import primary_reads
+
+# Contador de versión del catálogo. Todas las claves de catálogo lo incluyen,
+# así que al incrementarlo las entradas anteriores quedan huérfanas y
+# expiran solas: no hace falta borrar claves una a una.
+CATALOG_VERSION_KEY = 'tyzox:catalog:version'
+# Prefijo de las versiones de "productos relacionados" (global y por producto)
+RELATED_VERSION_KEY = 'tyzox:related'
+
+_stats_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0}
+
+
+def _record(outcome):
+    with _stats_lock:
+        _stats[outcome] += 1
+
+
+def catalog_version():
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        # Si la clave se perdió (reinicio o desalojo) partimos de un valor
+        # basado en el reloj para no reutilizar una versión ya usada.
+        cache.add(CATALOG_VERSION_KEY, int(time.time() * 1000), timeout=None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    try:
+        return cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        # La clave no existía: inicializarla ya equivale a una versión nueva
+        return catalog_version()
+
+
+def _now_ms():
+    return int(time.time() * 1000)
+
+
+def related_version(product_id):
+    """
+    Versión de los relacionados de un producto: la marca de tiempo (ms) más
+    reciente entre la última reconstrucción de vecinos y la última compra
+    que lo incluyó. No depende del catálogo, así que una compra no invalida
+    las demás fichas.
+    """
+    keys = [f'{RELATED_VERSION_KEY}:all', f'{RELATED_VERSION_KEY}:{product_id}']
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # Perdida (desalojo o reinicio): un valor nuevo, nunca uno ya servido
+            cache.add(key, _now_ms(), timeout=None)
+            versions[key] = cache.get(key)
+    return max(versions.values())
+
+
+def bump_related_version(product_ids=None):
+    # Sin ids: cambian los relacionados de todos los productos
+    if product_ids is None:
+        cache.set(f'{RELATED_VERSION_KEY}:all', _now_ms(), timeout=None)
+    else:
+        now = _now_ms()
+        cache.set_many({f'{RELATED_VERSION_KEY}:{pk}': now for pk in product_ids}, timeout=None)
+
+
+def catalog_key(*parts):
+    raw = ':'.join(str(part) for part in parts)
+    digest = hashlib.md5(raw.encode('utf-8')).hexdigest()
+    return f'tyzox:catalog:{catalog_version()}:{digest}'
+
+
+def cached_catalog(parts, builder, timeout=None):
+    """
+    Lectura a través de caché: devuelve el valor guardado para `parts` en la
+    versión actual del catálogo o lo construye con `builder()` y lo guarda.
+    Si `builder` devuelve None (p. ej. producto inexistente) no se cachea.
+    """
+    key = catalog_key(*parts)
+    value = cache.get(key)
+    if value is not None:
+        _record('hits')
+        return value
+    _record('misses')
+    # La entrada se sirve a todos bajo la versión nueva, también a quien
+    # acaba de escribir: se construye desde el primario y no desde una
+    # réplica que quizá aún no tiene el cambio que subió la versión
+    with primary_reads():
+        value = builder()
+    if value is not None:
+        cache.set(key, value, timeout or settings.CATALOG_CACHE_TIMEOUT)
+    return value
+
+
+def cache_stats():
+    # Los contadores son por proceso: cada worker informa de sus propios aciertos
+    with _stats_lock:
+        hits, misses = _stats['hits'], _stats['misses']
+    total = hits + misses
+    return {
+        'catalog_version': catalog_version(),
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / total, 4) if total else None,
+    }
+
+
+def reset_cache_stats():
+    with _stats_lock:
+        _stats['hits'] = _stats['misses'] = 0
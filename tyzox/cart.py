@@ -0,0 +1,283 @@
+# tyzox/cart.py
+
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, OuterRef, Subquery, Sum, Value, Window
+from django.db.models.functions import Coalesce
+
+from .bulk import bulk_increment
+from .images import image_urls
+from .inventory import release, reserve
+from .models import Cart, CartItem, Product
+
+CENTS = Decimal('0.01')
+# Carrito de los visitantes anónimos: {id de producto (str): cantidad} en la sesión
+SESSION_CART_KEY = 'cart'
+
+_subtotal = ExpressionWrapper(F('quantity') * F('product__price'), output_field=DecimalField(max_digits=12, decimal_places=2))
+
+
+def _money(value):
+    return str(Decimal(value or 0).quantize(CENTS))
+
+
+def _snapshot_queryset(user):
+    """
+    Contenido del carrito con una sola consulta: une cada línea con su
+    producto y calcula subtotales y totales en la base de datos (los totales
+    como funciones de ventana, repetidos en cada fila).
+    """
+    return (
+        CartItem.objects.filter(cart__user=user)
+        .annotate(
+            subtotal=_subtotal,
+            cart_total=Window(Sum(_subtotal)),
+            cart_count=Window(Sum('quantity')),
+        )
+        .values(
+            'product_id', 'product__name', 'product__price', 'product__image_url',
+            'product__image', 'product__image_variants',
+            'quantity', 'subtotal', 'cart_total', 'cart_count',
+        )
+        .order_by('id')
+    )
+
+
+def _format_snapshot(rows):
+    return {
+        'items': [
+            {
+                'product_id': row['product_id'],
+                'name': row['product__name'],
+                'quantity': row['quantity'],
+                'price': _money(row['product__price']),
+                'subtotal': _money(row['subtotal']),
+                # La miniatura más pequeña: el carrito las pinta en tamaño reducido
+                'image_url': image_urls(
+                    row['product__image'], row['product__image_variants'], row['product__image_url'],
+                )['image_url'],
+            }
+            for row in rows
+        ],
+        'total': _money(rows[0]['cart_total'] if rows else 0),
+        'item_count': rows[0]['cart_count'] if rows else 0,
+    }
+
+
+def cart_snapshot(user):
+    return _format_snapshot(list(_snapshot_queryset(user)))
+
+
+async def acart_snapshot(user):
+    return _format_snapshot([row async for row in _snapshot_queryset(user)])
+
+
+def cart_item_count(user):
+    # Lee el contador desnormalizado: una consulta por la clave única user_id
+    return Cart.objects.filter(user=user).values_list('item_count', flat=True).first() or 0
+
+
+async def acart_item_count(user):
+    return await Cart.objects.filter(user=user).values_list('item_count', flat=True).afirst() or 0
+
+
+@transaction.atomic
+def add_product(user, product, quantity=1):
+    """
+    Suma `quantity` unidades del producto al carrito del usuario, mantiene
+    el contador del carrito y reserva las unidades, todo en la misma
+    transacción. Lanza inventory.StockError si no quedan unidades.
+    """
+    cart, _ = Cart.objects.get_or_create(user=user)
+    cart_item, created = CartItem.objects.get_or_create(cart=cart, product=product, defaults={'quantity': quantity})
+    if not created:
+        CartItem.objects.filter(pk=cart_item.pk).update(quantity=F('quantity') + quantity)
+    Cart.objects.filter(pk=cart.pk).update(item_count=F('item_count') + quantity)
+    # La reserva al final: la fila del producto queda bloqueada hasta el COMMIT
+    reserve(cart, {product.pk: quantity}, {product.pk: product.stock_shards})
+    return cart
+
+
+class CartError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_operations(operations):
+    """
+    Valida las operaciones de /api/cart/update/: una lista de
+    {"product_id": id, "delta": n} o {"product_id": id, "set_quantity": n}.
+    Devuelve tuplas (id, 'delta' | 'set', n) en el mismo orden.
+    """
+    if not isinstance(operations, list) or not operations:
+        raise CartError('Se esperaba una lista de operaciones.')
+    if len(operations) > settings.CART_MAX_OPERATIONS:
+        raise CartError(f'Como máximo {settings.CART_MAX_OPERATIONS} operaciones por petición.')
+    parsed = []
+    for operation in operations:
+        if not isinstance(operation, dict) or ('delta' in operation) == ('set_quantity' in operation):
+            raise CartError('Cada operación lleva product_id y delta o set_quantity.')
+        kind = 'delta' if 'delta' in operation else 'set'
+        product_id, value = operation.get('product_id'), operation.get('delta', operation.get('set_quantity'))
+        if type(product_id) is not int or type(value) is not int or (kind == 'set' and value < 0):
+            raise CartError('product_id y la cantidad deben ser enteros (set_quantity no negativo).')
+        parsed.append((product_id, kind, value))
+    return parsed
+
+
+def _final_quantities(current, operations):
+    # Aplica las operaciones en orden sobre las cantidades actuales (nunca negativas)
+    quantities = dict(current)
+    for product_id, kind, value in operations:
+        base = quantities.get(product_id, 0) if kind == 'delta' else 0
+        quantities[product_id] = max(0, base + value)
+    return quantities
+
+
+def _check_products(products, current, final):
+    # Solo se puede aumentar la cantidad de productos que existen y están a la venta
+    for product_id, quantity in final.items():
+        if quantity <= current.get(product_id, 0):
+            continue
+        product = products.get(product_id)
+        if product is None:
+            raise CartError(f'El producto {product_id} no existe.', status=404)
+        if not product['is_available']:
+            raise CartError(f"'{product['name']}' ya no está disponible.", status=409)
+
+
+@transaction.atomic
+def apply_operations(user, operations):
+    """
+    Aplica al carrito del usuario las operaciones de parse_operations en una
+    transacción: un upsert para las líneas que quedan, un DELETE para las que
+    llegan a 0, un UPDATE del contador, las reservas que faltan y la
+    devolución al stock de lo reservado de más.
+    """
+    cart, _ = Cart.objects.get_or_create(user=user)
+    product_ids = {product_id for product_id, _, _ in operations}
+    current = dict(
+        CartItem.objects.select_for_update().filter(cart=cart, product_id__in=product_ids)
+        .values_list('product_id', 'quantity')
+    )
+    final = _final_quantities(current, operations)
+    products = {
+        row['id']: row
+        for row in Product.objects.filter(id__in=product_ids).values('id', 'name', 'is_available', 'stock_shards')
+    }
+    _check_products(products, current, final)
+
+    kept = {pk: quantity for pk, quantity in final.items() if quantity and pk in products}
+    removed = [pk for pk, quantity in final.items() if not quantity and pk in current]
+    if kept:
+        CartItem.objects.bulk_create(
+            [CartItem(cart=cart, product_id=pk, quantity=quantity) for pk, quantity in kept.items()],
+            update_conflicts=True, unique_fields=['cart', 'product'], update_fields=['quantity'],
+        )
+    if removed:
+        CartItem.objects.filter(cart=cart, product_id__in=removed).delete()
+    # El contador se recalcula desde todas las líneas en el mismo UPDATE: una
+    # línea que otra petición inserte a la vez (no estaba bloqueada) no lo descuadra
+    totals = CartItem.objects.filter(cart=OuterRef('pk')).values('cart').annotate(total=Sum('quantity')).values('total')
+    Cart.objects.filter(pk=cart.pk).update(item_count=Coalesce(Subquery(totals), Value(0)))
+
+    # Lo que baja vuelve al stock; lo que sube se reserva al final (bloqueos cortos)
+    lowered = {pk: kept.get(pk, 0) for pk, quantity in current.items() if kept.get(pk, 0) < quantity}
+    release(cart.pk, lowered)
+    raised = {pk: quantity - current.get(pk, 0) for pk, quantity in kept.items() if quantity > current.get(pk, 0)}
+    reserve(cart, raised, {pk: products[pk]['stock_shards'] for pk in raised})
+    return cart
+
+
+# --- Carrito anónimo en la sesión ---
+# Mientras el visitante no inicia sesión el carrito vive solo en su sesión:
+# no se escriben filas de Cart ni de CartItem. Al iniciar sesión se fusiona
+# con su carrito de la base de datos (merge_session_cart).
+
+def session_cart(session):
+    return session.get(SESSION_CART_KEY, {})
+
+
+def session_add_product(session, product, quantity=1):
+    cart = session_cart(session)
+    key = str(product.pk)
+    cart[key] = cart.get(key, 0) + quantity
+    session[SESSION_CART_KEY] = cart
+
+
+def session_apply_operations(session, operations):
+    # Igual que apply_operations, sin reservas: el stock se descuenta en el checkout
+    cart = session_cart(session)
+    current = {int(key): quantity for key, quantity in cart.items()}
+    product_ids = {product_id for product_id, _, _ in operations}
+    products = {
+        row['id']: row for row in Product.objects.filter(id__in=product_ids).values('id', 'name', 'is_available')
+    }
+    final = _final_quantities({pk: current.get(pk, 0) for pk in product_ids}, operations)
+    _check_products(products, current, final)
+    for product_id, quantity in final.items():
+        if quantity and product_id in products:
+            cart[str(product_id)] = quantity
+        else:
+            cart.pop(str(product_id), None)
+    session[SESSION_CART_KEY] = cart
+
+
+def session_item_count(session):
+    return sum(session_cart(session).values())
+
+
+def session_cart_snapshot(session):
+    # Mismo formato que cart_snapshot, con una consulta para los productos
+    cart = session_cart(session)
+    queryset = Product.objects.filter(id__in=cart.keys()).values(
+        'id', 'name', 'price', 'image_url', 'image', 'image_variants',
+    )
+    products = {str(row['id']): row for row in queryset}
+    rows = []
+    # En el orden en que se añadieron, saltando productos ya borrados
+    for key, quantity in cart.items():
+        product = products.get(key)
+        if product is None:
+            continue
+        rows.append({
+            'product_id': product['id'],
+            'product__name': product['name'],
+            'product__price': product['price'],
+            'product__image_url': product['image_url'],
+            'product__image': product['image'],
+            'product__image_variants': product['image_variants'],
+            'quantity': quantity,
+            'subtotal': quantity * product['price'],
+        })
+    total = sum(row['subtotal'] for row in rows)
+    count = sum(row['quantity'] for row in rows)
+    for row in rows:
+        row['cart_total'], row['cart_count'] = total, count
+    return _format_snapshot(rows)
+
+
+@transaction.atomic
+def merge_session_cart(session, user):
+    """
+    Pasa el carrito de la sesión al carrito del usuario con un único upsert
+    que suma cantidades (las líneas que ya existían se incrementan). El
+    carrito de base de datos se crea aquí si el usuario aún no tenía.
+    """
+    cart = session.pop(SESSION_CART_KEY, None)
+    if not cart:
+        return
+    # Descarta productos borrados desde que se añadieron a la sesión
+    existing = set(Product.objects.filter(id__in=cart.keys()).values_list('id', flat=True))
+    quantities = {pk: cart[str(pk)] for pk in existing if cart[str(pk)] > 0}
+    if not quantities:
+        return
+    db_cart, _ = Cart.objects.get_or_create(user=user)
+    bulk_increment(
+        CartItem, ['cart', 'product'], ['quantity'],
+        [(db_cart.pk, pk, quantity) for pk, quantity in quantities.items()],
+    )
+    Cart.objects.filter(pk=db_cart.pk).update(item_count=F('item_count') + sum(quantities.values()))
@@ -0,0 +1,143 @@
+# tyzox/catalog.py
+
+import hashlib
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Max
+from django.urls import reverse
+
+from .cache import cached_catalog, catalog_key, related_version
+from .facets import category_facets
+from .images import image_urls
+from .models import Category, Product
+from .pagination import DEFAULT_PAGE_SIZE, keyset_page
+
+# Solo las columnas que necesita una tarjeta de producto en la tienda.
+CATALOG_FIELDS = ('id', 'name', 'slug', 'price', 'image_url', 'image', 'image_variants', 'category__slug')
+CATALOG_ORDERING = ('name', 'id')
+# ?sort= del catálogo -> orden de la paginación por cursor (cada uno con su índice)
+CATALOG_SORTS = {
+    'name': CATALOG_ORDERING,
+    'price': ('price', 'id'),
+    '-price': ('-price', '-id'),
+}
+RELATED_PRODUCTS_LIMIT = 4
+
+
+def parse_price(value):
+    # ?min_price= / ?max_price=; lanza ValueError si no es un importe válido
+    if value in (None, ''):
+        return None
+    try:
+        price = Decimal(value)
+    except InvalidOperation:
+        raise ValueError('El precio debe ser un número.')
+    if not price.is_finite() or price < 0:
+        raise ValueError('El precio debe ser un número positivo.')
+    return price.quantize(Decimal('0.01'))
+
+
+def catalog_queryset(category_slug=None, min_price=None, max_price=None):
+    queryset = Product.objects.filter(is_available=True)
+    if category_slug:
+        queryset = queryset.filter(category__slug=category_slug)
+    if min_price is not None:
+        queryset = queryset.filter(price__gte=min_price)
+    if max_price is not None:
+        queryset = queryset.filter(price__lte=max_price)
+    return queryset.values(*CATALOG_FIELDS)
+
+
+def serialize_product_row(row):
+    return {
+        'id': row['id'],
+        'name': row['name'],
+        'price': str(row['price']),
+        **image_urls(row['image'], row['image_variants'], row['image_url']),
+        'category_slug': row['category__slug'],
+        'detail_url': reverse('product_detail', kwargs={'product_slug': row['slug']}),
+    }
+
+
+def catalog_page(category_slug=None, cursor=None, limit=DEFAULT_PAGE_SIZE, min_price=None, max_price=None, sort='name'):
+    rows, next_cursor = keyset_page(
+        catalog_queryset(category_slug, min_price, max_price), CATALOG_SORTS[sort], cursor, limit,
+    )
+    page = {
+        'products': [serialize_product_row(row) for row in rows],
+        'next_cursor': next_cursor,
+    }
+    if cursor is None:
+        # Con la primera página van los recuentos por categoría del rango de precio
+        page['facets'] = category_facets(min_price, max_price)
+    return page
+
+
+def cached_catalog_page(category_slug=None, cursor=None, limit=DEFAULT_PAGE_SIZE, min_price=None, max_price=None, sort='name'):
+    return cached_catalog(
+        ('page', category_slug, cursor, limit, min_price, max_price, sort),
+        lambda: catalog_page(category_slug, cursor, limit, min_price, max_price, sort),
+    )
+
+
+def product_detail_payload(product_slug):
+    product = (
+        Product.objects.filter(slug=product_slug, is_available=True)
+        .values('id', 'name', 'slug', 'description', 'price', 'image_url', 'image', 'image_variants', 'updated_at')
+        .first()
+    )
+    if product is None:
+        return None
+    product['price'] = str(product['price'])
+    product.update(image_urls(product.pop('image'), product.pop('image_variants'), product['image_url']))
+    return {'product': product}
+
+
+def related_products_payload(product_id):
+    # Vecinos precalculados por build_recommendations (índice
+    # productneighbour_product_rank); si el producto aún no tiene, los más
+    # comprados junto a él (índice copurchase_rank_idx)
+    related = list(
+        Product.objects.filter(neighbour_of__product_id=product_id, is_available=True)
+        .order_by('neighbour_of__rank')
+        .values(*CATALOG_FIELDS)[:RELATED_PRODUCTS_LIMIT]
+    )
+    if not related:
+        related = (
+            Product.objects.filter(co_purchased_with__product_id=product_id, is_available=True)
+            .order_by('-co_purchased_with__weight', 'id')
+            .values(*CATALOG_FIELDS)[:RELATED_PRODUCTS_LIMIT]
+        )
+    return [serialize_product_row(row) for row in related]
+
+
+def cached_product_detail(product_slug):
+    """
+    Ficha y relacionados, cacheados por separado: los relacionados cambian
+    con las compras y build_recommendations sin tocar el catálogo, así que
+    llevan además su propia versión (related_version, también en el ETag).
+    """
+    detail = cached_catalog(('detail', product_slug), lambda: product_detail_payload(product_slug))
+    if detail is None:
+        return None
+    product_id = detail['product']['id']
+    version = related_version(product_id)
+    related = cached_catalog(('related', product_id, version), lambda: related_products_payload(product_id))
+    return {**detail, 'related_products': related, 'related_version': version}
+
+
+# --- Peticiones condicionales (ETag / Last-Modified) ---
+# Cualquier cambio de productos o categorías sube la versión del catálogo, así
+# que el ETag se deriva de ella sin consultar la base de datos.
+
+def catalog_etag(*parts):
+    return hashlib.md5(catalog_key('etag', *parts).encode('utf-8')).hexdigest()
+
+
+def catalog_last_modified():
+    # Una consulta por versión del catálogo; después sale de la caché
+    def newest():
+        product = Product.objects.aggregate(newest=Max('updated_at'))['newest']
+        category = Category.objects.aggregate(newest=Max('updated_at'))['newest']
+        return max(filter(None, (product, category)), default=None)
+    return cached_catalog(('last_modified',), newest)
@@ -0,0 +1,236 @@
+# tyzox/catalog_io.py
+
+import csv
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.utils.text import slugify
+
+from .bulk import batched
+from .cache import bump_catalog_version
+from .facets import rebuild_category_facets
+from .models import Category, Product
+
+PRODUCT_FIELDS = ('slug', 'name', 'category', 'description', 'price', 'image_url', 'stock', 'is_available')
+CATEGORY_FIELDS = ('slug', 'name')
+# Campos que se sobrescriben cuando el producto ya existe (la clave es el slug);
+# updated_at lo rellena bulk_create y hay que copiarlo también en las actualizaciones.
+# El stock del archivo solo vale para productos nuevos: en los existentes lo
+# mueven reservas, contadores repartidos y adjust_stock, y pisarlo haría que
+# las reservas al caducar devolvieran unidades de más.
+PRODUCT_UPDATE_FIELDS = ['name', 'category', 'description', 'price', 'image_url', 'is_available', 'updated_at']
+
+TRUE_VALUES = {'1', 'true', 'si', 'sí', 'yes', 'y', 't'}
+# Límites de las columnas: un valor fuera de rango haría fallar el lote entero
+# en PostgreSQL, así que se rechaza antes como error de esa fila
+_price_field = Product._meta.get_field('price')
+MAX_PRICE = Decimal(10) ** (_price_field.max_digits - _price_field.decimal_places)
+MAX_STOCK = 2147483647
+MAX_IMAGE_URL = Product._meta.get_field('image_url').max_length
+
+
+class RowError(ValueError):
+    pass
+
+
+def detect_format(path, fmt=None):
+    if fmt:
+        return fmt
+    return 'jsonl' if str(path).endswith(('.jsonl', '.ndjson')) else 'csv'
+
+
+def read_rows(stream, fmt):
+    # Generador: nunca carga el archivo entero en memoria
+    if fmt == 'jsonl':
+        for line in stream:
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # La línea se reporta como fila inválida, sin cortar la importación
+                    yield line
+    else:
+        yield from csv.DictReader(stream)
+
+
+def write_rows(stream, fmt, fields, rows):
+    if fmt == 'jsonl':
+        for row in rows:
+            stream.write(json.dumps(row, ensure_ascii=False, default=str) + '\n')
+    else:
+        writer = csv.DictWriter(stream, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+class CategoryResolver:
+    """
+    Traduce nombres o slugs de categoría a ids en memoria. Las categorías son
+    pocas, así que se cargan todas de una vez; las que faltan se crean en
+    bloque una vez por lote.
+    """
+    def __init__(self):
+        self.ids = {}
+        for pk, name, slug in Category.objects.values_list('id', 'name', 'slug'):
+            self.ids[slug] = pk
+            self.ids[slugify(name)] = pk
+
+    def key(self, value):
+        return slugify(str(value or '').strip())[:100]
+
+    def resolve_batch(self, values):
+        missing = {}
+        for value in values:
+            key = self.key(value)
+            if key and key not in self.ids:
+                missing[key] = str(value).strip()[:100]
+        if missing:
+            created = Category.objects.bulk_create(
+                [Category(name=name, slug=key) for key, name in missing.items()],
+            )
+            for category in created:
+                self.ids[category.slug] = category.pk
+
+    def __getitem__(self, value):
+        return self.ids[self.key(value)]
+
+
+def _parse_bool(value, default=True):
+    if value in (None, ''):
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in TRUE_VALUES
+
+
+def _check_object(row):
+    if not isinstance(row, dict):
+        raise RowError('La fila no es un objeto JSON válido.')
+
+
+def clean_product_row(row, categories):
+    _check_object(row)
+    name = str(row.get('name') or '').strip()
+    if not name:
+        raise RowError('Falta el nombre del producto.')
+    slug = slugify(row.get('slug') or name)[:200]
+    if not slug:
+        raise RowError(f"No se pudo generar un slug para '{name}'.")
+    try:
+        price = Decimal(str(row.get('price')))
+        stock = int(row.get('stock') or 0)
+        if not price.is_finite():
+            raise ValueError
+        price = price.quantize(Decimal('0.01'))
+    except (InvalidOperation, TypeError, ValueError):
+        raise RowError(f"Precio o stock inválido en '{name}'.")
+    if price < 0 or stock < 0:
+        raise RowError(f"Precio o stock negativo en '{name}'.")
+    if price >= MAX_PRICE or stock > MAX_STOCK:
+        raise RowError(f"Precio o stock fuera de rango en '{name}'.")
+    image_url = str(row.get('image_url') or '') or None
+    if image_url and len(image_url) > MAX_IMAGE_URL:
+        raise RowError(f"URL de imagen demasiado larga en '{name}'.")
+    try:
+        category_id = categories[row.get('category')]
+    except KeyError:
+        raise RowError(f"Falta la categoría de '{name}'.")
+    return Product(
+        slug=slug,
+        name=name[:200],
+        category_id=category_id,
+        description=str(row.get('description') or '') or None,
+        price=price,
+        image_url=image_url,
+        stock=stock,
+        is_available=_parse_bool(row.get('is_available')),
+    )
+
+
+def import_products(rows, batch_size=1000, on_error=None):
+    """
+    Inserta o actualiza productos por lotes, identificándolos por slug: las
+    categorías se resuelven en memoria y cada lote se escribe con un solo
+    upsert. Devuelve contadores.
+    """
+    stats = {'created': 0, 'updated': 0, 'errors': 0}
+    categories = CategoryResolver()
+    line = 0
+    for batch in batched(rows, batch_size):
+        categories.resolve_batch(row.get('category') for row in batch if isinstance(row, dict))
+        products = {}
+        for row in batch:
+            line += 1
+            try:
+                product = clean_product_row(row, categories)
+            except RowError as e:
+                stats['errors'] += 1
+                if on_error:
+                    on_error(line, e)
+                continue
+            products[product.slug] = product # si el slug se repite, gana la última fila
+        with transaction.atomic():
+            # Solo para el informe: cuántos slugs del lote ya existían
+            existing = Product.objects.filter(slug__in=products).count()
+            # Un único INSERT ... ON CONFLICT (slug) DO UPDATE por lote
+            Product.objects.bulk_create(
+                products.values(),
+                update_conflicts=True,
+                unique_fields=['slug'],
+                update_fields=PRODUCT_UPDATE_FIELDS,
+            )
+        stats['created'] += len(products) - existing
+        stats['updated'] += existing
+    # Las operaciones en bloque no disparan señales: recalculamos las facetas
+    # (que además invalida la caché) una vez al final
+    rebuild_category_facets()
+    return stats
+
+
+def import_categories(rows, batch_size=1000, on_error=None):
+    stats = {'created': 0, 'updated': 0, 'errors': 0}
+    line = 0
+    for batch in batched(rows, batch_size):
+        categories = {}
+        for row in batch:
+            line += 1
+            try:
+                _check_object(row)
+                name = str(row.get('name') or '').strip()
+                slug = slugify(row.get('slug') or name)[:100]
+                if not name or not slug:
+                    raise RowError('Falta el nombre de la categoría.')
+            except RowError as e:
+                stats['errors'] += 1
+                if on_error:
+                    on_error(line, e)
+                continue
+            categories[slug] = Category(name=name[:100], slug=slug)
+        with transaction.atomic():
+            existing = Category.objects.filter(slug__in=categories).count()
+            Category.objects.bulk_create(
+                categories.values(),
+                update_conflicts=True,
+                unique_fields=['slug'],
+                update_fields=['name', 'updated_at'],
+            )
+        stats['created'] += len(categories) - existing
+        stats['updated'] += existing
+    bump_catalog_version()
+    return stats
+
+
+def export_product_rows(chunk_size=2000):
+    rows = Product.objects.order_by('id').values_list(
+        'slug', 'name', 'category__name', 'description', 'price', 'image_url', 'stock', 'is_available',
+    ).iterator(chunk_size=chunk_size)
+    for values in rows:
+        row = dict(zip(PRODUCT_FIELDS, values))
+        row['price'] = str(row['price'])
+        yield row
+
+
+def export_category_rows(chunk_size=2000):
+    for slug, name in Category.objects.order_by('id').values_list('slug', 'name').iterator(chunk_size=chunk_size):
+        yield {'slug': slug, 'name': name}
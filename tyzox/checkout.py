@@ -0,0 +1,69 @@
+# tyzox/checkout.py
+
+from collections import defaultdict
+
+from django.db import transaction
+
+from .inventory import StockError, commit_reservations
+from .jobs import enqueue
+from .models import Cart, CartItem, Order, OrderItem
+
+
+class CheckoutError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+@transaction.atomic
+def place_order(user):
+    """
+    Convierte el carrito del usuario en una orden con un número fijo de
+    consultas, sin importar cuántas líneas tenga el carrito.
+    """
+    # 1. Una sola consulta para las líneas y sus productos
+    lines = list(CartItem.objects.filter(cart__user=user).select_related('product'))
+    if not lines:
+        raise CheckoutError('Tu carrito está vacío.')
+
+    unavailable = sorted({line.product.name for line in lines if not line.product.is_available})
+    if unavailable:
+        raise CheckoutError(f"Ya no están disponibles: {', '.join(unavailable)}.", status=409)
+
+    quantities = defaultdict(int)
+    for line in lines:
+        quantities[line.product_id] += line.quantity
+
+    # 2. Confirmamos las reservas del carrito (y descontamos lo no reservado)
+    # antes de escribir la orden
+    try:
+        commit_reservations(
+            lines[0].cart_id, quantities, {line.product_id: line.product.stock_shards for line in lines},
+        )
+    except StockError as e:
+        raise CheckoutError(str(e), status=e.status)
+
+    # 3. Orden e items de la orden en bloque
+    order = Order.objects.create(
+        user=user,
+        total_price=sum(line.product.price * line.quantity for line in lines),
+    )
+    OrderItem.objects.bulk_create([
+        OrderItem(
+            order=order,
+            product_id=line.product_id,
+            quantity=line.quantity,
+            price=line.product.price * line.quantity, # Guardamos el precio total del item
+        )
+        for line in lines
+    ])
+
+    # 4. Vaciamos el carrito con un solo DELETE y reiniciamos su contador
+    CartItem.objects.filter(cart_id=lines[0].cart_id).delete()
+    Cart.objects.filter(pk=lines[0].cart_id).update(item_count=0)
+
+    # 5. Grafo de compras conjuntas y resúmenes de ventas: en segundo plano
+    # (manage.py run_jobs), para que el checkout no espere por ellos
+    enqueue('record_co_purchases', product_ids=sorted(quantities), order_id=order.pk)
+    enqueue('record_sales', order_id=order.pk)
+    return order
@@ -0,0 +1,68 @@
+# tyzox/dashboard.py
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
+
+from .cache import cached_catalog
+from .models import Product
+
+DASHBOARD_PAGE_SIZE = 50
+
+# Ordenaciones permitidas (?sort=) -> columnas; 'id' al final para un orden estable
+SORT_OPTIONS = {
+    'name': ('name', 'id'),
+    '-name': ('-name', '-id'),
+    'category': ('category__name', 'name', 'id'),
+    '-category': ('-category__name', '-name', '-id'),
+    'price': ('price', 'id'),
+    '-price': ('-price', '-id'),
+    'stock': ('stock', 'id'),
+    '-stock': ('-stock', '-id'),
+}
+DEFAULT_SORT = 'name'
+
+
+class CachedCountPaginator(Paginator):
+    """
+    Paginator que guarda el COUNT(*) en la caché del catálogo: con 100k
+    productos contar en cada página sale caro y el total apenas cambia.
+    """
+    def __init__(self, *args, count_key, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.count_key = count_key
+
+    @cached_property
+    def count(self):
+        return cached_catalog(
+            ('dashboard-count', self.count_key),
+            lambda: self.object_list.count(),
+            timeout=settings.DASHBOARD_COUNT_CACHE_TIMEOUT,
+        )
+
+
+def dashboard_filters(params):
+    filters = {}
+    category = params.get('category')
+    if category and category.isdigit():
+        filters['category_id'] = int(category)
+    available = params.get('available')
+    if available in ('1', '0'):
+        filters['is_available'] = available == '1'
+    if params.get('low_stock') == '1':
+        filters['stock__lte'] = settings.LOW_STOCK_THRESHOLD
+    return filters
+
+
+def dashboard_page(params):
+    filters = dashboard_filters(params)
+    sort = params.get('sort') if params.get('sort') in SORT_OPTIONS else DEFAULT_SORT
+    queryset = (
+        Product.objects.filter(**filters)
+        .select_related('category')
+        .only('id', 'name', 'price', 'stock', 'is_available', 'category__name')
+        .order_by(*SORT_OPTIONS[sort])
+    )
+    count_key = ':'.join(f'{key}={value}' for key, value in sorted(filters.items()))
+    paginator = CachedCountPaginator(queryset, DASHBOARD_PAGE_SIZE, count_key=count_key)
+    return paginator.get_page(params.get('page')), sort, filters
@@ -0,0 +1,89 @@
+# tyzox/exports.py
+
+import csv
+from datetime import datetime, time, timedelta
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .models import Order, OrderItem
+
+# Filas que pide cada viaje al cursor del servidor y tamaño aproximado de
+# cada trozo que se envía al cliente.
+CHUNK_SIZE = 2000
+FLUSH_BYTES = 64 * 1024
+
+
+class _Echo:
+    # Pseudo-archivo: csv.writer nos devuelve la línea en lugar de guardarla
+    def write(self, value):
+        return value
+
+
+def _csv_chunks(header, rows):
+    writer = csv.writer(_Echo())
+    buffer = ['\ufeff', writer.writerow(header)]
+    size = 0
+    for row in rows:
+        line = writer.writerow(row)
+        buffer.append(line)
+        size += len(line)
+        if size >= FLUSH_BYTES:
+            yield ''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def csv_response(filename, header, rows):
+    """
+    Respuesta CSV en streaming: la memoria no crece con el número de filas y
+    el primer byte sale en cuanto llega el primer bloque de la consulta.
+    """
+    return StreamingHttpResponse(
+        _csv_chunks(header, rows),
+        content_type='text/csv',
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'},
+    )
+
+
+def datetime_bounds(start=None, end=None):
+    # Fechas inclusivas -> [inicio del día start, inicio del día siguiente a end)
+    lower = timezone.make_aware(datetime.combine(start, time.min)) if start else None
+    upper = timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min)) if end else None
+    return lower, upper
+
+
+def _filter_created(queryset, start, end, field='created_at'):
+    # Comparamos contra límites de fecha y hora para poder usar el índice
+    lower, upper = datetime_bounds(start, end)
+    if lower:
+        queryset = queryset.filter(**{f'{field}__gte': lower})
+    if upper:
+        queryset = queryset.filter(**{f'{field}__lt': upper})
+    return queryset
+
+
+ORDER_HEADER = ['Orden', 'Fecha', 'Usuario', 'Email', 'Total']
+ORDER_ITEM_HEADER = ['Orden', 'Fecha', 'Email', 'Producto', 'Categoría', 'Cantidad', 'Precio Total']
+
+
+def order_rows(start=None, end=None):
+    return (
+        _filter_created(Order.objects.all(), start, end)
+        .order_by('created_at', 'id')
+        .values_list('id', 'created_at', 'user__username', 'user__email', 'total_price')
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+
+
+def order_item_rows(start=None, end=None):
+    return (
+        _filter_created(OrderItem.objects.all(), start, end, field='order__created_at')
+        .order_by('order__created_at', 'order_id', 'id')
+        .values_list(
+            'order_id', 'order__created_at', 'order__user__email',
+            'product__name', 'product__category__name', 'quantity', 'price',
+        )
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
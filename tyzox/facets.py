@@ -0,0 +1,95 @@
+# tyzox/facets.py
+
+from django.db import transaction
+from django.db.models import Count, Max, Min
+
+from .bulk import batched
+from .cache import bump_catalog_version, cached_catalog
+from .models import Category, CategoryFacet, Product
+
+BATCH_SIZE = 1000
+
+
+def refresh_category_facets(category_ids):
+    """
+    Recalcula las facetas de las categorías indicadas con una consulta
+    agrupada (solo lee el índice product_category_price_idx) y un upsert.
+    """
+    ids = set(Category.objects.filter(pk__in=category_ids).values_list('pk', flat=True))
+    if not ids:
+        return 0
+    totals = {
+        row['category']: row
+        for row in Product.objects.filter(category_id__in=ids, is_available=True)
+        .values('category').annotate(count=Count('id'), low=Min('price'), high=Max('price')).order_by()
+    }
+    CategoryFacet.objects.bulk_create(
+        [
+            CategoryFacet(
+                category_id=pk,
+                product_count=totals.get(pk, {}).get('count', 0),
+                min_price=totals.get(pk, {}).get('low'),
+                max_price=totals.get(pk, {}).get('high'),
+            )
+            for pk in ids
+        ],
+        update_conflicts=True, unique_fields=['category'], update_fields=['product_count', 'min_price', 'max_price'],
+    )
+    return len(ids)
+
+
+def schedule_facet_refresh(category_ids):
+    # Tras el COMMIT; después se sube la versión del catálogo para que nadie
+    # sirva desde la caché las facetas anteriores
+    if category_ids:
+        transaction.on_commit(lambda: (refresh_category_facets(category_ids), bump_catalog_version()))
+
+
+def rebuild_category_facets():
+    # Todas las categorías, por lotes: tras importaciones o cargas en bloque
+    refreshed = 0
+    for batch in batched(Category.objects.values_list('pk', flat=True).iterator(), BATCH_SIZE):
+        refreshed += refresh_category_facets(batch)
+    bump_catalog_version()
+    return refreshed
+
+
+def _facet_rows(min_price=None, max_price=None):
+    if min_price is None and max_price is None:
+        # Sin filtro de precio: la tabla precalculada, una fila por categoría
+        return (
+            CategoryFacet.objects.filter(product_count__gt=0)
+            .values('category__slug', 'category__name', 'product_count', 'min_price', 'max_price')
+            .order_by('category__name')
+        )
+    # Con rango de precio los recuentos cambian: se agregan sobre el rango
+    # del índice (categoría, disponible, precio) y se cachean por versión
+    products = Product.objects.filter(is_available=True)
+    if min_price is not None:
+        products = products.filter(price__gte=min_price)
+    if max_price is not None:
+        products = products.filter(price__lte=max_price)
+    return (
+        products.values('category__slug', 'category__name')
+        .annotate(product_count=Count('id'), min_price=Min('price'), max_price=Max('price'))
+        .order_by('category__name')
+    )
+
+
+def category_facets(min_price=None, max_price=None):
+    """
+    Recuento de productos disponibles y rango de precios por categoría (las
+    que tienen al menos uno), opcionalmente dentro de un rango de precio.
+    """
+    def build():
+        return [
+            {
+                'slug': row['category__slug'],
+                'name': row['category__name'],
+                'product_count': row['product_count'],
+                'min_price': str(row['min_price']) if row['min_price'] is not None else None,
+                'max_price': str(row['max_price']) if row['max_price'] is not None else None,
+            }
+            for row in _facet_rows(min_price, max_price)
+        ]
+    return cached_catalog(('facets', min_price, max_price), build)
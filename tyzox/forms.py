@@ -12,20 +12,35 @@ class ProductForm(forms.ModelForm):
         widget=forms.Select(attrs={'class': 'form-control'}) # 'form-control' es una clase común para styling
     )
 
+    # El stock no se edita directamente: guardar el valor leído al abrir el
+    # formulario desharía las reservas y compras hechas mientras tanto
+    stock_delta = forms.IntegerField(
+        required=False,
+        label="Ajuste de Inventario",
+        help_text="Unidades a sumar (o restar, con signo negativo) al stock disponible.",
+    )
+
     class Meta:
         model = Product
         # Lista de los campos del modelo que queremos en nuestro formulario
-        fields = ['category', 'name', 'description', 'price', 'image_url', 'stock', 'is_available']
+        fields = ['category', 'name', 'description', 'price', 'image', 'image_url', 'is_available']
         # Etiquetas personalizadas para que se vean bien en español
         labels = {
             'name': 'Nombre del Producto',
             'description': 'Descripción',
             'price': 'Precio',
+            'image': 'Imagen (se sube al servidor y tiene prioridad sobre la URL)',
             'image_url': 'URL de la Imagen',
-            'stock': 'Inventario (Stock)',
             'is_available': 'Está Disponible para la Venta',
         }
         # Widgets para darle un poco de estilo o cambiar el tipo de input
         widgets = {
             'description': forms.Textarea(attrs={'rows': 4}), # Hace el campo de descripción más grande
-        }
\ No newline at end of file
+        }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.pk:
+            self.fields['stock_delta'].help_text = (
+                f"Disponible ahora: {self.instance.stock}. {self.fields['stock_delta'].help_text}"
+            )
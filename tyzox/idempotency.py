@@ -0,0 +1,50 @@
+# tyzox/idempotency.py
+
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+
+IDEMPOTENCY_KEY_PREFIX = 'tyzox:idem'
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+# Marca mientras la primera petición con la clave aún se está procesando
+IN_PROGRESS = 'in-progress'
+
+
+def idempotency_cache_key(request, scope):
+    """
+    Clave de caché de la Idempotency-Key de la petición (o None si no trae),
+    separada por usuario o sesión: la misma clave de dos clientes no choca.
+    """
+    key = request.headers.get(IDEMPOTENCY_HEADER, '').strip()
+    if not key:
+        return None
+    if request.user.is_authenticated:
+        owner = f'u{request.user.pk}'
+    else:
+        # Un visitante nuevo aún no tiene sesión guardada: la creamos para tener su clave
+        if not request.session.session_key:
+            request.session.save()
+        owner = f's{request.session.session_key}'
+    digest = hashlib.md5(f'{owner}:{key}'.encode('utf-8')).hexdigest()
+    return f'{IDEMPOTENCY_KEY_PREFIX}:{scope}:{digest}'
+
+
+def begin(cache_key):
+    """
+    Reserva la clave para esta petición. Devuelve None si es la primera vez,
+    IN_PROGRESS si otra petición con la misma clave aún no ha terminado, o
+    la respuesta guardada (status, cuerpo) si ya se procesó.
+    """
+    if cache.add(cache_key, IN_PROGRESS, timeout=settings.IDEMPOTENCY_TTL):
+        return None
+    return cache.get(cache_key, IN_PROGRESS)
+
+
+def finish(cache_key, status, body):
+    # Solo se recuerdan las respuestas correctas: tras un error el cliente
+    # puede reintentar con la misma clave
+    if status < 400:
+        cache.set(cache_key, (status, body), timeout=settings.IDEMPOTENCY_TTL)
+    else:
+        cache.delete(cache_key)
@@ -0,0 +1,124 @@
+# tyzox/images.py
+
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps
+
+from .cache import bump_catalog_version
+
+logger = logging.getLogger('tyzox.images')
+
+# Formatos de cada derivado: (extensión, formato de Pillow, opciones de guardado)
+VARIANT_FORMATS = (
+    ('jpg', 'JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+    ('webp', 'WEBP', {'quality': 80, 'method': 4}),
+)
+VARIANTS_DIR = 'products/variants'
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.PRODUCT_IMAGE_WORKERS, thread_name_prefix='tyzox-images',
+            )
+        return _executor
+
+
+def render_variants(source_name):
+    """
+    Genera, a partir de la imagen original guardada en el storage, una copia
+    JPEG y otra WebP por cada ancho de PRODUCT_IMAGE_WIDTHS (sin ampliar
+    nunca el original). Devuelve {'source': nombre, 'widths': {ancho: {ext: nombre}}}.
+    """
+    with default_storage.open(source_name, 'rb') as f:
+        original = ImageOps.exif_transpose(Image.open(f))
+        original.load()
+    if original.mode not in ('RGB', 'L'):
+        original = original.convert('RGB')
+    stem = os.path.splitext(os.path.basename(source_name))[0]
+    widths = {}
+    for width in sorted(settings.PRODUCT_IMAGE_WIDTHS):
+        if width > original.width and widths:
+            break
+        image = original.copy()
+        image.thumbnail((width, width * 4), Image.Resampling.LANCZOS)
+        widths[str(width)] = {}
+        for ext, fmt, options in VARIANT_FORMATS:
+            buffer = io.BytesIO()
+            image.save(buffer, fmt, **options)
+            name = default_storage.save(f'{VARIANTS_DIR}/{width}/{stem}.{ext}', ContentFile(buffer.getvalue()))
+            widths[str(width)][ext] = name
+    return {'source': source_name, 'widths': widths}
+
+
+def _variant_names(variants):
+    return {name for formats in (variants or {}).get('widths', {}).values() for name in formats.values()}
+
+
+def generate_product_variants(product_id):
+    from .models import Product
+
+    product = Product.objects.filter(pk=product_id).values('image', 'image_variants').first()
+    if not product or not product['image']:
+        return None
+    variants = render_variants(product['image'])
+    # Solo si la imagen no cambió mientras trabajábamos (otra tarea la procesará)
+    updated = Product.objects.filter(pk=product_id, image=product['image']).update(image_variants=variants)
+    if not updated:
+        for name in _variant_names(variants):
+            default_storage.delete(name)
+        return None
+    for name in _variant_names(product['image_variants']) - _variant_names(variants):
+        default_storage.delete(name)
+    # update() no dispara señales: invalidamos a mano las tarjetas cacheadas
+    bump_catalog_version()
+    return variants
+
+
+def _run(product_id):
+    try:
+        generate_product_variants(product_id)
+    except Exception:
+        logger.exception('No se pudieron generar las miniaturas del producto %s', product_id)
+    finally:
+        close_old_connections()
+
+
+def schedule_product_variants(product_id):
+    # Tras confirmar la transacción, para que el worker vea la imagen nueva
+    transaction.on_commit(lambda: _get_executor().submit(_run, product_id))
+
+
+def image_urls(image, variants, fallback_url=None):
+    """
+    URLs para pintar una imagen de producto: `image_url` es la miniatura JPEG
+    más pequeña (o el original, o la URL externa) y los srcset permiten al
+    navegador elegir la más pequeña que le sirva para su ancho de pantalla.
+    """
+    widths = (variants or {}).get('widths') or {}
+    if not widths:
+        return {
+            'image_url': default_storage.url(image) if image else fallback_url,
+            'image_srcset': '',
+            'image_webp_srcset': '',
+        }
+    ordered = sorted(widths.items(), key=lambda item: int(item[0]))
+    srcset = lambda ext: ', '.join(f'{default_storage.url(formats[ext])} {width}w' for width, formats in ordered)
+    return {
+        'image_url': default_storage.url(ordered[0][1]['jpg']),
+        'image_srcset': srcset('jpg'),
+        'image_webp_srcset': srcset('webp'),
+    }
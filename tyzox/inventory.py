@@ -0,0 +1,297 @@
+# tyzox/inventory.py
+
+import random
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import timedelta
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db import OperationalError, connections, router, transaction
+from django.db.models import Case, F, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Product, StockReservation, StockShard
+
+# Código de PostgreSQL para "lock_timeout agotado"
+LOCK_NOT_AVAILABLE = '55P03'
+
+
+class StockError(Exception):
+    def __init__(self, message, status=409):
+        super().__init__(message)
+        self.status = status
+
+
+def reservation_expiry():
+    return timezone.now() + timedelta(minutes=settings.STOCK_RESERVATION_MINUTES)
+
+
+@contextmanager
+def bounded_lock_wait():
+    """
+    Limita lo que la transacción en curso espera por un bloqueo de fila
+    (SET LOCAL lock_timeout en PostgreSQL). Con un producto muy demandado es
+    mejor responder "inténtalo de nuevo" que acumular peticiones en cola.
+    """
+    connection = connections[router.db_for_write(Product)]
+    if connection.vendor == 'postgresql' and settings.STOCK_LOCK_TIMEOUT_MS:
+        with connection.cursor() as cursor:
+            cursor.execute(f'SET LOCAL lock_timeout = {int(settings.STOCK_LOCK_TIMEOUT_MS)}')
+    try:
+        yield
+    except OperationalError as e:
+        cause = e.__cause__
+        if LOCK_NOT_AVAILABLE not in (getattr(cause, 'sqlstate', None), getattr(cause, 'pgcode', None)):
+            raise
+        raise StockError('Hay mucha demanda de este producto, inténtalo de nuevo en unos segundos.', status=503) from e
+
+
+def _take_plain(quantities):
+    """
+    Descuenta el stock de varios productos con un único UPDATE condicional.
+    Un producto sin stock suficiente no cumple el WHERE, así que si el número
+    de filas actualizadas no coincide se aborta la operación.
+    """
+    enough_stock = Q()
+    for product_id, quantity in quantities.items():
+        enough_stock |= Q(pk=product_id, stock__gte=quantity)
+    updated = Product.objects.filter(enough_stock).update(
+        stock=Case(*[When(pk=product_id, then=F('stock') - quantity) for product_id, quantity in quantities.items()])
+    )
+    if updated != len(quantities):
+        # Salimos de la transacción con una excepción: el UPDATE se revierte
+        short = Product.objects.filter(pk__in=quantities).exclude(enough_stock).values_list('name', flat=True)
+        raise StockError(f"No hay stock suficiente de: {', '.join(short)}.")
+    return [(product_id, None, quantity) for product_id, quantity in quantities.items()]
+
+
+def _take_sharded(product_id, shards, quantity):
+    # Primero un UPDATE condicional sobre un contador al azar (y los demás
+    # por turno): reservas simultáneas caen en filas distintas y no se esperan
+    start = random.randrange(shards)
+    for offset in range(shards):
+        shard = (start + offset) % shards
+        counter = StockShard.objects.filter(product_id=product_id, shard=shard, stock__gte=quantity)
+        if counter.update(stock=F('stock') - quantity):
+            return [(product_id, shard, quantity)]
+    # Ningún contador tiene bastante por sí solo: bloqueamos todos en orden
+    # (sin interbloqueos) y repartimos la cantidad entre ellos
+    counters = list(
+        StockShard.objects.select_for_update().filter(product_id=product_id, stock__gt=0).order_by('shard')
+    )
+    if sum(counter.stock for counter in counters) < quantity:
+        name = Product.objects.filter(pk=product_id).values_list('name', flat=True).first()
+        raise StockError(f'No hay stock suficiente de: {name}.')
+    allocations = []
+    for counter in counters:
+        take = min(counter.stock, quantity)
+        StockShard.objects.filter(pk=counter.pk).update(stock=F('stock') - take)
+        allocations.append((product_id, counter.shard, take))
+        quantity -= take
+        if not quantity:
+            break
+    return allocations
+
+
+def take_stock(quantities, shards):
+    """
+    Descuenta `quantities` ({id de producto: unidades}) sin sobreventa.
+    `shards` indica para cada producto en cuántos contadores está repartido
+    su stock (0: el campo Product.stock). Devuelve las asignaciones
+    (producto, contador o None, unidades) para poder devolverlas después.
+    """
+    plain = {pk: quantity for pk, quantity in quantities.items() if not shards.get(pk)}
+    allocations = _take_plain(plain) if plain else []
+    for product_id, quantity in quantities.items():
+        if shards.get(product_id):
+            allocations += _take_sharded(product_id, shards[product_id], quantity)
+    return allocations
+
+
+def return_stock(allocations):
+    # Devuelve las unidades de `allocations` con un UPDATE por tabla
+    plain, sharded = defaultdict(int), defaultdict(int)
+    for product_id, shard, quantity in allocations:
+        if shard is None:
+            plain[product_id] += quantity
+        else:
+            sharded[product_id, shard] += quantity
+    if plain:
+        Product.objects.filter(pk__in=plain).update(
+            stock=Case(*[When(pk=pk, then=F('stock') + quantity) for pk, quantity in plain.items()])
+        )
+    if sharded:
+        StockShard.objects.filter(reduce(or_, [Q(product_id=pk, shard=shard) for pk, shard in sharded])).update(
+            stock=Case(*[
+                When(product_id=pk, shard=shard, then=F('stock') + quantity)
+                for (pk, shard), quantity in sharded.items()
+            ])
+        )
+
+
+def reserve(cart, quantities, shards):
+    """
+    Aparta para el carrito las unidades de `quantities` ({id de producto:
+    unidades}) hasta que caduque la reserva, y renueva el plazo de las demás
+    reservas del carrito. `shards` como en take_stock. Debe llamarse dentro
+    de una transacción, al final: las filas de stock quedan bloqueadas
+    hasta el COMMIT.
+    """
+    expires_at = reservation_expiry()
+    StockReservation.objects.filter(cart=cart).update(expires_at=expires_at)
+    if not quantities:
+        return
+    with bounded_lock_wait():
+        allocations = take_stock(quantities, shards)
+    StockReservation.objects.bulk_create([
+        StockReservation(cart=cart, product_id=product_id, shard=shard, quantity=taken, expires_at=expires_at)
+        for product_id, shard, taken in allocations
+    ])
+
+
+def _locked_reservations(cart_id, product_ids=None):
+    reservations = StockReservation.objects.select_for_update().filter(cart_id=cart_id)
+    if product_ids is not None:
+        reservations = reservations.filter(product_id__in=product_ids)
+    by_product = defaultdict(list)
+    for reservation in reservations.order_by('id'):
+        by_product[reservation.product_id].append(reservation)
+    return by_product
+
+
+def _trim(reserved, targets):
+    """
+    Recorta las reservas de cada producto a `targets` ({producto: unidades
+    que deben quedar reservadas}). Borra o reduce las filas sobrantes y
+    devuelve lo que no llegaba a la cantidad ({producto: unidades}) junto
+    con las asignaciones liberadas.
+    """
+    missing, released = {}, []
+    emptied, reduced = [], []
+    for product_id in targets.keys() | reserved.keys():
+        extra = sum(r.quantity for r in reserved[product_id]) - targets.get(product_id, 0)
+        if extra < 0:
+            missing[product_id] = -extra
+        for reservation in reserved[product_id]:
+            if extra <= 0:
+                break
+            take = min(reservation.quantity, extra)
+            released.append((product_id, reservation.shard, take))
+            extra -= take
+            if take == reservation.quantity:
+                emptied.append(reservation.pk)
+            else:
+                reservation.quantity -= take
+                reduced.append(reservation)
+    if emptied:
+        StockReservation.objects.filter(pk__in=emptied).delete()
+    if reduced:
+        StockReservation.objects.bulk_update(reduced, ['quantity'])
+    return missing, released
+
+
+def release(cart_id, quantities):
+    """
+    Devuelve al stock lo reservado de más cuando bajan cantidades del
+    carrito: `quantities` son las unidades que quedan de cada producto (0 si
+    se quitó). Lo que ya no estaba reservado (reservas recuperadas) no se toca.
+    """
+    if not quantities:
+        return
+    reserved = _locked_reservations(cart_id, quantities.keys())
+    _, released = _trim(reserved, {pk: quantity for pk, quantity in quantities.items() if quantity})
+    with bounded_lock_wait():
+        return_stock(released)
+
+
+def commit_reservations(cart_id, quantities, shards):
+    """
+    Confirma en el checkout las reservas del carrito: las unidades ya
+    reservadas no vuelven a tocar el stock, se descuenta solo lo que falte
+    (reservas caducadas y recuperadas, líneas sin reserva) y se devuelve lo
+    reservado de más. Las reservas confirmadas se borran.
+    """
+    reserved = _locked_reservations(cart_id)
+    missing, released = _trim(reserved, quantities)
+    with bounded_lock_wait():
+        if missing:
+            take_stock(missing, shards)
+        return_stock(released)
+    StockReservation.objects.filter(cart_id=cart_id).delete()
+
+
+def reclaim_expired(batch_size=500):
+    """
+    Devuelve al stock las reservas caducadas (o de carritos borrados), por
+    lotes en transacciones cortas. SKIP LOCKED salta las que un checkout
+    está confirmando en ese momento, así que varios procesos pueden
+    ejecutarlo a la vez. Devuelve el número de reservas recuperadas.
+    """
+    reclaimed = 0
+    expired = Q(expires_at__lte=timezone.now()) | Q(cart__isnull=True)
+    while True:
+        with transaction.atomic():
+            batch = list(
+                StockReservation.objects.select_for_update(skip_locked=True).filter(expired)
+                .order_by('expires_at').values_list('id', 'product_id', 'shard', 'quantity')[:batch_size]
+            )
+            if not batch:
+                return reclaimed
+            return_stock([row[1:] for row in batch])
+            StockReservation.objects.filter(pk__in=[row[0] for row in batch]).delete()
+        reclaimed += len(batch)
+
+
+def sync_sharded_stock(product_ids=None):
+    # Product.stock de los productos repartidos pasa a ser la suma de sus
+    # contadores (lo que muestran el panel y los informes)
+    totals = (
+        StockShard.objects.filter(product=OuterRef('pk')).values('product')
+        .annotate(total=Sum('stock')).values('total')
+    )
+    products = Product.objects.filter(stock_shards__gt=0)
+    if product_ids is not None:
+        products = products.filter(pk__in=product_ids)
+    return products.update(stock=Coalesce(Subquery(totals), Value(0)))
+
+
+@transaction.atomic
+def adjust_stock(product_id, delta):
+    """
+    Suma `delta` unidades (o las resta, si es negativo) al stock disponible
+    con un UPDATE relativo: no pisa lo que reservas y compras descuentan a
+    la vez, como haría guardar el producto con el valor leído en el
+    formulario. Restar más de lo disponible lanza StockError.
+    """
+    shards = Product.objects.values_list('stock_shards', flat=True).get(pk=product_id)
+    with bounded_lock_wait():
+        if delta < 0:
+            take_stock({product_id: -delta}, {product_id: shards})
+        elif delta > 0:
+            return_stock([(product_id, 0 if shards else None, delta)])
+    if shards:
+        sync_sharded_stock([product_id])
+
+
+@transaction.atomic
+def set_stock_shards(product_id, shards):
+    """
+    Reparte el stock del producto en `shards` contadores o, con 0, lo junta
+    de nuevo en Product.stock. Las reservas vivas pasan al contador 0 (o al
+    producto) para que al caducar devuelvan las unidades a un sitio que existe.
+    """
+    product = Product.objects.select_for_update().get(pk=product_id)
+    counters = StockShard.objects.select_for_update().filter(product=product)
+    total = sum(counter.stock for counter in counters) if product.stock_shards else product.stock
+    counters.delete()
+    if shards:
+        base, rest = divmod(total, shards)
+        StockShard.objects.bulk_create([
+            StockShard(product=product, shard=shard, stock=base + (1 if shard < rest else 0)) for shard in range(shards)
+        ])
+    StockReservation.objects.filter(product=product).update(shard=0 if shards else None)
+    Product.objects.filter(pk=product.pk).update(stock=total, stock_shards=shards)
+    return total
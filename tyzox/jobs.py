@@ -0,0 +1,147 @@
+# tyzox/jobs.py
+
+import logging
+import random
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Avg, Count, F, Min, Q
+from django.utils import timezone
+
+from .models import Job, ProcessedOrder
+
+logger = logging.getLogger('tyzox.jobs')
+
+# nombre de la tarea -> función; se rellena con el decorador `job`
+handlers = {}
+
+
+def job(name):
+    """
+    Registra una función como tarea en segundo plano. Recibe el payload
+    como argumentos con nombre, así que debe aceptar solo valores JSON.
+    """
+    def register(func):
+        handlers[name] = func
+        return func
+    return register
+
+
+def enqueue(name, **payload):
+    """
+    Encola una tarea. Dentro de una transacción la fila se escribe con ella:
+    el worker no la ve hasta el COMMIT y, si se revierte, desaparece junto
+    con lo demás (como un on_commit, pero sin perderla si el proceso muere
+    justo después de confirmar).
+    """
+    if name not in handlers:
+        raise ValueError(f'Tarea desconocida: {name}')
+    return Job.objects.create(name=name, payload=payload)
+
+
+def first_time(kind, order_id):
+    """
+    Registra que la tarea `kind` procesa la orden y devuelve False si ya lo
+    había hecho. Debe ir en la misma transacción que el trabajo: si este se
+    revierte, la marca también. Con dos ejecuciones simultáneas la segunda
+    espera por la clave única y, tras el COMMIT de la primera, la encuentra.
+    """
+    _, created = ProcessedOrder.objects.get_or_create(order_id=order_id, kind=kind)
+    return created
+
+
+def claim(batch_size=10):
+    """
+    Marca como en ejecución hasta `batch_size` tareas vencidas, las más
+    antiguas primero. SKIP LOCKED hace que varios workers no se esperen ni
+    se repartan la misma tarea; la transacción dura solo el UPDATE.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status=Job.QUEUED, run_after__lte=now)
+            .order_by('run_after').values_list('id', flat=True)[:batch_size]
+        )
+        Job.objects.filter(pk__in=ids).update(status=Job.RUNNING, started_at=now, attempts=F('attempts') + 1)
+    return list(Job.objects.filter(pk__in=ids).order_by('run_after'))
+
+
+def backoff(attempts):
+    # Espera exponencial con algo de azar para que los reintentos no coincidan
+    delay = min(settings.JOB_BACKOFF_SECONDS * 2 ** (attempts - 1), settings.JOB_MAX_BACKOFF)
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def run(job):
+    """
+    Ejecuta una tarea reclamada. El trabajo y el cambio a "terminada" van en
+    la misma transacción: si la tarea falla no queda nada a medias y se
+    reintenta más tarde (o se da por fallida tras JOB_MAX_ATTEMPTS).
+    """
+    start = time.perf_counter()
+    try:
+        with transaction.atomic():
+            handlers[job.name](**job.payload)
+            Job.objects.filter(pk=job.pk).update(status=Job.DONE, finished_at=timezone.now())
+    except Exception:
+        error = traceback.format_exc()
+        if job.attempts >= settings.JOB_MAX_ATTEMPTS:
+            logger.error('La tarea %s #%s falló definitivamente:\n%s', job.name, job.pk, error)
+            Job.objects.filter(pk=job.pk).update(status=Job.FAILED, finished_at=timezone.now(), last_error=error)
+        else:
+            logger.warning('La tarea %s #%s falló (intento %s), se reintentará', job.name, job.pk, job.attempts)
+            Job.objects.filter(pk=job.pk).update(
+                status=Job.QUEUED, run_after=timezone.now() + backoff(job.attempts), last_error=error,
+            )
+        return False
+    logger.debug('Tarea %s #%s terminada en %.3f s', job.name, job.pk, time.perf_counter() - start)
+    return True
+
+
+def requeue_stale():
+    # Tareas "en ejecución" de un worker que murió a medias: vuelven a la cola
+    limit = timezone.now() - timedelta(seconds=settings.JOB_TIMEOUT_SECONDS)
+    return Job.objects.filter(status=Job.RUNNING, started_at__lt=limit).update(status=Job.QUEUED)
+
+
+def purge_finished():
+    limit = timezone.now() - timedelta(hours=settings.JOB_RETENTION_HOURS)
+    deleted, _ = Job.objects.filter(status__in=(Job.DONE, Job.FAILED), finished_at__lt=limit).delete()
+    return deleted
+
+
+def job_stats():
+    """
+    Profundidad de la cola y latencias por tarea: en cola (y vencidas),
+    en ejecución, fallidas, espera de la más antigua pendiente y, de las
+    terminadas en la última hora, espera media hasta empezar y duración media.
+    """
+    now = timezone.now()
+    recent = Q(status=Job.DONE, finished_at__gte=now - timedelta(hours=1))
+    rows = (
+        Job.objects.values('name')
+        .annotate(
+            queued=Count('id', filter=Q(status=Job.QUEUED)),
+            due=Count('id', filter=Q(status=Job.QUEUED, run_after__lte=now)),
+            running=Count('id', filter=Q(status=Job.RUNNING)),
+            failed=Count('id', filter=Q(status=Job.FAILED)),
+            done_last_hour=Count('id', filter=recent),
+            oldest_due=Min('run_after', filter=Q(status=Job.QUEUED, run_after__lte=now)),
+            wait=Avg(F('started_at') - F('created_at'), filter=recent),
+            duration=Avg(F('finished_at') - F('started_at'), filter=recent),
+        )
+        .order_by('name')
+    )
+    stats = {}
+    for row in rows:
+        name = row.pop('name')
+        oldest_due = row.pop('oldest_due')
+        row['oldest_due_age'] = (now - oldest_due).total_seconds() if oldest_due else 0.0
+        row['wait'] = row['wait'].total_seconds() if row['wait'] is not None else None
+        row['duration'] = row['duration'].total_seconds() if row['duration'] is not None else None
+        stats[name] = row
+    return stats
@@ -0,0 +1,48 @@
+# tyzox/management/commands/bench_checkout.py
+
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from tyzox.checkout import place_order
+from tyzox.models import Cart, CartItem, Category, Product
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Mide consultas y tiempo de place_order() para varios tamaños de carrito (todo se revierte al final).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1, 5, 25, 100])
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'líneas':>8} {'consultas':>10} {'ms':>10}")
+        for size in options['sizes']:
+            queries, elapsed = self._run(size)
+            self.stdout.write(f'{size:>8} {queries:>10} {elapsed * 1000:>10.1f}')
+
+    def _run(self, size):
+        try:
+            with transaction.atomic():
+                user = User.objects.create_user(username=f'bench-checkout-{size}')
+                cart, _ = Cart.objects.get_or_create(user=user)
+                category = Category.objects.create(name=f'bench-checkout-{size}', slug=f'bench-checkout-{size}')
+                products = Product.objects.bulk_create([
+                    Product(category=category, name=f'bench {size} {i}', slug=f'bench-checkout-{size}-{i}', price=10, stock=10)
+                    for i in range(size)
+                ])
+                CartItem.objects.bulk_create([CartItem(cart=cart, product=p, quantity=2) for p in products])
+                with CaptureQueriesContext(connection) as captured:
+                    start = time.perf_counter()
+                    place_order(user)
+                    elapsed = time.perf_counter() - start
+                raise _Rollback
+        except _Rollback:
+            pass
+        return len(captured.captured_queries), elapsed
@@ -0,0 +1,160 @@
+# tyzox/management/commands/benchmark.py
+
+import json
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import override_settings
+
+from tyzox.cart import add_product
+from tyzox.models import Category, Product
+from tyzox.seed import seed, seed_sizes
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide latencia (p50/p95/p99) y consultas SQL de cada vista con el cliente de pruebas, '
+        'sobre datos sintéticos de varios tamaños que se revierten al terminar. '
+        'Con --save guarda los resultados y con --compare los compara con una ejecución anterior.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000], help='Productos generados en cada ronda.')
+        parser.add_argument('--repeat', type=int, default=30, help='Mediciones por endpoint.')
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--warm-cache', action='store_true', help='No vaciar la caché entre mediciones.')
+        parser.add_argument('--only', nargs='+', help='Medir solo estos endpoints.')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--save', help='Guarda los resultados en este archivo JSON.')
+        parser.add_argument('--compare', help='Archivo JSON de una ejecución anterior (línea base).')
+        parser.add_argument('--threshold', type=float, default=20.0, help='%% de empeoramiento del p95 que cuenta como regresión.')
+        parser.add_argument('--fail-on-regression', action='store_true')
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as f:
+                baseline = json.load(f)
+
+        results = {}
+        # El cliente de pruebas se presenta como 'testserver'
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            for size in options['sizes']:
+                self.stdout.write(self.style.MIGRATE_HEADING(f'Tamaño {size}'))
+                results[str(size)] = self._run_size(size, options)
+
+        regressions = self._report(results, baseline, options['threshold'])
+        if options['save']:
+            with open(options['save'], 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Resultados guardados en {options['save']}."))
+        if regressions and options['fail_on_regression']:
+            raise CommandError(f'{regressions} regresiones respecto a la línea base.')
+
+    def _run_size(self, size, options):
+        results = {}
+        try:
+            with transaction.atomic():
+                seed(**seed_sizes(size), seed=options['seed'], prefix=f'bench{size}')
+                for name, setup, request in self._endpoints(size):
+                    if options['only'] and name not in options['only']:
+                        continue
+                    results[name] = self._measure(setup, request, options)
+                raise _Rollback
+        except _Rollback:
+            pass
+        return results
+
+    def _endpoints(self, size):
+        # (nombre, preparación fuera de la medición, petición medida)
+        product = Product.objects.filter(slug__startswith=f'bench{size}-', is_available=True).order_by('id').first()
+        # Stock de sobra para que el checkout repetido no se quede sin unidades
+        Product.objects.filter(pk=product.pk).update(stock=10 ** 6)
+        category = Category.objects.filter(slug__startswith=f'bench{size}-').first()
+        user = User.objects.create_user(username=f'bench{size}-client', email=f'bench{size}-client@example.com')
+        admin = User.objects.create_superuser(username=f'bench{size}-admin', email=f'bench{size}-admin@example.com')
+        client, staff = Client(), Client()
+        client.force_login(user)
+        staff.force_login(admin)
+        add_json = json.dumps({'product_id': product.pk})
+        fill_cart = lambda: [add_product(user, product) for _ in range(3)]
+        return [
+            ('index', None, lambda: client.get('/')),
+            ('catalog_api', None, lambda: client.get('/api/products/', {'category': category.slug})),
+            ('search_api', None, lambda: client.get('/api/search/', {'q': 'guantes'})),
+            ('product_detail', None, lambda: client.get(f'/product/{product.slug}/')),
+            ('cart_add', None, lambda: client.post('/api/cart/add/', add_json, content_type='application/json')),
+            ('cart_get', fill_cart, lambda: client.get('/api/cart/get/')),
+            ('cart_summary', None, lambda: client.get('/api/cart/summary/')),
+            ('checkout', fill_cart, lambda: client.post('/api/cart/checkout/')),
+            ('dashboard', None, lambda: staff.get('/dashboard/')),
+            ('reports', None, lambda: staff.get('/dashboard/reports/')),
+        ]
+
+    def _measure(self, setup, request, options):
+        queries = []
+
+        def count(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        timings, query_counts, errors = [], [], 0
+        for i in range(options['warmup'] + options['repeat']):
+            if not options['warm_cache']:
+                cache.clear()
+            if setup:
+                setup()
+            queries.clear()
+            with connection.execute_wrapper(count):
+                start = time.perf_counter()
+                response = request()
+                elapsed = time.perf_counter() - start
+            if i < options['warmup']:
+                continue
+            if response.status_code >= 400:
+                errors += 1
+            timings.append(elapsed * 1000)
+            query_counts.append(len(queries))
+        quantiles = statistics.quantiles(timings, n=100) if len(timings) > 1 else timings * 99
+        return {
+            'p50': round(quantiles[49], 2),
+            'p95': round(quantiles[94], 2),
+            'p99': round(quantiles[98], 2),
+            'queries': max(query_counts),
+            'errors': errors,
+        }
+
+    def _report(self, results, baseline, threshold):
+        regressions = 0
+        header = f"{'tamaño':>7} {'endpoint':<16} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'consultas':>10} {'errores':>8}"
+        if baseline:
+            header += f" {'Δ p95':>9} {'Δ consultas':>12}"
+        self.stdout.write(header)
+        for size, endpoints in results.items():
+            for name, row in endpoints.items():
+                line = (
+                    f"{size:>7} {name:<16} {row['p50']:>9.2f} {row['p95']:>9.2f} {row['p99']:>9.2f} "
+                    f"{row['queries']:>10} {row['errors']:>8}"
+                )
+                base = (baseline or {}).get(size, {}).get(name)
+                if base:
+                    delta = (row['p95'] - base['p95']) / base['p95'] * 100 if base['p95'] else 0.0
+                    query_delta = row['queries'] - base['queries']
+                    line += f' {delta:>+8.1f}% {query_delta:>+12}'
+                    if delta > threshold or query_delta > 0:
+                        regressions += 1
+                        line = self.style.ERROR(line + '  REGRESIÓN')
+                    elif delta < -threshold or query_delta < 0:
+                        line = self.style.SUCCESS(line)
+                self.stdout.write(line)
+        return regressions
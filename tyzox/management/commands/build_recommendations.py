@@ -0,0 +1,61 @@
+# tyzox/management/commands/build_recommendations.py
+
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tyzox.jobs import enqueue
+from tyzox.recommendations import METRICS, build_neighbours
+
+
+class Command(BaseCommand):
+    help = (
+        'Calcula los productos similares (top-K por producto) a partir del historial de órdenes y '
+        'los guarda en ProductNeighbour, que es lo que lee la ficha de producto. '
+        'Muestra el tiempo de construcción y la memoria máxima usada.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, default=20, help='Vecinos guardados por producto.')
+        parser.add_argument('--metric', choices=METRICS, default='cosine')
+        parser.add_argument(
+            '--half-life-days', type=float,
+            help='Peso de cada orden a la mitad cada tantos días de antigüedad. Por defecto todas pesan igual.',
+        )
+        parser.add_argument('--min-support', type=int, default=2, help='Órdenes mínimas en las que aparece el par.')
+        parser.add_argument('--days', type=int, help='Solo las órdenes de los últimos N días.')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Órdenes leídas por consulta.')
+        parser.add_argument('--enqueue', action='store_true', help='Encola la construcción para run_jobs y sale.')
+
+    def handle(self, *args, **options):
+        if options['top_k'] < 1 or options['min_support'] < 1 or options['batch_size'] < 1:
+            raise CommandError('--top-k, --min-support y --batch-size deben ser mayores que 0.')
+        params = {
+            name: options[name]
+            for name in ('top_k', 'metric', 'half_life_days', 'min_support', 'days', 'batch_size')
+        }
+        if options['enqueue']:
+            job = enqueue('build_recommendations', **params)
+            self.stdout.write(self.style.SUCCESS(f'Tarea build_recommendations #{job.pk} en cola.'))
+            return
+
+        # tracemalloc también cuenta la memoria de los arrays de NumPy
+        tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            stats = build_neighbours(**params)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f"{stats['orders']} órdenes ({stats['items']} líneas, {stats['skipped_orders']} demasiado grandes), "
+            f"{stats['pairs']} pares distintos."
+        )
+        self.stdout.write(
+            f"Memoria: pico {peak / 2**20:.1f} MiB, arrays de pares {stats['array_bytes'] / 2**20:.1f} MiB."
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"{stats['neighbours']} vecinos para {stats['products']} productos en {elapsed:.2f} s."
+        ))
@@ -0,0 +1,42 @@
+# tyzox/management/commands/export_catalog.py
+
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+
+from tyzox.catalog_io import (
+    CATEGORY_FIELDS, PRODUCT_FIELDS, detect_format, export_category_rows, export_product_rows, write_rows,
+)
+
+
+class Command(BaseCommand):
+    help = 'Exporta productos o categorías a CSV o JSONL (mismo formato que import_catalog). Usa "-" para la salida estándar.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--kind', choices=['products', 'categories'], default='products')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Por defecto se deduce de la extensión.')
+
+    def handle(self, *args, **options):
+        fmt = detect_format(options['path'], options['format'])
+        if options['kind'] == 'products':
+            fields, rows = PRODUCT_FIELDS, export_product_rows()
+        else:
+            fields, rows = CATEGORY_FIELDS, export_category_rows()
+
+        count = 0
+        def counted(rows):
+            nonlocal count
+            for row in rows:
+                count += 1
+                yield row
+
+        start = time.perf_counter()
+        if options['path'] == '-':
+            write_rows(sys.stdout, fmt, fields, counted(rows))
+        else:
+            with open(options['path'], 'w', encoding='utf-8', newline='') as stream:
+                write_rows(stream, fmt, fields, counted(rows))
+        elapsed = time.perf_counter() - start
+        self.stderr.write(f'{count} filas en {elapsed:.2f}s ({count / elapsed if elapsed else 0:.0f} filas/s)')
@@ -0,0 +1,27 @@
+# tyzox/management/commands/generate_image_variants.py
+
+from django.core.management.base import BaseCommand
+
+from tyzox.images import generate_product_variants
+from tyzox.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Genera las miniaturas JPEG/WebP de las imágenes de producto subidas (por defecto solo las que faltan).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Regenera también las que ya existen (p. ej. tras cambiar PRODUCT_IMAGE_WIDTHS).')
+
+    def handle(self, *args, **options):
+        products = Product.objects.exclude(image='').exclude(image__isnull=True)
+        if not options['all']:
+            products = products.filter(image_variants={})
+        done = failed = 0
+        for pk in products.values_list('id', flat=True).iterator():
+            try:
+                generate_product_variants(pk)
+                done += 1
+            except Exception as e:
+                failed += 1
+                self.stderr.write(f'Producto {pk}: {e}')
+        self.stdout.write(self.style.SUCCESS(f'Miniaturas generadas para {done} productos ({failed} con errores).'))
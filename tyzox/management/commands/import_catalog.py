@@ -0,0 +1,37 @@
+# tyzox/management/commands/import_catalog.py
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tyzox.catalog_io import detect_format, import_categories, import_products, read_rows
+
+
+class Command(BaseCommand):
+    help = 'Importa (inserta o actualiza por slug) productos o categorías desde un archivo CSV o JSONL. El stock solo se aplica a productos nuevos.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--kind', choices=['products', 'categories'], default='products')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Por defecto se deduce de la extensión.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        fmt = detect_format(options['path'], options['format'])
+        importer = import_products if options['kind'] == 'products' else import_categories
+
+        def report_error(line, error):
+            self.stderr.write(f'Fila {line}: {error}')
+
+        start = time.perf_counter()
+        try:
+            with open(options['path'], encoding='utf-8-sig', newline='') as stream:
+                stats = importer(read_rows(stream, fmt), batch_size=options['batch_size'], on_error=report_error)
+        except OSError as e:
+            raise CommandError(str(e))
+        elapsed = time.perf_counter() - start
+        rows = stats['created'] + stats['updated'] + stats['errors']
+        self.stdout.write(self.style.SUCCESS(
+            f"{stats['created']} creados, {stats['updated']} actualizados, {stats['errors']} con errores "
+            f"en {elapsed:.2f}s ({rows / elapsed if elapsed else 0:.0f} filas/s)"
+        ))
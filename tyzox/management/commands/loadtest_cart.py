@@ -0,0 +1,130 @@
+# tyzox/management/commands/loadtest_cart.py
+
+import http.cookiejar
+import json
+import statistics
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+API_PREFIXES = {'sync': '/api/cart', 'async': '/api/async/cart'}
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    # Tras el login basta con la cookie de sesión: no seguimos la redirección
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class CartClient:
+    # Cliente HTTP mínimo con su propia sesión (cookies) contra un servidor en marcha
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.cookies), _NoRedirect)
+
+    def _cookie(self, name):
+        return next((c.value for c in self.cookies if c.name == name), '')
+
+    def login(self, email, password):
+        self.opener.open(f'{self.base_url}/login/').read()
+        data = urllib.parse.urlencode({
+            'form_type': 'login', 'email': email, 'password': password,
+            'csrfmiddlewaretoken': self._cookie('csrftoken'),
+        }).encode()
+        request = urllib.request.Request(f'{self.base_url}/login/', data=data, headers={'Referer': f'{self.base_url}/login/'})
+        try:
+            self.opener.open(request).read()
+        except urllib.error.HTTPError as e:
+            if e.code != 302:
+                raise CommandError(f'Error {e.code} al iniciar sesión en {self.base_url}.')
+        if not self._cookie('sessionid'):
+            raise CommandError(f'No se pudo iniciar sesión en {self.base_url} con {email}.')
+
+    def call(self, path, payload=None):
+        headers = {'X-CSRFToken': self._cookie('csrftoken'), 'Referer': self.base_url + '/'}
+        data = None
+        if payload is not None:
+            data = json.dumps(payload).encode()
+            headers['Content-Type'] = 'application/json'
+        request = urllib.request.Request(self.base_url + path, data=data, headers=headers)
+        start = time.perf_counter()
+        try:
+            with self.opener.open(request) as response:
+                response.read()
+                ok = response.status == 200
+        except urllib.error.URLError:
+            ok = False
+        return ok, time.perf_counter() - start
+
+
+class Command(BaseCommand):
+    help = (
+        'Prueba de carga de la API del carrito contra uno o varios servidores ya arrancados, '
+        'p. ej. WSGI (manage.py runserver / gunicorn) frente a ASGI (uvicorn tyzox_project.asgi:application). '
+        'Cada destino es base_url=sync|async.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'targets', nargs='+',
+            help='Ej.: http://127.0.0.1:8000=sync http://127.0.0.1:8001=async',
+        )
+        parser.add_argument('--email', required=True, help='Usuario existente con el que iniciar sesión.')
+        parser.add_argument('--password', required=True)
+        parser.add_argument('--product-id', type=int, required=True, help='Producto disponible para añadir al carrito.')
+        parser.add_argument('--concurrency', type=int, default=20)
+        parser.add_argument('--requests', type=int, default=1000, help='Peticiones por destino.')
+        parser.add_argument('--mix', default='get:6,summary:3,add:1', help='Proporción de llamadas por endpoint.')
+
+    def handle(self, *args, **options):
+        mix = []
+        for part in options['mix'].split(','):
+            name, _, weight = part.partition(':')
+            if name not in ('get', 'summary', 'add'):
+                raise CommandError(f'Endpoint desconocido en --mix: {name}')
+            mix += [name] * int(weight or 1)
+
+        self.stdout.write(f"{'destino':<40} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errores':>8}")
+        for target in options['targets']:
+            base_url, _, flavour = target.partition('=')
+            prefix = API_PREFIXES.get(flavour or 'sync')
+            if prefix is None:
+                raise CommandError(f'Tipo de API desconocido: {flavour} (usa sync o async)')
+            result = self._run(base_url, prefix, mix, options)
+            self.stdout.write(
+                f"{target:<40} {result['rps']:>8.1f} {result['p50']:>8.1f} {result['p95']:>8.1f} "
+                f"{result['p99']:>8.1f} {result['errors']:>8}"
+            )
+
+    def _run(self, base_url, prefix, mix, options):
+        concurrency = options['concurrency']
+        clients = [CartClient(base_url) for _ in range(concurrency)]
+        for client in clients:
+            client.login(options['email'], options['password'])
+
+        def worker(index):
+            client = clients[index % concurrency]
+            endpoint = mix[index % len(mix)]
+            if endpoint == 'add':
+                return client.call(f'{prefix}/add/', {'product_id': options['product_id']})
+            return client.call(f'{prefix}/{endpoint}/')
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(worker, range(options['requests'])))
+        elapsed = time.perf_counter() - start
+
+        latencies = sorted(duration * 1000 for ok, duration in results if ok)
+        quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else [0.0] * 99
+        return {
+            'rps': len(results) / elapsed,
+            'p50': quantiles[49],
+            'p95': quantiles[94],
+            'p99': quantiles[98],
+            'errors': sum(1 for ok, _ in results if not ok),
+        }
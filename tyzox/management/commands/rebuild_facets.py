@@ -0,0 +1,17 @@
+# tyzox/management/commands/rebuild_facets.py
+
+from django.core.management.base import BaseCommand
+
+from tyzox.facets import rebuild_category_facets
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula las facetas de todas las categorías (productos disponibles y rango de precios). '
+        'Las señales de Product las mantienen al día; esto es para después de cambios en bloque '
+        '(update(), SQL directo) que no disparan señales.'
+    )
+
+    def handle(self, *args, **options):
+        refreshed = rebuild_category_facets()
+        self.stdout.write(self.style.SUCCESS(f'Facetas recalculadas para {refreshed} categorías.'))
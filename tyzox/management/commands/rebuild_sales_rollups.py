@@ -0,0 +1,27 @@
+# tyzox/management/commands/rebuild_sales_rollups.py
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tyzox.reports import parse_date_range, rebuild_sales_rollups
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula las tablas de ventas diarias (producto y categoría) a partir de los items de las órdenes. '
+        'Las órdenes del rango quedan marcadas como sumadas, así que las tareas record_sales '
+        'pendientes de esas órdenes no las cuentan otra vez.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help='Primer día a recalcular (AAAA-MM-DD). Por defecto, todo el historial.')
+        parser.add_argument('--end', help='Último día a recalcular (AAAA-MM-DD).')
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        try:
+            start, end = parse_date_range(options)
+        except ValueError as e:
+            raise CommandError(str(e))
+        written = rebuild_sales_rollups(start, end, batch_size=options['batch_size'])
+        for model, count in written.items():
+            self.stdout.write(self.style.SUCCESS(f'{model}: {count} filas'))
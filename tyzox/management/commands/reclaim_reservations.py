@@ -0,0 +1,29 @@
+# tyzox/management/commands/reclaim_reservations.py
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from tyzox.inventory import reclaim_expired, sync_sharded_stock
+
+
+class Command(BaseCommand):
+    help = (
+        'Devuelve al stock las reservas de carrito caducadas, por lotes, y actualiza el stock mostrado '
+        'de los productos repartidos en contadores. Pensado para cron o, con --loop, como proceso continuo.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--loop', type=float, metavar='SEGUNDOS', help='Repite cada SEGUNDOS en lugar de salir.')
+
+    def handle(self, *args, **options):
+        while True:
+            reclaimed = reclaim_expired(batch_size=options['batch_size'])
+            synced = sync_sharded_stock()
+            self.stdout.write(self.style.SUCCESS(
+                f'{reclaimed} reservas recuperadas; stock de {synced} productos repartidos sincronizado.'
+            ))
+            if not options['loop']:
+                return
+            time.sleep(options['loop'])
@@ -0,0 +1,63 @@
+# tyzox/management/commands/run_jobs.py
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from tyzox.jobs import claim, job_stats, purge_finished, requeue_stale, run
+
+# Cada cuántas vueltas se recuperan tareas perdidas y se borran las antiguas
+MAINTENANCE_EVERY = 100
+
+
+class Command(BaseCommand):
+    help = (
+        'Worker de la cola de tareas en segundo plano (resúmenes de ventas, compras conjuntas...). '
+        'Se pueden arrancar varios a la vez. Con --stats muestra el estado de la cola y sale.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10, help='Tareas que reclama cada vez.')
+        parser.add_argument('--sleep', type=float, default=1.0, help='Segundos de espera con la cola vacía.')
+        parser.add_argument('--once', action='store_true', help='Vacía la cola una vez y sale.')
+        parser.add_argument('--stats', action='store_true')
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            return self._print_stats()
+        done = failed = 0
+        loops = 0
+        try:
+            while True:
+                if loops % MAINTENANCE_EVERY == 0:
+                    requeue_stale()
+                    purge_finished()
+                loops += 1
+                jobs = claim(options['batch_size'])
+                for job in jobs:
+                    if run(job):
+                        done += 1
+                    else:
+                        failed += 1
+                if not jobs:
+                    if options['once']:
+                        break
+                    close_old_connections()
+                    time.sleep(options['sleep'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f'{done} tareas terminadas, {failed} fallos.'))
+
+    def _print_stats(self):
+        seconds = lambda value: '-' if value is None else f'{value:.2f}'
+        self.stdout.write(
+            f"{'tarea':<24} {'en cola':>8} {'vencidas':>9} {'en curso':>9} {'fallidas':>9} "
+            f"{'hechas/h':>9} {'espera máx s':>13} {'espera s':>9} {'duración s':>11}"
+        )
+        for name, row in job_stats().items():
+            self.stdout.write(
+                f"{name:<24} {row['queued']:>8} {row['due']:>9} {row['running']:>9} {row['failed']:>9} "
+                f"{row['done_last_hour']:>9} {row['oldest_due_age']:>13.1f} {seconds(row['wait']):>9} "
+                f"{seconds(row['duration']):>11}"
+            )
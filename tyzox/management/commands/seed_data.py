@@ -0,0 +1,50 @@
+# tyzox/management/commands/seed_data.py
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tyzox.models import Category
+from tyzox.seed import SEED_PASSWORD, SEED_PREFIX, flush_seed_data, seed, seed_sizes
+
+
+class Command(BaseCommand):
+    help = (
+        'Genera datos sintéticos (categorías, productos, usuarios y órdenes) para pruebas de rendimiento. '
+        'Con --size se toman proporciones por defecto a partir del número de productos.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=1000, help='Número de productos; el resto se escala a partir de él.')
+        parser.add_argument('--categories', type=int)
+        parser.add_argument('--products', type=int)
+        parser.add_argument('--users', type=int)
+        parser.add_argument('--orders', type=int)
+        parser.add_argument('--basket-mean', type=float, default=2.5, help='Productos distintos por orden (media).')
+        parser.add_argument('--days', type=int, default=90, help='Las órdenes se reparten en los últimos N días.')
+        parser.add_argument('--seed', type=int, help='Semilla aleatoria para repetir exactamente los mismos datos.')
+        parser.add_argument('--prefix', default=SEED_PREFIX, help='Prefijo de slugs y usuarios generados.')
+        parser.add_argument('--flush', action='store_true', help='Borra antes los datos generados con el mismo prefijo.')
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        if options['flush']:
+            flush_seed_data(prefix)
+        elif Category.objects.filter(slug__startswith=f'{prefix}-').exists():
+            raise CommandError(f"Ya hay datos con el prefijo '{prefix}'. Usa --flush para regenerarlos.")
+
+        sizes = seed_sizes(options['size'])
+        for name in sizes:
+            if options[name] is not None:
+                sizes[name] = options[name]
+        if sizes['categories'] < 1 or sizes['products'] < 1 or sizes['users'] < 1:
+            raise CommandError('Hacen falta al menos una categoría, un producto y un usuario.')
+
+        start = time.perf_counter()
+        created = seed(
+            **sizes, basket_mean=options['basket_mean'], days=options['days'], seed=options['seed'], prefix=prefix,
+        )
+        elapsed = time.perf_counter() - start
+        summary = ', '.join(f'{count} {name}' for name, count in created.items())
+        self.stdout.write(self.style.SUCCESS(f'Datos generados en {elapsed:.1f}s: {summary}.'))
+        self.stdout.write(f"Los usuarios generados usan la contraseña '{SEED_PASSWORD}'.")
@@ -0,0 +1,30 @@
+# tyzox/management/commands/shard_stock.py
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tyzox.inventory import set_stock_shards
+from tyzox.models import Product
+
+
+class Command(BaseCommand):
+    help = (
+        'Reparte el stock de un producto muy demandado en varios contadores para que las reservas '
+        'simultáneas no esperen todas al mismo bloqueo. Con --shards 0 lo vuelve a juntar en el producto '
+        '(hazlo antes de editar a mano el stock de un producto repartido).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('slug', help='Slug del producto.')
+        parser.add_argument('--shards', type=int, required=True, help='Número de contadores (0 para deshacer el reparto).')
+
+    def handle(self, *args, **options):
+        if not 0 <= options['shards'] <= 64:
+            raise CommandError('--shards debe estar entre 0 y 64.')
+        product_id = Product.objects.filter(slug=options['slug']).values_list('id', flat=True).first()
+        if product_id is None:
+            raise CommandError(f"No existe el producto {options['slug']}.")
+        total = set_stock_shards(product_id, options['shards'])
+        if options['shards']:
+            self.stdout.write(self.style.SUCCESS(f"{total} unidades repartidas en {options['shards']} contadores."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'{total} unidades de nuevo en el producto.'))
@@ -0,0 +1,146 @@
+# tyzox/management/commands/stress_inventory.py
+
+import statistics
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+from django.db.models import Sum
+from django.utils import timezone
+
+from tyzox.cart import add_product
+from tyzox.checkout import CheckoutError, place_order
+from tyzox.inventory import StockError, reclaim_expired, set_stock_shards
+from tyzox.models import Category, OrderItem, Product, StockReservation, StockShard
+
+PREFIX = 'stress-inventory'
+
+
+class Command(BaseCommand):
+    help = (
+        'Prueba de concurrencia del inventario: varios hilos reservan y compran a la vez un mismo producto '
+        'con poco stock hasta agotarlo, algunos abandonan el carrito y sus reservas se recuperan al final. '
+        'Comprueba que no hay sobreventa ni unidades perdidas y mide la espera por bloqueos. '
+        'Úsalo contra PostgreSQL (SQLite serializa todas las escrituras).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=32)
+        parser.add_argument('--stock', type=int, default=500)
+        parser.add_argument('--shards', type=int, default=0, help='Contadores en que repartir el stock (0: una sola fila).')
+        parser.add_argument('--basket', type=int, default=2, help='Unidades que añade cada comprador antes de pagar.')
+        parser.add_argument('--abandon', type=float, default=0.2, help='Fracción de compradores que nunca pagan.')
+        parser.add_argument('--max-wait', type=float, help='Falla si alguna reserva tarda más de estos ms.')
+        parser.add_argument('--keep', action='store_true', help='No borra el producto ni los usuarios de prueba.')
+
+    def handle(self, *args, **options):
+        category, product, users = self._setup(options)
+        try:
+            self._run(product, users, options)
+        finally:
+            if not options['keep']:
+                User.objects.filter(username__startswith=f'{PREFIX}-').delete()
+                category.delete()
+
+    def _setup(self, options):
+        User.objects.filter(username__startswith=f'{PREFIX}-').delete()
+        Category.objects.filter(slug=PREFIX).delete()
+        category = Category.objects.create(name=PREFIX, slug=PREFIX)
+        product = Product.objects.create(
+            category=category, name='Producto muy demandado', slug=PREFIX, price=10, stock=options['stock'],
+        )
+        if options['shards']:
+            set_stock_shards(product.pk, options['shards'])
+            product.refresh_from_db()
+        users = User.objects.bulk_create([
+            User(username=f'{PREFIX}-{i}', email=f'{PREFIX}-{i}@example.com') for i in range(options['workers'])
+        ])
+        return category, product, users
+
+    def _run(self, product, users, options):
+        abandoners = int(len(users) * options['abandon'])
+        reserve_ms, checkout_ms = [], []
+        outcomes = Counter()
+        lock = threading.Lock()
+
+        def timed(samples, call):
+            start = time.perf_counter()
+            try:
+                call()
+                result = 'ok'
+            except (StockError, CheckoutError) as e:
+                result = 'busy' if e.status == 503 else 'sold_out'
+            except OperationalError:
+                result = 'db_error'
+            with lock:
+                samples.append((time.perf_counter() - start) * 1000)
+                outcomes[result] += 1
+            return result
+
+        def shopper(index):
+            user = users[index]
+            try:
+                while True:
+                    for _ in range(options['basket']):
+                        if timed(reserve_ms, lambda: add_product(user, product)) == 'sold_out':
+                            return
+                    if index < abandoners:
+                        # Abandona el carrito: sus reservas caducarán
+                        return
+                    if timed(checkout_ms, lambda: place_order(user)) == 'sold_out':
+                        return
+            finally:
+                connection.close()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(users)) as pool:
+            list(pool.map(shopper, range(len(users))))
+        elapsed = time.perf_counter() - start
+
+        initial = options['stock']
+        before = self._count(product)
+        # Caducamos a mano los carritos abandonados y los recuperamos como haría el cron
+        StockReservation.objects.filter(product=product).update(expires_at=timezone.now())
+        reclaimed = reclaim_expired()
+        after = self._count(product)
+
+        self.stdout.write(f'{len(users)} compradores ({abandoners} abandonan), stock {initial}, contadores {options["shards"]}, {elapsed:.2f} s')
+        self.stdout.write(f"resultados: {dict(outcomes)}")
+        self.stdout.write(f"vendidas {after['sold']}, reservadas al terminar {before['reserved']}, recuperadas {reclaimed} reservas")
+        self.stdout.write(f"reserva  ms: {self._summary(reserve_ms)}")
+        self.stdout.write(f"checkout ms: {self._summary(checkout_ms)}")
+
+        errors = []
+        if after['sold'] > initial:
+            errors.append(f"sobreventa: {after['sold']} vendidas de {initial}")
+        if before['sold'] + before['reserved'] + before['available'] != initial:
+            errors.append(f'unidades perdidas antes de recuperar: {before}')
+        if after['reserved'] or after['sold'] + after['available'] != initial:
+            errors.append(f'unidades perdidas tras recuperar: {after}')
+        if before['negative']:
+            errors.append('algún contador de stock quedó en negativo')
+        if options['max_wait'] and reserve_ms and max(reserve_ms) > options['max_wait']:
+            errors.append(f"una reserva esperó {max(reserve_ms):.1f} ms (límite {options['max_wait']} ms)")
+        if errors:
+            raise CommandError('; '.join(errors))
+        self.stdout.write(self.style.SUCCESS('Sin sobreventa y sin unidades perdidas.'))
+
+    def _count(self, product):
+        counters = list(StockShard.objects.filter(product=product).values_list('stock', flat=True))
+        available = sum(counters) if product.stock_shards else Product.objects.values_list('stock', flat=True).get(pk=product.pk)
+        return {
+            'sold': OrderItem.objects.filter(product=product).aggregate(n=Sum('quantity'))['n'] or 0,
+            'reserved': StockReservation.objects.filter(product=product).aggregate(n=Sum('quantity'))['n'] or 0,
+            'available': available,
+            'negative': available < 0 or any(stock < 0 for stock in counters),
+        }
+
+    def _summary(self, samples):
+        if not samples:
+            return '-'
+        quantiles = statistics.quantiles(samples, n=100) if len(samples) > 1 else samples * 99
+        return f'p50 {quantiles[49]:.1f}  p95 {quantiles[94]:.1f}  máx {max(samples):.1f}  ({len(samples)} llamadas)'
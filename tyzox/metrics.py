@@ -0,0 +1,128 @@
+# tyzox/metrics.py
+
+import threading
+from bisect import bisect_left
+
+# Límites superiores de los cubos de cada histograma (el cubo +Inf se añade solo)
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self.values = {}
+
+    def inc(self, labels=(), amount=1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        for labels, value in sorted(self.values.items()):
+            lines.append(f'{self.name}{_labels(self.labelnames, labels)} {_number(value)}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self.labelnames = labelnames
+        # Por combinación de etiquetas: [cuentas por cubo (no acumuladas), suma, total]
+        self.series = {}
+
+    def observe(self, value, labels=()):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        for labels, (counts, total, count) in sorted(self.series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += bucket_count
+                le = bound if bound == '+Inf' else _number(bound)
+                lines.append(f'{self.name}_bucket{_labels(self.labelnames, labels, [("le", le)])} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}')
+            lines.append(f'{self.name}_count{_labels(self.labelnames, labels)} {count}')
+        return lines
+
+
+class RequestMetrics:
+    """
+    Métricas agregadas de las peticiones de este proceso (como las
+    estadísticas de caché, cada worker lleva las suyas). La etiqueta `view`
+    es el nombre de la URL, no la ruta, para que el número de series no
+    crezca con los slugs o ids.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._build()
+
+    def _build(self):
+        self.requests = Counter('tyzox_requests_total', 'Peticiones atendidas.', ('view', 'method', 'status'))
+        self.duration = Histogram(
+            'tyzox_request_duration_seconds', 'Tiempo total de la petición.', DURATION_BUCKETS, ('view',),
+        )
+        self.queries = Histogram(
+            'tyzox_request_queries', 'Consultas SQL por petición.', QUERY_COUNT_BUCKETS, ('view',),
+        )
+        self.sql_duration = Histogram(
+            'tyzox_request_sql_seconds', 'Tiempo en SQL por petición.', DURATION_BUCKETS, ('view',),
+        )
+        self.n_plus_one = Counter(
+            'tyzox_request_n_plus_one_total', 'Peticiones que repiten la misma consulta (posible N+1).', ('view',),
+        )
+
+    def record(self, view, method, status, duration, query_count, sql_duration, repeated):
+        with self.lock:
+            self.requests.inc((view, method, f'{status // 100}xx'))
+            self.duration.observe(duration, (view,))
+            self.queries.observe(query_count, (view,))
+            self.sql_duration.observe(sql_duration, (view,))
+            if repeated:
+                self.n_plus_one.inc((view,))
+
+    def reset(self):
+        with self.lock:
+            self._build()
+
+    def render(self, extra=()):
+        """
+        Texto en el formato de exposición de Prometheus. `extra` son
+        métricas sueltas (nombre, tipo, ayuda, valor) que se añaden al final.
+        """
+        with self.lock:
+            lines = []
+            for metric in (self.requests, self.duration, self.queries, self.sql_duration, self.n_plus_one):
+                lines += metric.render()
+        for name, kind, help_text, value in extra:
+            if value is None:
+                continue
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}', f'{name} {_number(value)}']
+        return '\n'.join(lines) + '\n'
+
+
+request_metrics = RequestMetrics()
@@ -0,0 +1,186 @@
+# tyzox/middleware.py
+
+import logging
+import mimetypes
+import os
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse
+from django.utils._os import safe_join
+
+from .metrics import request_metrics
+
+logger = logging.getLogger('tyzox.performance')
+
+# Consultas de la petición en curso. Es una ContextVar y no un atributo del
+# hilo para que también cuente lo que las vistas asíncronas ejecutan con
+# sync_to_async (asgiref copia el contexto al hilo que ejecuta el ORM).
+_current_queries = ContextVar('tyzox_current_queries', default=None)
+
+
+class QueryLog:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def repeated(self):
+        # La misma sentencia (mismo SQL, otros parámetros) muchas veces en
+        # una petición suele ser un bucle que consulta fila a fila (N+1)
+        return [(sql, times) for sql, times in self.statements.items() if times >= settings.N_PLUS_ONE_THRESHOLD]
+
+
+def record_query(execute, sql, params, many, context):
+    queries = _current_queries.get()
+    if queries is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        queries.count += 1
+        queries.duration += time.perf_counter() - start
+        queries.statements[sql] += 1
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    # Receptor de connection_created: cada conexión nueva pasa sus consultas
+    # por record_query (fuera de una petición no hace nada)
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class PerformanceMiddleware:
+    """
+    Mide cada petición: tiempo total, número de consultas SQL y tiempo en
+    SQL, y marca las que repiten una misma consulta (posible N+1). Los datos
+    se agregan por vista en tyzox.metrics y se publican en metrics_view.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        queries = QueryLog()
+        token = _current_queries.set(queries)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_queries.reset(token)
+        self._record(request, response, time.perf_counter() - start, queries)
+        return response
+
+    async def __acall__(self, request):
+        queries = QueryLog()
+        token = _current_queries.set(queries)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_queries.reset(token)
+        self._record(request, response, time.perf_counter() - start, queries)
+        return response
+
+    def _record(self, request, response, duration, queries):
+        match = request.resolver_match
+        view = (match.view_name if match else None) or 'unresolved'
+        repeated = queries.repeated()
+        request_metrics.record(
+            view, request.method, response.status_code, duration, queries.count, queries.duration, bool(repeated),
+        )
+        for sql, times in repeated:
+            logger.warning('Posible N+1 en %s: %d ejecuciones de %s', view, times, sql)
+
+
+# Orden de preferencia de las copias precomprimidas que genera collectstatic
+PRECOMPRESSED_ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+def accepted_encodings(header):
+    # "gzip, br;q=0.5, deflate;q=0" -> {'gzip', 'br', 'deflate'} sin los de q=0
+    accepted = set()
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        quality = params.strip()
+        if quality.startswith('q=') and quality[2:].strip() in ('0', '0.0', '0.00', '0.000'):
+            continue
+        if coding:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+class PrecompressedStaticMiddleware:
+    """
+    Sirve los archivos de STATIC_ROOT generados por collectstatic con
+    tyzox.storage.MinifiedManifestStaticFilesStorage: elige la copia .br o
+    .gz según Accept-Encoding y, si el nombre lleva hash de contenido, la
+    marca como inmutable durante un año. En desarrollo runserver sirve los
+    estáticos antes de llegar aquí.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        self._hashed_names = None
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return self._serve(request) or self.get_response(request)
+
+    async def __acall__(self, request):
+        return self._serve(request) or await self.get_response(request)
+
+    def _is_hashed(self, name):
+        if self._hashed_names is None:
+            self._hashed_names = set(getattr(staticfiles_storage, 'hashed_files', {}).values())
+        return name in self._hashed_names
+
+    def _serve(self, request):
+        if not settings.STATIC_ROOT or request.method not in ('GET', 'HEAD'):
+            return None
+        if not request.path.startswith(settings.STATIC_URL):
+            return None
+        name = request.path[len(settings.STATIC_URL):]
+        try:
+            path = safe_join(settings.STATIC_ROOT, name)
+        except SuspiciousFileOperation:
+            return None
+        if not os.path.isfile(path):
+            return None
+        content_type, _ = mimetypes.guess_type(path)
+        content_type = content_type or 'application/octet-stream'
+        if content_type.startswith('text/') or content_type.endswith(('javascript', 'json', 'xml')):
+            content_type += '; charset=utf-8'
+        encoding = None
+        accepted = accepted_encodings(request.headers.get('Accept-Encoding', ''))
+        for coding, suffix in PRECOMPRESSED_ENCODINGS:
+            if coding in accepted and os.path.isfile(path + suffix):
+                encoding, path = coding, path + suffix
+                break
+        response = FileResponse(open(path, 'rb'), content_type=content_type)
+        response.headers.pop('Content-Disposition', None)
+        if encoding:
+            response['Content-Encoding'] = encoding
+        response['Vary'] = 'Accept-Encoding'
+        response['Cache-Control'] = IMMUTABLE_CACHE_CONTROL if self._is_hashed(name) else 'no-cache'
+        return response
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.4 on 2026-10-18 13:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tyzox', '0003_alter_category_options_product_slug'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='product',
+            name='slug',
+            field=models.SlugField(help_text='Versión amigable para URL (ej: guantes-profesionales-everlast)', max_length=200, unique=True),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['is_available', 'name', 'id'], name='product_catalog_idx'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.4 on 2026-10-18 13:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def copy_related_products(apps, schema_editor):
+    # Las relaciones existentes (M2M simétrica, ya guardada en ambos sentidos)
+    # pasan a ser aristas con peso 1.
+    Product = apps.get_model('tyzox', 'Product')
+    CoPurchase = apps.get_model('tyzox', 'CoPurchase')
+    through = Product.related_products.through
+    pairs = through.objects.using(schema_editor.connection.alias).values_list('from_product_id', 'to_product_id')
+    CoPurchase.objects.using(schema_editor.connection.alias).bulk_create(
+        (CoPurchase(product_id=a, related_id=b, weight=1) for a, b in pairs.iterator()),
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tyzox', '0004_product_catalog_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CoPurchase',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weight', models.PositiveIntegerField(default=0, verbose_name='Veces Comprados Juntos')),
+                ('product', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='co_purchases', to='tyzox.product', verbose_name='Producto')),
+                ('related', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='co_purchased_with', to='tyzox.product', verbose_name='Comprado Junto Con')),
+            ],
+            options={
+                'verbose_name': 'Compra Conjunta',
+                'verbose_name_plural': 'Compras Conjuntas',
+                'indexes': [models.Index(fields=['product', '-weight'], name='copurchase_rank_idx')],
+                'constraints': [models.UniqueConstraint(fields=('product', 'related'), name='copurchase_unique_pair')],
+            },
+        ),
+        migrations.RunPython(copy_related_products, migrations.RunPython.noop),
+    ]
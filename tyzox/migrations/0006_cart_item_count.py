@@ -0,0 +1,33 @@
+# Generated by Django 5.2.4 on 2026-10-18 13:28
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def fill_item_count(apps, schema_editor):
+    Cart = apps.get_model('tyzox', 'Cart')
+    CartItem = apps.get_model('tyzox', 'CartItem')
+    quantities = (
+        CartItem.objects.filter(cart=OuterRef('pk'))
+        .values('cart')
+        .annotate(total=Sum('quantity'))
+        .values('total')
+    )
+    Cart.objects.using(schema_editor.connection.alias).update(item_count=Coalesce(Subquery(quantities), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tyzox', '0005_copurchase'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cart',
+            name='item_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Unidades en el Carrito'),
+        ),
+        migrations.RunPython(fill_item_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.4 on 2026-10-18 13:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tyzox', '0006_cart_item_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategorySalesDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Fecha')),
+                ('units', models.PositiveIntegerField(default=0, verbose_name='Unidades Vendidas')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Ingresos')),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='tyzox.category', verbose_name='Categoría')),
+            ],
+            options={
+                'verbose_name': 'Venta Diaria por Categoría',
+                'verbose_name_plural': 'Ventas Diarias por Categoría',
+                'constraints': [models.UniqueConstraint(fields=('date', 'category'), name='category_sales_daily_unique')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductSalesDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Fecha')),
+                ('units', models.PositiveIntegerField(default=0, verbose_name='Unidades Vendidas')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Ingresos')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='tyzox.product', verbose_name='Producto')),
+            ],
+            options={
+                'verbose_name': 'Venta Diaria por Producto',
+                'verbose_name_plural': 'Ventas Diarias por Producto',
+                'constraints': [models.UniqueConstraint(fields=('date', 'product'), name='product_sales_daily_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,78 @@
+from django.db import migrations
+
+# Copia fija del SQL de `tyzox.search` en el momento de esta migración: si el
+# módulo cambia más adelante, esta migración debe seguir aplicando lo mismo.
+POSTGRES_SQL = [
+    """
+    ALTER TABLE tyzox_product ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('spanish', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('spanish', coalesce(description, '')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS product_search_idx ON tyzox_product USING gin (search_vector)",
+]
+
+SQLITE_SQL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS tyzox_product_fts USING fts5(
+        name, description, content='tyzox_product', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS tyzox_product_fts_ai AFTER INSERT ON tyzox_product BEGIN
+        INSERT INTO tyzox_product_fts(rowid, name, description) VALUES (new.id, new.name, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS tyzox_product_fts_ad AFTER DELETE ON tyzox_product BEGIN
+        INSERT INTO tyzox_product_fts(tyzox_product_fts, rowid, name, description) VALUES ('delete', old.id, old.name, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS tyzox_product_fts_au AFTER UPDATE OF name, description ON tyzox_product BEGIN
+        INSERT INTO tyzox_product_fts(tyzox_product_fts, rowid, name, description) VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO tyzox_product_fts(rowid, name, description) VALUES (new.id, new.name, new.description);
+    END
+    """,
+    "INSERT INTO tyzox_product_fts(tyzox_product_fts) VALUES ('rebuild')",
+]
+
+POSTGRES_REVERSE_SQL = [
+    'DROP INDEX IF EXISTS product_search_idx',
+    'ALTER TABLE tyzox_product DROP COLUMN IF EXISTS search_vector',
+]
+
+SQLITE_REVERSE_SQL = [
+    'DROP TRIGGER IF EXISTS tyzox_product_fts_ai',
+    'DROP TRIGGER IF EXISTS tyzox_product_fts_ad',
+    'DROP TRIGGER IF EXISTS tyzox_product_fts_au',
+    'DROP TABLE IF EXISTS tyzox_product_fts',
+]
+
+
+def _run(schema_editor, statements):
+    for sql in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+def install(apps, schema_editor):
+    _run(schema_editor, {'postgresql': POSTGRES_SQL, 'sqlite': SQLITE_SQL})
+
+
+def uninstall(apps, schema_editor):
+    _run(schema_editor, {'postgresql': POSTGRES_REVERSE_SQL, 'sqlite': SQLITE_REVERSE_SQL})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tyzox', '0008_order_created_idx'),
+    ]
+
+    operations = [
+        # El índice depende del motor (tsvector + GIN en PostgreSQL, FTS5 en
+        # SQLite) y no forma parte del modelo, así que se crea con SQL propio.
+        migrations.RunPython(install, uninstall),
+    ]
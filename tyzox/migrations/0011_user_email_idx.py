@@ -0,0 +1,18 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tyzox', '0010_product_stock_idx'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        # auth_user pertenece a django.contrib.auth, así que el índice para el
+        # login por email (tyzox.backends.EmailBackend) se crea con SQL propio.
+        migrations.RunSQL(
+            'CREATE INDEX IF NOT EXISTS tyzox_user_email_idx ON auth_user (email)',
+            'DROP INDEX IF EXISTS tyzox_user_email_idx',
+        ),
+    ]
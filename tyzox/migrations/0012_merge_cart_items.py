@@ -0,0 +1,40 @@
+# Generated by Django 5.2.4 on 2026-10-18 13:38
+
+from django.db import migrations
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicate_items(apps, schema_editor):
+    # Antes de la restricción única: las líneas repetidas de un mismo
+    # producto se suman en la más antigua.
+    CartItem = apps.get_model('tyzox', 'CartItem')
+    items = CartItem.objects.using(schema_editor.connection.alias)
+    duplicates = (
+        items.values('cart', 'product')
+        .annotate(lines=Count('id'), first_id=Min('id'), total=Sum('quantity'))
+        .filter(lines__gt=1)
+    )
+    for row in duplicates:
+        items.filter(pk=row['first_id']).update(quantity=row['total'])
+        items.filter(cart=row['cart'], product=row['product']).exclude(pk=row['first_id']).delete()
+
+
+def delete_empty_carts(apps, schema_editor):
+    # Los carritos ya no se crean al registrarse: quitamos los que nunca se usaron
+    Cart = apps.get_model('tyzox', 'Cart')
+    Cart.objects.using(schema_editor.connection.alias).filter(items__isnull=True).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tyzox', '0011_user_email_idx'),
+    ]
+
+    # Los datos se limpian en una migración aparte: PostgreSQL no permite
+    # alterar la tabla en la misma transacción que acaba de borrar filas
+    # con claves foráneas diferidas.
+    operations = [
+        migrations.RunPython(merge_duplicate_items, migrations.RunPython.noop),
+        migrations.RunPython(delete_empty_carts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.4 on 2026-10-18 14:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Max, Min
+
+
+def fill_category_facets(apps, schema_editor):
+    # Facetas iniciales de todas las categorías
+    Category = apps.get_model('tyzox', 'Category')
+    CategoryFacet = apps.get_model('tyzox', 'CategoryFacet')
+    Product = apps.get_model('tyzox', 'Product')
+    alias = schema_editor.connection.alias
+    totals = {
+        row['category']: row
+        for row in Product.objects.using(alias).filter(is_available=True)
+        .values('category').annotate(count=Count('id'), low=Min('price'), high=Max('price')).order_by()
+    }
+    CategoryFacet.objects.using(alias).bulk_create([
+        CategoryFacet(
+            category_id=pk,
+            product_count=totals.get(pk, {}).get('count', 0),
+            min_price=totals.get(pk, {}).get('low'),
+            max_price=totals.get(pk, {}).get('high'),
+        )
+        for pk in Category.objects.using(alias).values_list('pk', flat=True)
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tyzox', '0017_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryFacet',
+            fields=[
+                ('category', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='facet', serialize=False, to='tyzox.category', verbose_name='Categoría')),
+                ('product_count', models.PositiveIntegerField(default=0, verbose_name='Productos Disponibles')),
+                ('min_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='Precio Mínimo')),
+                ('max_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='Precio Máximo')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['category', 'is_available', 'price', 'id'], name='product_category_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['category', 'is_available', 'name', 'id'], name='product_category_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['is_available', 'price', 'id'], name='product_price_idx'),
+        ),
+        migrations.RunPython(fill_category_facets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.4 on 2026-10-18 14:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tyzox', '0019_order_history_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductNeighbour',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField(verbose_name='Posición')),
+                ('score', models.FloatField(verbose_name='Similitud')),
+                ('neighbour', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='neighbour_of', to='tyzox.product', verbose_name='Vecino')),
+                ('product', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='neighbours', to='tyzox.product', verbose_name='Producto')),
+            ],
+            options={
+                'verbose_name': 'Producto Similar',
+                'verbose_name_plural': 'Productos Similares',
+                'constraints': [models.UniqueConstraint(fields=('product', 'rank'), name='productneighbour_product_rank')],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.4 on 2026-10-18 14:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tyzox', '0020_product_neighbours'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProcessedOrder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order_id', models.BigIntegerField(verbose_name='Orden')),
+                ('kind', models.CharField(max_length=100, verbose_name='Tarea')),
+                ('processed_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('order_id', 'kind'), name='processedorder_unique_order_kind')],
+            },
+        ),
+    ]
@@ -2,14 +2,17 @@
 
 from django.db import models
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, m2m_changed
 from django.dispatch import receiver
 from django.urls import reverse
-from itertools import combinations
+from django.utils import timezone
+from .cache import bump_catalog_version
 
 class Category(models.Model):
     name = models.CharField(max_length=100, unique=True, verbose_name="Nombre de Categoría")
     slug = models.SlugField(max_length=100, unique=True, help_text="Versión del nombre amigable para URLs")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Última Modificación")
     class Meta:
         verbose_name = "Categoría"
         verbose_name_plural = "Categorías"
@@ -24,44 +27,163 @@ class Product(models.Model):
     description = models.TextField(verbose_name="Descripción", blank=True, null=True)
     price = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="Precio")
     image_url = models.URLField(max_length=1024, blank=True, null=True, verbose_name="URL de la Imagen")
+    # Imagen subida a MEDIA_ROOT; si existe tiene prioridad sobre image_url.
+    # Sus miniaturas (JPEG y WebP por ancho) las genera tyzox.images.
+    image = models.ImageField(upload_to='products/originals/', blank=True, null=True, verbose_name="Imagen")
+    image_variants = models.JSONField(default=dict, blank=True, editable=False, verbose_name="Miniaturas")
+    # Unidades disponibles: las reservadas en carritos ya están descontadas.
+    # Con stock_shards > 0 el stock real vive en StockShard y este campo es
+    # el total sincronizado periódicamente (manage.py reclaim_reservations).
     stock = models.PositiveIntegerField(default=0, verbose_name="Inventario")
+    stock_shards = models.PositiveSmallIntegerField(default=0, verbose_name="Contadores de Stock Repartidos")
     is_available = models.BooleanField(default=True, verbose_name="Está Disponible")
     related_products = models.ManyToManyField('self', blank=True, symmetrical=True, verbose_name="Productos Relacionados")
+    # Last-Modified de las páginas del catálogo (las operaciones en bloque lo fijan a mano)
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Última Modificación")
     class Meta:
         verbose_name = "Producto"
         verbose_name_plural = "Productos"
         ordering = ['name']
+        indexes = [
+            # Soporta la paginación por cursor (name, id) del catálogo público
+            models.Index(fields=['is_available', 'name', 'id'], name='product_catalog_idx'),
+            # Filtro de stock bajo y ordenación por stock en el dashboard
+            models.Index(fields=['stock', 'id'], name='product_stock_idx'),
+            # Catálogo filtrado por categoría y rango de precio, ordenado por
+            # precio o por nombre, y agregados de CategoryFacet
+            models.Index(fields=['category', 'is_available', 'price', 'id'], name='product_category_price_idx'),
+            models.Index(fields=['category', 'is_available', 'name', 'id'], name='product_category_name_idx'),
+            models.Index(fields=['is_available', 'price', 'id'], name='product_price_idx'),
+        ]
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Categoría con la que se cargó, para refrescar también sus facetas
+        # si el producto se mueve a otra (ver refresh_product_facets)
+        instance._loaded_category_id = instance.__dict__.get('category_id')
+        return instance
     def __str__(self):
         return self.name
     def get_absolute_url(self):
         return reverse('product_detail', kwargs={'product_slug': self.slug})
 
+class CategoryFacet(models.Model):
+    # Resumen precalculado de los productos disponibles de cada categoría
+    # (tarjetas de la portada y filtros del catálogo). Lo mantienen las
+    # señales de Product y manage.py rebuild_facets tras operaciones en bloque.
+    category = models.OneToOneField(Category, primary_key=True, related_name='facet', on_delete=models.CASCADE, verbose_name="Categoría")
+    product_count = models.PositiveIntegerField(default=0, verbose_name="Productos Disponibles")
+    min_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, verbose_name="Precio Mínimo")
+    max_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, verbose_name="Precio Máximo")
+    def __str__(self):
+        return f"{self.category_id}: {self.product_count}"
+
+class CoPurchase(models.Model):
+    # Arista dirigida del grafo "comprados juntos": weight cuenta cuántas
+    # órdenes contienen ambos productos.
+    product = models.ForeignKey(Product, related_name='co_purchases', on_delete=models.CASCADE, db_index=False, verbose_name="Producto")
+    related = models.ForeignKey(Product, related_name='co_purchased_with', on_delete=models.CASCADE, verbose_name="Comprado Junto Con")
+    weight = models.PositiveIntegerField(default=0, verbose_name="Veces Comprados Juntos")
+    class Meta:
+        verbose_name = "Compra Conjunta"
+        verbose_name_plural = "Compras Conjuntas"
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'related'], name='copurchase_unique_pair'),
+        ]
+        indexes = [
+            models.Index(fields=['product', '-weight'], name='copurchase_rank_idx'),
+        ]
+    def __str__(self):
+        return f"{self.product_id} -> {self.related_id} ({self.weight})"
+
+class ProductNeighbour(models.Model):
+    # Vecinos precalculados por manage.py build_recommendations: los top-K
+    # productos más parecidos según el historial de órdenes (rank 0 primero).
+    product = models.ForeignKey(Product, related_name='neighbours', on_delete=models.CASCADE, db_index=False, verbose_name="Producto")
+    neighbour = models.ForeignKey(Product, related_name='neighbour_of', on_delete=models.CASCADE, verbose_name="Vecino")
+    rank = models.PositiveSmallIntegerField(verbose_name="Posición")
+    score = models.FloatField(verbose_name="Similitud")
+    class Meta:
+        verbose_name = "Producto Similar"
+        verbose_name_plural = "Productos Similares"
+        constraints = [
+            # También es el índice con el que la ficha lee los vecinos en orden
+            models.UniqueConstraint(fields=['product', 'rank'], name='productneighbour_product_rank'),
+        ]
+    def __str__(self):
+        return f"{self.product_id} -> {self.neighbour_id} ({self.score:.3f})"
+
 class Cart(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, verbose_name="Usuario")
     created_at = models.DateTimeField(auto_now_add=True)
+    # Unidades totales en el carrito, mantenido por las vistas del carrito y
+    # el checkout para pintar el contador sin leer las líneas.
+    item_count = models.PositiveIntegerField(default=0, verbose_name="Unidades en el Carrito")
     def __str__(self):
         return f"Carrito de {self.user.username}"
-    @property
-    def total(self):
-        return sum(item.subtotal for item in self.items.all())
-    @property
-    def item_count(self):
-        return sum(item.quantity for item in self.items.all())
+    def recount(self):
+        # Recalcula item_count desde las líneas (p. ej. tras editarlas en el admin)
+        self.item_count = self.items.aggregate(total=models.Sum('quantity'))['total'] or 0
+        self.save(update_fields=['item_count'])
 
 class CartItem(models.Model):
     cart = models.ForeignKey(Cart, related_name='items', on_delete=models.CASCADE, verbose_name="Carrito")
     product = models.ForeignKey(Product, on_delete=models.CASCADE, verbose_name="Producto")
     quantity = models.PositiveIntegerField(default=1, verbose_name="Cantidad")
+    class Meta:
+        constraints = [
+            # Una línea por producto: permite fusionar carritos con un upsert
+            models.UniqueConstraint(fields=['cart', 'product'], name='cartitem_unique_product'),
+        ]
     def __str__(self):
         return f"{self.quantity} x {self.product.name} en {self.cart}"
     @property
     def subtotal(self):
         return self.quantity * self.product.price
 
+class StockShard(models.Model):
+    # Parte del stock de un producto muy demandado: repartido en varias filas,
+    # las reservas concurrentes no esperan todas al mismo bloqueo.
+    product = models.ForeignKey(Product, related_name='stock_counters', on_delete=models.CASCADE, verbose_name="Producto")
+    shard = models.PositiveSmallIntegerField(verbose_name="Contador")
+    stock = models.PositiveIntegerField(default=0, verbose_name="Inventario")
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'shard'], name='stockshard_unique_product_shard'),
+        ]
+    def __str__(self):
+        return f"{self.product_id}#{self.shard}: {self.stock}"
+
+class StockReservation(models.Model):
+    # Unidades apartadas para un carrito hasta expires_at. El stock ya se
+    # descontó al reservar: el checkout solo borra la reserva y, si caduca,
+    # reclaim_reservations devuelve las unidades.
+    cart = models.ForeignKey(Cart, related_name='reservations', null=True, on_delete=models.SET_NULL, verbose_name="Carrito")
+    product = models.ForeignKey(Product, related_name='reservations', on_delete=models.CASCADE, verbose_name="Producto")
+    shard = models.PositiveSmallIntegerField(null=True, blank=True, verbose_name="Contador")
+    quantity = models.PositiveIntegerField(verbose_name="Cantidad")
+    expires_at = models.DateTimeField(verbose_name="Caduca")
+    class Meta:
+        indexes = [
+            models.Index(fields=['expires_at'], name='reservation_expires_idx'),
+        ]
+    def __str__(self):
+        return f"{self.quantity} x {self.product_id} hasta {self.expires_at:%H:%M}"
+
 class Order(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name="Usuario")
     created_at = models.DateTimeField(auto_now_add=True)
     total_price = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="Precio Total")
+    class Meta:
+        indexes = [
+            # Exportaciones y filtros por rango de fechas
+            models.Index(fields=['created_at'], name='order_created_idx'),
+            # Historial de pedidos del cliente (paginación por cursor en
+            # tyzox.orders); total_price incluido para leer solo del índice
+            models.Index(
+                fields=['user', '-created_at', '-id'], include=['total_price'], name='order_user_history_idx',
+            ),
+        ]
     def __str__(self):
         return f"Orden #{self.id} de {self.user.username}"
 
@@ -73,7 +195,108 @@ class OrderItem(models.Model):
     def __str__(self):
         return f"{self.quantity} x {self.product.name} en Orden #{self.order.id}"
 
-@receiver(post_save, sender=User)
-def create_user_cart(sender, instance, created, **kwargs):
+class ProductSalesDaily(models.Model):
+    # Resumen diario de ventas por producto, actualizado en cada checkout
+    date = models.DateField(verbose_name="Fecha")
+    product = models.ForeignKey(Product, related_name='daily_sales', on_delete=models.CASCADE, verbose_name="Producto")
+    units = models.PositiveIntegerField(default=0, verbose_name="Unidades Vendidas")
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Ingresos")
+    class Meta:
+        verbose_name = "Venta Diaria por Producto"
+        verbose_name_plural = "Ventas Diarias por Producto"
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'product'], name='product_sales_daily_unique'),
+        ]
+    def __str__(self):
+        return f"{self.date} {self.product_id}: {self.units}"
+
+class CategorySalesDaily(models.Model):
+    # Resumen diario de ventas por categoría, actualizado en cada checkout
+    date = models.DateField(verbose_name="Fecha")
+    category = models.ForeignKey(Category, related_name='daily_sales', on_delete=models.CASCADE, verbose_name="Categoría")
+    units = models.PositiveIntegerField(default=0, verbose_name="Unidades Vendidas")
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Ingresos")
+    class Meta:
+        verbose_name = "Venta Diaria por Categoría"
+        verbose_name_plural = "Ventas Diarias por Categoría"
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'category'], name='category_sales_daily_unique'),
+        ]
+    def __str__(self):
+        return f"{self.date} {self.category_id}: {self.units}"
+
+class Job(models.Model):
+    # Tarea en segundo plano (tyzox.jobs) que ejecuta manage.py run_jobs.
+    # Las terminadas se conservan JOB_RETENTION_HOURS para las estadísticas.
+    QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'En cola'),
+        (RUNNING, 'En ejecución'),
+        (DONE, 'Terminada'),
+        (FAILED, 'Fallida'),
+    ]
+    name = models.CharField(max_length=100, verbose_name="Tarea")
+    payload = models.JSONField(default=dict, verbose_name="Argumentos")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED, verbose_name="Estado")
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name="Intentos")
+    run_after = models.DateTimeField(default=timezone.now, verbose_name="Ejecutar Desde")
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, verbose_name="Último Error")
+    class Meta:
+        indexes = [
+            # El worker reclama las tareas en cola más antiguas ya vencidas
+            models.Index(fields=['status', 'run_after'], name='job_claim_idx'),
+        ]
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
+
+class ProcessedOrder(models.Model):
+    # Marca de que una tarea por orden (record_sales, record_co_purchases) ya
+    # sumó esa orden: la cola entrega "al menos una vez" y un reintento no
+    # debe sumarla dos veces. Sin FK: la marca de una orden borrada no molesta.
+    order_id = models.BigIntegerField(verbose_name="Orden")
+    kind = models.CharField(max_length=100, verbose_name="Tarea")
+    processed_at = models.DateTimeField(auto_now_add=True)
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['order_id', 'kind'], name='processedorder_unique_order_kind'),
+        ]
+    def __str__(self):
+        return f"{self.kind} #{self.order_id}"
+
+@receiver(post_save, sender=Product)
+def process_product_image(sender, instance, **kwargs):
+    # Las miniaturas se generan en segundo plano cuando cambia la imagen subida
+    from .images import schedule_product_variants
+    if instance.image and instance.image_variants.get('source') != instance.image.name:
+        schedule_product_variants(instance.pk)
+    elif not instance.image and instance.image_variants:
+        Product.objects.filter(pk=instance.pk).update(image_variants={})
+
+# Cualquier cambio en productos o categorías invalida la caché del catálogo.
+# El incremento se hace al confirmar la transacción para que ninguna petición
+# concurrente vuelva a cachear datos antiguos bajo la versión nueva.
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_catalog_cache(sender, **kwargs):
+    transaction.on_commit(bump_catalog_version)
+
+# Las facetas de la categoría (y de la anterior si el producto cambió de
+# categoría) se recalculan al confirmar, con lo que ya ven los demás procesos
+@receiver([post_save, post_delete], sender=Product)
+def refresh_product_facets(sender, instance, **kwargs):
+    from .facets import schedule_facet_refresh
+    schedule_facet_refresh({instance.category_id, getattr(instance, '_loaded_category_id', None)} - {None})
+    instance._loaded_category_id = instance.category_id
+
+@receiver(post_save, sender=Category)
+def create_category_facet(sender, instance, created, **kwargs):
     if created:
-        Cart.objects.create(user=instance)
+        CategoryFacet.objects.get_or_create(category=instance)
+
+@receiver(m2m_changed, sender=Product.related_products.through)
+def invalidate_catalog_cache_on_relations(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        transaction.on_commit(bump_catalog_version)
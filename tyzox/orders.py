@@ -0,0 +1,50 @@
+# tyzox/orders.py
+
+from collections import defaultdict
+
+from .models import Order, OrderItem
+from .pagination import keyset_page
+
+ORDER_HISTORY_PAGE_SIZE = 10
+# Mismo orden que el índice order_user_history_idx
+ORDER_HISTORY_ORDERING = ('-created_at', '-id')
+
+
+def order_history_page(user, cursor=None, limit=ORDER_HISTORY_PAGE_SIZE):
+    """
+    Pedidos del usuario, del más reciente al más antiguo, paginados por
+    cursor sobre (created_at, id). Siempre dos consultas, tenga el usuario
+    diez pedidos o diez mil: la página de órdenes (un rango del índice) y
+    todas sus líneas con el nombre del producto en un JOIN.
+    """
+    orders, next_cursor = keyset_page(
+        Order.objects.filter(user=user).values('id', 'created_at', 'total_price'),
+        ORDER_HISTORY_ORDERING, cursor, limit,
+    )
+    items = defaultdict(list)
+    if orders:
+        rows = (
+            OrderItem.objects.filter(order_id__in=[order['id'] for order in orders])
+            .values('order_id', 'product_id', 'product__name', 'product__slug', 'quantity', 'price')
+            .order_by('order_id', 'id')
+        )
+        for row in rows:
+            items[row['order_id']].append({
+                'product_id': row['product_id'],
+                'name': row['product__name'],
+                'slug': row['product__slug'],
+                'quantity': row['quantity'],
+                'price': str(row['price']),
+            })
+    return {
+        'orders': [
+            {
+                'id': order['id'],
+                'created_at': order['created_at'].isoformat(),
+                'total_price': str(order['total_price']),
+                'items': items[order['id']],
+            }
+            for order in orders
+        ],
+        'next_cursor': next_cursor,
+    }
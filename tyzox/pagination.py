@@ -0,0 +1,108 @@
+# tyzox/pagination.py
+
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+DEFAULT_PAGE_SIZE = 24
+MAX_PAGE_SIZE = 100
+
+
+class PaginationError(ValueError):
+    pass
+
+
+def parse_limit(value, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    # Convierte el parámetro ?limit= en un entero dentro de [1, maximum]
+    if value in (None, ''):
+        return default
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        raise PaginationError('El parámetro limit debe ser un número entero.')
+    return max(1, min(limit, maximum))
+
+
+def _cursor_value(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if isinstance(value, (int, str)) or value is None:
+        return value
+    return str(value)
+
+
+def encode_cursor(values):
+    raw = json.dumps([_cursor_value(v) for v in values], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor, size):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise PaginationError('Cursor inválido.')
+    if not isinstance(values, list) or len(values) != size:
+        raise PaginationError('Cursor inválido.')
+    return values
+
+
+def cursor_values(model, ordering, values):
+    """
+    Convierte los valores de un cursor al tipo de cada campo del orden. El
+    cursor viene del cliente: si alguno no encaja (texto en un precio o un
+    id, una fecha mal formada, un nulo) es un PaginationError y no un error
+    de la base de datos.
+    """
+    converted = []
+    for field, value in zip(ordering, values):
+        try:
+            if value is None or isinstance(value, (list, dict, bool)):
+                raise ValueError
+            converted.append(model._meta.get_field(field.lstrip('-')).to_python(value))
+        except (ValidationError, TypeError, ValueError):
+            raise PaginationError('Cursor inválido.')
+    return converted
+
+
+def keyset_filter(ordering, values):
+    """
+    Construye la condición "fila > cursor" para un orden compuesto, p. ej.
+    ('name', 'id') -> name > v0 OR (name = v0 AND id > v1).
+    Los campos con prefijo '-' se recorren en orden descendente.
+    """
+    condition = Q()
+    for i, field in enumerate(ordering):
+        name = field.lstrip('-')
+        lookup = '__lt' if field.startswith('-') else '__gt'
+        step = Q(**{name + lookup: values[i]})
+        for previous, value in zip(ordering[:i], values[:i]):
+            step &= Q(**{previous.lstrip('-'): value})
+        condition |= step
+    return condition
+
+
+def _row_value(row, field):
+    if isinstance(row, dict):
+        return row[field]
+    return getattr(row, field)
+
+
+def keyset_page(queryset, ordering, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    Pagina por clave (keyset) en lugar de OFFSET: cada página es un rango
+    del índice, así que el coste no crece con la profundidad de la página.
+    El último campo de `ordering` debe ser único (normalmente 'id') y
+    ninguno puede ser nulo. Devuelve (filas, siguiente_cursor).
+    """
+    if cursor:
+        values = cursor_values(queryset.model, ordering, decode_cursor(cursor, len(ordering)))
+        queryset = queryset.filter(keyset_filter(ordering, values))
+    rows = list(queryset.order_by(*ordering)[:limit + 1])
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([_row_value(rows[-1], f.lstrip('-')) for f in ordering])
+    return rows, next_cursor
@@ -0,0 +1,186 @@
+# tyzox/recommendations.py
+
+from datetime import timedelta
+from itertools import permutations
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+
+from .bulk import batched, bulk_increment
+from .cache import bump_related_version
+from .jobs import first_time, job
+from .models import CoPurchase, Order, OrderItem, Product, ProductNeighbour
+
+METRICS = ('cosine', 'confidence')
+# Órdenes muy grandes (pedidos de tienda, pruebas) generan k² pares y no dicen
+# nada de qué se compra junto: se ignoran al construir los vecinos
+MAX_BASKET_SIZE = 50
+WRITE_BATCH_SIZE = 2000
+
+
+@job('record_co_purchases')
+@transaction.atomic
+def record_co_purchases(product_ids, order_id=None):
+    """
+    Suma 1 al peso de cada par de productos distintos de una misma orden.
+    Se guardan las dos direcciones (a, b) y (b, a) para que la ficha de un
+    producto lea sus relacionados con una sola consulta indexada. Con
+    `order_id` una orden ya sumada (tarea repetida) se ignora.
+    """
+    if order_id is not None and not first_time('record_co_purchases', order_id):
+        return
+    ids = sorted(set(product_ids))
+    rows = [(a, b, 1) for a, b in permutations(ids, 2)]
+    bulk_increment(CoPurchase, ('product', 'related'), ('weight',), rows)
+    # Cambia el orden de los relacionados de estos productos: nuevo ETag
+    transaction.on_commit(lambda: bump_related_version(ids))
+
+
+def _order_batches(batch_size, since=None):
+    """
+    Recorre el historial por lotes de órdenes (cursor sobre Order.id) y
+    devuelve para cada uno arrays paralelos (orden, producto, fecha de la
+    orden en segundos) de sus líneas, ordenados por orden.
+    """
+    orders = Order.objects.order_by('id')
+    if since is not None:
+        orders = orders.filter(created_at__gte=since)
+    last_id = 0
+    while True:
+        batch = list(orders.filter(id__gt=last_id).values_list('id', 'created_at')[:batch_size])
+        if not batch:
+            return
+        last_id = batch[-1][0]
+        created = {order_id: created_at.timestamp() for order_id, created_at in batch}
+        # Un rango del índice de order_id en lugar de un IN con miles de ids;
+        # con `since` el rango puede traer órdenes anteriores, que se descartan
+        items = np.array(
+            OrderItem.objects.filter(order_id__gte=batch[0][0], order_id__lte=last_id)
+            .order_by('order_id').values_list('order_id', 'product_id'),
+            dtype=np.int64,
+        ).reshape(-1, 2)
+        items = items[np.isin(items[:, 0], np.fromiter(created, dtype=np.int64, count=len(created)))]
+        stamps = np.fromiter((created[order_id] for order_id in items[:, 0].tolist()), dtype=np.float64, count=len(items))
+        yield items[:, 0], items[:, 1], stamps
+
+
+def _basket_pairs(orders):
+    """
+    Para líneas agrupadas por orden, los índices (izquierda, derecha) de
+    todos los pares de líneas distintas de una misma orden, sin bucles en
+    Python: cada línea se repite tantas veces como líneas tiene su orden.
+    """
+    starts = np.flatnonzero(np.r_[True, orders[1:] != orders[:-1]])
+    sizes = np.diff(np.r_[starts, len(orders)])
+    size_of = np.repeat(sizes, sizes)
+    left = np.repeat(np.arange(len(orders)), size_of)
+    # Posición dentro de la orden de cada copia: 0..k-1 para cada línea
+    offsets = np.arange(len(left)) - np.repeat(np.cumsum(size_of) - size_of, size_of)
+    right = np.repeat(np.repeat(starts, sizes), size_of) + offsets
+    keep = left != right
+    return left[keep], right[keep]
+
+
+def _merge(keys, weights, counts):
+    # Suma los pesos y recuentos de las claves de par repetidas
+    keys, inverse = np.unique(keys, return_inverse=True)
+    return keys, np.bincount(inverse, weights=weights), np.bincount(inverse, weights=counts)
+
+
+def build_neighbours(top_k=20, metric='cosine', half_life_days=None, min_support=2, days=None, batch_size=5000):
+    """
+    Recalcula ProductNeighbour a partir de OrderItem. Cada orden pesa 1 o,
+    con `half_life_days`, la mitad cada tantos días de antigüedad. Los pares
+    de cada lote se agregan con NumPy (clave a * n + b, np.unique y bincount),
+    así que la memoria depende de los pares distintos y no de las órdenes.
+
+    - cosine: C[a, b] / sqrt(C[a, a] * C[b, b]), no premia a los más vendidos
+    - confidence: C[a, b] / C[a, a], la fracción de órdenes de a que llevan b
+
+    Solo se guardan pares vistos en `min_support` órdenes o más, y vecinos
+    disponibles. Devuelve estadísticas de la construcción.
+    """
+    if metric not in METRICS:
+        raise ValueError(f"Métrica desconocida: {metric} (usa {', '.join(METRICS)}).")
+    product_ids = np.array(Product.objects.order_by('id').values_list('id', flat=True), dtype=np.int64)
+    available = np.isin(
+        product_ids, np.array(Product.objects.filter(is_available=True).values_list('id', flat=True), dtype=np.int64),
+    )
+    n = len(product_ids)
+    now = timezone.now().timestamp()
+    since = timezone.now() - timedelta(days=days) if days else None
+
+    keys = np.empty(0, dtype=np.int64)
+    pair_weights = np.empty(0, dtype=np.float64)
+    pair_counts = np.empty(0, dtype=np.float64)
+    totals = np.zeros(n, dtype=np.float64)
+    stats = {'orders': 0, 'items': 0, 'skipped_orders': 0}
+    for orders, products, stamps in _order_batches(batch_size, since):
+        # Productos borrados después de la compra (ya no están en product_ids)
+        codes = np.searchsorted(product_ids, products)
+        known = (codes < n) & (product_ids[np.minimum(codes, n - 1)] == products)
+        orders, codes, stamps = orders[known], codes[known], stamps[known]
+        # Un producto cuenta una vez por orden aunque tenga varias líneas
+        order_by = np.lexsort((codes, orders))
+        orders, codes, stamps = orders[order_by], codes[order_by], stamps[order_by]
+        distinct = np.r_[True, (orders[1:] != orders[:-1]) | (codes[1:] != codes[:-1])]
+        orders, codes, stamps = orders[distinct], codes[distinct], stamps[distinct]
+        sizes = np.unique(orders, return_counts=True)[1]
+        stats['orders'] += len(sizes)
+        stats['items'] += len(orders)
+        large = np.repeat(sizes > MAX_BASKET_SIZE, sizes)
+        stats['skipped_orders'] += int(np.count_nonzero(sizes > MAX_BASKET_SIZE))
+        orders, codes, stamps = orders[~large], codes[~large], stamps[~large]
+        if not len(orders):
+            continue
+        weights = np.ones(len(orders))
+        if half_life_days:
+            weights = 0.5 ** ((now - stamps) / (half_life_days * 86400))
+        totals += np.bincount(codes, weights=weights, minlength=n)
+        left, right = _basket_pairs(orders)
+        keys, pair_weights, pair_counts = _merge(
+            np.r_[keys, codes[left] * n + codes[right]],
+            np.r_[pair_weights, weights[left]],
+            np.r_[pair_counts, np.ones(len(left))],
+        )
+
+    a, b = np.divmod(keys, n)
+    keep = (pair_counts >= min_support) & available[a] & available[b]
+    a, b, pair_weights = a[keep], b[keep], pair_weights[keep]
+    if metric == 'cosine':
+        scores = pair_weights / np.sqrt(totals[a] * totals[b])
+    else:
+        scores = pair_weights / totals[a]
+    # Los top_k de cada producto: ordenados por producto y similitud descendente
+    order_by = np.lexsort((b, -scores, a))
+    a, b, scores = a[order_by], b[order_by], scores[order_by]
+    starts = np.flatnonzero(np.r_[True, a[1:] != a[:-1]]) if len(a) else np.empty(0, dtype=np.int64)
+    ranks = np.arange(len(a)) - np.repeat(starts, np.diff(np.r_[starts, len(a)]))
+    top = ranks < top_k
+    rows = zip(product_ids[a[top]].tolist(), product_ids[b[top]].tolist(), ranks[top].tolist(), scores[top].tolist())
+
+    with transaction.atomic():
+        ProductNeighbour.objects.all().delete()
+        written = 0
+        for batch in batched(rows, WRITE_BATCH_SIZE):
+            ProductNeighbour.objects.bulk_create([
+                ProductNeighbour(product_id=product, neighbour_id=neighbour, rank=rank, score=score)
+                for product, neighbour, rank, score in batch
+            ])
+            written += len(batch)
+        transaction.on_commit(bump_related_version)
+    stats.update({
+        'pairs': len(keys),
+        'products': len(starts),
+        'neighbours': written,
+        'array_bytes': keys.nbytes + pair_weights.nbytes + pair_counts.nbytes + totals.nbytes,
+    })
+    return stats
+
+
+@job('build_recommendations')
+def build_recommendations(**options):
+    # Para encolarla (manage.py build_recommendations --enqueue) y que la
+    # ejecute run_jobs fuera del proceso web
+    build_neighbours(**options)
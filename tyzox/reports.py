@@ -0,0 +1,126 @@
+# tyzox/reports.py
+
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .bulk import batched, bulk_increment
+from .jobs import first_time, job
+from .models import CategorySalesDaily, Order, OrderItem, ProcessedOrder, ProductSalesDaily
+
+
+def parse_date_range(params):
+    """
+    Lee ?start=AAAA-MM-DD&end=AAAA-MM-DD (ambos opcionales e inclusivos).
+    Lanza ValueError si alguna fecha no es válida.
+    """
+    dates = []
+    for name in ('start', 'end'):
+        raw = params.get(name) or None
+        value = parse_date(raw) if raw else None
+        if raw and value is None:
+            raise ValueError(f"Fecha inválida: {raw}")
+        dates.append(value)
+    return tuple(dates)
+
+
+def _filter_dates(queryset, start, end, field='date'):
+    if start:
+        queryset = queryset.filter(**{f'{field}__gte': start})
+    if end:
+        queryset = queryset.filter(**{f'{field}__lte': end})
+    return queryset
+
+
+@job('record_sales')
+@transaction.atomic
+def record_sales(order_id):
+    """
+    Suma las líneas de una orden a los resúmenes diarios de producto y
+    categoría: dos upserts. Es una tarea en segundo plano que encola el
+    checkout; usa el importe guardado en cada línea, como rebuild_sales_rollups.
+    Una orden ya sumada (tarea repetida tras un timeout) se ignora.
+    """
+    items = list(
+        OrderItem.objects.filter(order_id=order_id)
+        .values('order__created_at', 'product_id', 'product__category_id', 'quantity', 'price')
+    )
+    if not items or not first_time('record_sales', order_id):
+        return
+    day = timezone.localdate(items[0]['order__created_at'])
+    by_product = defaultdict(lambda: [0, 0])
+    by_category = defaultdict(lambda: [0, 0])
+    for item in items:
+        for totals in (by_product[item['product_id']], by_category[item['product__category_id']]):
+            totals[0] += item['quantity']
+            totals[1] += item['price']
+    bulk_increment(
+        ProductSalesDaily, ('date', 'product'), ('units', 'revenue'),
+        [(day, product_id, units, revenue) for product_id, (units, revenue) in by_product.items()],
+    )
+    bulk_increment(
+        CategorySalesDaily, ('date', 'category'), ('units', 'revenue'),
+        [(day, category_id, units, revenue) for category_id, (units, revenue) in by_category.items()],
+    )
+
+
+def product_sales_report(start=None, end=None):
+    # Mismas claves que el antiguo GROUP BY sobre OrderItem, para la plantilla y el CSV
+    return (
+        _filter_dates(ProductSalesDaily.objects.all(), start, end)
+        .values('product__name', 'product__category__name')
+        .annotate(total_sold=Sum('units'), total_revenue=Sum('revenue'))
+        .order_by('-total_sold')
+    )
+
+
+def category_sales_report(start=None, end=None):
+    return (
+        _filter_dates(CategorySalesDaily.objects.all(), start, end)
+        .values('category__name')
+        .annotate(total_sold=Sum('units'), total_revenue=Sum('revenue'))
+        .order_by('-total_sold')
+    )
+
+
+@transaction.atomic
+def rebuild_sales_rollups(start=None, end=None, batch_size=2000):
+    """
+    Recalcula los resúmenes desde OrderItem para el rango indicado (o todo el
+    historial). Devuelve el número de filas escritas en cada tabla.
+    """
+    _filter_dates(ProductSalesDaily.objects.all(), start, end).delete()
+    _filter_dates(CategorySalesDaily.objects.all(), start, end).delete()
+    # Las órdenes del rango quedan sumadas: una tarea record_sales aún en
+    # cola para alguna de ellas ya no la vuelve a sumar
+    orders = _filter_dates(Order.objects.annotate(date=TruncDate('created_at')), start, end)
+    for batch in batched(orders.values_list('id', flat=True).iterator(chunk_size=batch_size), batch_size):
+        ProcessedOrder.objects.bulk_create(
+            [ProcessedOrder(order_id=order_id, kind='record_sales') for order_id in batch], ignore_conflicts=True,
+        )
+    items = _filter_dates(
+        OrderItem.objects.annotate(date=TruncDate('order__created_at')), start, end,
+    )
+    written = {}
+    for model, group_by, target in (
+        (ProductSalesDaily, 'product', 'product_id'),
+        (CategorySalesDaily, 'product__category', 'category_id'),
+    ):
+        rows = (
+            items.values('date', group_by)
+            .annotate(units=Sum('quantity'), revenue=Sum('price'))
+            .order_by()
+            .iterator(chunk_size=batch_size)
+        )
+        written[model.__name__] = 0
+        for batch in batched(rows, batch_size):
+            model.objects.bulk_create([
+                model(date=row['date'], units=row['units'], revenue=row['revenue'], **{target: row[group_by]})
+                for row in batch
+            ])
+            written[model.__name__] += len(batch)
+    return written
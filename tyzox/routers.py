@@ -0,0 +1,125 @@
+# tyzox/routers.py
+
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+# Lecturas de la petición en curso que pueden ir a una réplica (solo dentro
+# de replica_reads) y si el usuario escribió hace poco y debe leer del primario
+_replica_reads = ContextVar('tyzox_replica_reads', default=False)
+_pinned_to_primary = ContextVar('tyzox_pinned_to_primary', default=False)
+
+# Cookie que recuerda durante REPLICA_STICKY_SECONDS que el navegador escribió
+STICKY_COOKIE = 'tyzox_primary'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+
+@contextmanager
+def replica_reads():
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+@contextmanager
+def primary_reads():
+    # Lecturas que deben ver lo último confirmado aunque estemos dentro de
+    # replica_reads (p. ej. lo que se guarda en la caché compartida)
+    token = _pinned_to_primary.set(True)
+    try:
+        yield
+    finally:
+        _pinned_to_primary.reset(token)
+
+
+def read_from_replica(view):
+    # Decorador para vistas de solo lectura (catálogo, ficha, informes)
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        with replica_reads():
+            return view(request, *args, **kwargs)
+    return wrapper
+
+
+class ReplicaRouter:
+    """
+    Manda a una de REPLICA_DATABASES las lecturas de modelos de tyzox hechas
+    dentro de replica_reads (vistas decoradas con read_from_replica), salvo que el
+    usuario haya escrito hace poco (ReplicaStickinessMiddleware): así ve
+    siempre sus propios cambios aunque la réplica vaya con retraso. Todo lo
+    demás, y todas las escrituras, van a 'default'.
+
+    Para probarlo en local basta con dos bases SQLite, como en
+    tyzox_project/settings_replica_test.py (la usan los tests de
+    tyzox/tests/test_routers.py), migrando las dos
+    (manage.py migrate --database replica1).
+    """
+    def db_for_read(self, model, **hints):
+        # Sesiones y usuarios siempre del primario: una sesión recién creada
+        # podría no haber llegado aún a la réplica
+        if model._meta.app_label != 'tyzox' or not settings.REPLICA_DATABASES:
+            return DEFAULT_DB_ALIAS
+        if _replica_reads.get() and not _pinned_to_primary.get():
+            return random.choice(settings.REPLICA_DATABASES)
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Primario y réplicas tienen los mismos datos
+        databases = {DEFAULT_DB_ALIAS, *settings.REPLICA_DATABASES}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+
+class ReplicaStickinessMiddleware:
+    """
+    Tras una petición que escribe (POST, PUT, PATCH, DELETE) deja una cookie
+    que fija las lecturas de ese navegador en el primario durante
+    REPLICA_STICKY_SECONDS, el retraso máximo que toleramos en la réplica.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        token = _pinned_to_primary.set(self._pinned(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            _pinned_to_primary.reset(token)
+        return self._remember_write(request, response)
+
+    async def __acall__(self, request):
+        token = _pinned_to_primary.set(self._pinned(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            _pinned_to_primary.reset(token)
+        return self._remember_write(request, response)
+
+    def _pinned(self, request):
+        return request.method not in SAFE_METHODS or STICKY_COOKIE in request.COOKIES
+
+    def _remember_write(self, request, response):
+        if settings.REPLICA_DATABASES and request.method not in SAFE_METHODS and response.status_code < 400:
+            response.set_cookie(
+                STICKY_COOKIE, '1', max_age=settings.REPLICA_STICKY_SECONDS, httponly=True, samesite='Lax',
+            )
+        return response
@@ -0,0 +1,157 @@
+# tyzox/search.py
+
+import re
+
+from django.db import connection
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+
+from .cache import cached_catalog
+from .catalog import CATALOG_FIELDS, serialize_product_row
+from .models import Product
+
+SEARCH_PAGE_SIZE = 24
+AUTOCOMPLETE_LIMIT = 8
+MAX_QUERY_TOKENS = 8
+# Las páginas de una búsqueda por relevancia usan OFFSET: limitamos la profundidad
+MAX_SEARCH_PAGE = 50
+
+# PostgreSQL: columna tsvector generada (la mantiene la propia base de datos)
+# con el nombre pesando más que la descripción, e índice GIN sobre ella.
+POSTGRES_SQL = [
+    """
+    ALTER TABLE tyzox_product ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('spanish', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('spanish', coalesce(description, '')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS product_search_idx ON tyzox_product USING gin (search_vector)",
+]
+
+# SQLite (desarrollo y pruebas): tabla FTS5 de contenido externo sincronizada
+# con triggers.
+SQLITE_SQL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS tyzox_product_fts USING fts5(
+        name, description, content='tyzox_product', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS tyzox_product_fts_ai AFTER INSERT ON tyzox_product BEGIN
+        INSERT INTO tyzox_product_fts(rowid, name, description) VALUES (new.id, new.name, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS tyzox_product_fts_ad AFTER DELETE ON tyzox_product BEGIN
+        INSERT INTO tyzox_product_fts(tyzox_product_fts, rowid, name, description) VALUES ('delete', old.id, old.name, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS tyzox_product_fts_au AFTER UPDATE OF name, description ON tyzox_product BEGIN
+        INSERT INTO tyzox_product_fts(tyzox_product_fts, rowid, name, description) VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO tyzox_product_fts(rowid, name, description) VALUES (new.id, new.name, new.description);
+    END
+    """,
+]
+SQLITE_TRIGGERS = ('tyzox_product_fts_ai', 'tyzox_product_fts_ad', 'tyzox_product_fts_au')
+
+
+def install_search_index(db_connection):
+    """
+    Crea (si no existe) el índice de búsqueda para el motor de la conexión.
+    En SQLite, Django reconstruye la tabla en algunas migraciones y se pierden
+    los triggers; por eso también se llama tras cada `migrate` y, si faltaban,
+    se reindexa la tabla completa.
+    """
+    with db_connection.cursor() as cursor:
+        if db_connection.vendor == 'postgresql':
+            for sql in POSTGRES_SQL:
+                cursor.execute(sql)
+        elif db_connection.vendor == 'sqlite':
+            cursor.execute(
+                "SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name IN (%s, %s, %s)",
+                SQLITE_TRIGGERS,
+            )
+            complete = cursor.fetchone()[0] == len(SQLITE_TRIGGERS)
+            for sql in SQLITE_SQL:
+                cursor.execute(sql)
+            if not complete:
+                cursor.execute("INSERT INTO tyzox_product_fts(tyzox_product_fts) VALUES ('rebuild')")
+
+
+def uninstall_search_index(db_connection):
+    with db_connection.cursor() as cursor:
+        if db_connection.vendor == 'postgresql':
+            cursor.execute('DROP INDEX IF EXISTS product_search_idx')
+            cursor.execute('ALTER TABLE tyzox_product DROP COLUMN IF EXISTS search_vector')
+        elif db_connection.vendor == 'sqlite':
+            for trigger in SQLITE_TRIGGERS:
+                cursor.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+            cursor.execute('DROP TABLE IF EXISTS tyzox_product_fts')
+
+
+def tokenize(query):
+    # Solo palabras: así ningún carácter del usuario llega a la sintaxis de tsquery/FTS5
+    return re.findall(r'\w+', query.lower())[:MAX_QUERY_TOKENS]
+
+
+def _postgres_ids(tokens, prefix, offset, limit):
+    # En modo prefijo la última palabra puede estar incompleta (autocompletado)
+    terms = [f'{token}:*' if prefix and i == len(tokens) - 1 else token for i, token in enumerate(tokens)]
+    tsquery = "to_tsquery('spanish', %s)"
+    text = ' & '.join(terms)
+    queryset = (
+        Product.objects.filter(is_available=True)
+        .annotate(
+            matches=RawSQL(f'tyzox_product.search_vector @@ {tsquery}', (text,), output_field=BooleanField()),
+            rank=RawSQL(f'ts_rank(tyzox_product.search_vector, {tsquery})', (text,), output_field=FloatField()),
+        )
+        .filter(matches=True)
+        .order_by('-rank', 'id')
+        .values_list('id', flat=True)
+    )
+    return list(queryset[offset:offset + limit])
+
+
+def _sqlite_ids(tokens, prefix, offset, limit):
+    terms = [f'"{token}"*' if prefix and i == len(tokens) - 1 else f'"{token}"' for i, token in enumerate(tokens)]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT p.id FROM tyzox_product_fts f
+            JOIN tyzox_product p ON p.id = f.rowid
+            WHERE tyzox_product_fts MATCH %s AND p.is_available
+            ORDER BY bm25(tyzox_product_fts, 10.0, 1.0), p.id
+            LIMIT %s OFFSET %s
+            """,
+            [' '.join(terms), limit, offset],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def search_products(query, page=1, limit=SEARCH_PAGE_SIZE, prefix=False):
+    """
+    Búsqueda de texto completo ordenada por relevancia. Devuelve la página
+    pedida y si hay una siguiente; los ids salen del índice y las tarjetas
+    se cargan después con la misma proyección que el catálogo.
+    """
+    tokens = tokenize(query)
+    if not tokens:
+        return {'results': [], 'page': page, 'has_next': False}
+    find_ids = _postgres_ids if connection.vendor == 'postgresql' else _sqlite_ids
+    ids = find_ids(tokens, prefix, (page - 1) * limit, limit + 1)
+    has_next = len(ids) > limit
+    ids = ids[:limit]
+    rows = {row['id']: row for row in Product.objects.filter(id__in=ids).values(*CATALOG_FIELDS)}
+    return {
+        'results': [serialize_product_row(rows[pk]) for pk in ids if pk in rows],
+        'page': page,
+        'has_next': has_next,
+    }
+
+
+def cached_search(query, page=1, limit=SEARCH_PAGE_SIZE, prefix=False):
+    key = ' '.join(tokenize(query))
+    return cached_catalog(('search', key, page, limit, prefix), lambda: search_products(key, page, limit, prefix))
@@ -0,0 +1,140 @@
+# tyzox/seed.py
+
+import random
+from collections import Counter
+from datetime import timedelta
+from decimal import Decimal
+from itertools import accumulate, permutations
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from .bulk import batched, bulk_increment
+from .cache import bump_catalog_version
+from .facets import rebuild_category_facets
+from .models import Category, CoPurchase, Order, OrderItem, Product
+from .reports import rebuild_sales_rollups
+
+SEED_PREFIX = 'seed'
+SEED_PASSWORD = 'seed-password'
+BATCH_SIZE = 2000
+
+WORDS = (
+    'guantes', 'vendas', 'saco', 'casco', 'protector', 'bucal', 'combat', 'sparring', 'pro', 'cuero',
+    'velcro', 'entrenamiento', 'competición', 'pera', 'comba', 'manoplas', 'tibiales', 'short', 'botas', 'ligero',
+)
+
+
+def seed_sizes(size):
+    # Proporciones de una tienda pequeña a partir del número de productos
+    return {
+        'categories': max(3, size // 200),
+        'products': size,
+        'users': max(10, size // 10),
+        'orders': size,
+    }
+
+
+def _basket_size(rng, mean):
+    # Geométrica desplazada: casi todas las compras tienen 1-3 productos y
+    # unas pocas muchos más, como en una tienda real
+    size = 1
+    while size < 50 and rng.random() > 1 / mean:
+        size += 1
+    return size
+
+
+def flush_seed_data(prefix=SEED_PREFIX):
+    # Borra lo generado con `prefix` (las órdenes caen en cascada con usuarios y productos)
+    with transaction.atomic():
+        User.objects.filter(username__startswith=f'{prefix}-').delete()
+        Category.objects.filter(slug__startswith=f'{prefix}-').delete()
+    bump_catalog_version()
+
+
+@transaction.atomic
+def seed(categories, products, users, orders, basket_mean=2.5, days=90, seed=None, prefix=SEED_PREFIX):
+    """
+    Genera datos sintéticos con operaciones en bloque: categorías, productos
+    con popularidad desigual (unos pocos se venden mucho), usuarios y
+    órdenes repartidas en los últimos `days` días, junto con sus compras
+    conjuntas y los resúmenes de ventas. Devuelve las filas creadas.
+    """
+    rng = random.Random(seed)
+    now = timezone.now()
+
+    category_objs = Category.objects.bulk_create([
+        Category(name=f'{prefix} categoría {i}', slug=f'{prefix}-category-{i}') for i in range(categories)
+    ])
+
+    product_ids = []
+    for batch in batched(range(products), BATCH_SIZE):
+        created = Product.objects.bulk_create([
+            Product(
+                category=category_objs[i % categories],
+                name=f'{" ".join(rng.sample(WORDS, 3)).capitalize()} {i}',
+                slug=f'{prefix}-product-{i}',
+                description=' '.join(rng.choices(WORDS, k=12)),
+                price=Decimal(rng.randint(500, 25000)) / 100,
+                stock=rng.randint(0, 200),
+                is_available=rng.random() > 0.05,
+            )
+            for i in batch
+        ])
+        product_ids += [product.pk for product in created]
+    prices = dict(Product.objects.filter(pk__in=product_ids).values_list('id', 'price'))
+
+    # Un solo hash para todos: generar miles de hashes tardaría minutos
+    password = make_password(SEED_PASSWORD)
+    user_ids = []
+    for batch in batched(range(users), BATCH_SIZE):
+        created = User.objects.bulk_create([
+            User(username=f'{prefix}-user-{i}', email=f'{prefix}-user-{i}@example.com', password=password)
+            for i in batch
+        ])
+        user_ids += [user.pk for user in created]
+
+    # Popularidad tipo Zipf: el producto de rango r pesa 1 / (r + 1)
+    cum_weights = list(accumulate(1 / (rank + 1) for rank in range(len(product_ids))))
+    pairs = Counter()
+    order_items = 0
+    for batch in batched(range(orders), BATCH_SIZE):
+        baskets = []
+        for _ in batch:
+            basket = set(rng.choices(product_ids, cum_weights=cum_weights, k=_basket_size(rng, basket_mean)))
+            baskets.append({pk: rng.randint(1, 3) for pk in basket})
+        order_objs = Order.objects.bulk_create([
+            Order(
+                user_id=rng.choice(user_ids),
+                total_price=sum(prices[pk] * quantity for pk, quantity in basket.items()),
+            )
+            for basket in baskets
+        ])
+        # created_at es auto_now_add: las fechas repartidas se fijan después
+        for order in order_objs:
+            order.created_at = now - timedelta(seconds=rng.randint(0, days * 86400))
+        Order.objects.bulk_update(order_objs, ['created_at'])
+        items = [
+            OrderItem(order=order, product_id=pk, quantity=quantity, price=prices[pk] * quantity)
+            for order, basket in zip(order_objs, baskets)
+            for pk, quantity in basket.items()
+        ]
+        OrderItem.objects.bulk_create(items, batch_size=BATCH_SIZE)
+        order_items += len(items)
+        for basket in baskets:
+            pairs.update(permutations(sorted(basket), 2))
+
+    bulk_increment(CoPurchase, ('product', 'related'), ('weight',), [(a, b, n) for (a, b), n in pairs.items()])
+    rebuild_sales_rollups()
+    rebuild_category_facets()
+    transaction.on_commit(bump_catalog_version)
+    return {
+        'categories': len(category_objs),
+        'products': len(product_ids),
+        'users': len(user_ids),
+        'orders': orders,
+        'order_items': order_items,
+        'co_purchases': len(pairs),
+    }
@@ -15,20 +15,47 @@ document.addEventListener('DOMContentLoaded', () => {
         console.log('Estás en la página de login/registro.');
     }
     initializeCommon();
+    initializeSearch();
     setupDeleteModal();
     updateCartBadgeOnLoad();
 });
 
 function initializeHomePage() {
     console.log('Inicializando página de inicio...');
-    const allProducts = JSON.parse(document.getElementById('products-data').textContent);
-    renderProducts(allProducts);
+    const initialQuery = new URLSearchParams(window.location.search).get('q');
+    if (initialQuery) {
+        document.getElementById('searchInput').value = initialQuery;
+        searchProducts(initialQuery);
+    } else {
+        loadProducts('all');
+    }
     document.querySelectorAll('.category-card').forEach(card => {
         card.addEventListener('click', () => {
             const categorySlug = card.getAttribute('data-category-slug');
-            renderProducts(allProducts, categorySlug);
+            document.querySelectorAll('.category-card').forEach(c => c.classList.toggle('active', c === card));
+            loadProducts(categorySlug);
         });
     });
+    const filters = document.getElementById('catalogFilters');
+    if (filters) {
+        filters.addEventListener('submit', (event) => {
+            event.preventDefault();
+            catalogState.minPrice = filters.elements.min_price.value;
+            catalogState.maxPrice = filters.elements.max_price.value;
+            catalogState.sort = filters.elements.sort.value;
+            loadProducts(catalogState.category);
+        });
+    }
+    const loadMoreBtn = document.getElementById('loadMoreBtn');
+    if (loadMoreBtn) {
+        loadMoreBtn.addEventListener('click', () => {
+            if (catalogState.query) {
+                searchProducts(catalogState.query, catalogState.page + 1);
+            } else {
+                loadProducts(catalogState.category, true);
+            }
+        });
+    }
 }
 
 function initializeCommon() {
@@ -51,24 +78,158 @@ function initializeCommon() {
 // FUNCIONES PARA LA PÁGINA DE INICIO
 // ============================================
 
-function renderProducts(products, categorySlug = 'all') {
+// Estado de la paginación del catálogo: el servidor devuelve un cursor
+// opaco para pedir la siguiente página de la categoría actual.
+const catalogState = {
+    category: 'all', cursor: null, query: null, page: 1, requestId: 0,
+    minPrice: '', maxPrice: '', sort: 'name'
+};
+
+async function loadProducts(categorySlug = 'all', append = false) {
+    const requestId = ++catalogState.requestId;
+    const params = new URLSearchParams();
+    if (categorySlug !== 'all') params.set('category', categorySlug);
+    if (catalogState.minPrice) params.set('min_price', catalogState.minPrice);
+    if (catalogState.maxPrice) params.set('max_price', catalogState.maxPrice);
+    if (catalogState.sort !== 'name') params.set('sort', catalogState.sort);
+    if (append && catalogState.cursor) params.set('cursor', catalogState.cursor);
+    try {
+        const response = await fetch(`/api/products/?${params}`);
+        const data = await response.json();
+        // Si el usuario cambió de categoría mientras esperábamos, descartamos esta respuesta
+        if (requestId !== catalogState.requestId) return;
+        if (data.status === 'success') {
+            catalogState.category = categorySlug;
+            catalogState.cursor = data.next_cursor;
+            catalogState.query = null;
+            renderProducts(data.products, append);
+            if (data.facets) updateCategoryCounts(data.facets);
+            const loadMoreBtn = document.getElementById('loadMoreBtn');
+            if (loadMoreBtn) loadMoreBtn.style.display = data.next_cursor ? 'inline-block' : 'none';
+        } else {
+            showNotification(data.message || 'No se pudieron cargar los productos.', 'error');
+        }
+    } catch (error) {
+        console.error('Error en loadProducts:', error);
+        showNotification('Error de conexión con el servidor.', 'error');
+    }
+}
+
+function updateCategoryCounts(facets) {
+    // Los recuentos cambian con el rango de precio; sin productos, 0
+    const counts = new Map(facets.map(facet => [facet.slug, facet.product_count]));
+    document.querySelectorAll('.category-card').forEach(card => {
+        const countEl = card.querySelector('.category-count');
+        if (!countEl) return;
+        const count = counts.get(card.getAttribute('data-category-slug')) || 0;
+        countEl.textContent = `${count} producto${count === 1 ? '' : 's'}`;
+    });
+}
+
+// ============================================
+// BÚSQUEDA DE PRODUCTOS
+// ============================================
+
+function initializeSearch() {
+    const input = document.getElementById('searchInput');
+    if (!input) return;
+    const suggestions = document.createElement('datalist');
+    suggestions.id = 'searchSuggestions';
+    input.setAttribute('list', suggestions.id);
+    input.after(suggestions);
+
+    let debounceTimer = null;
+    input.addEventListener('input', () => {
+        clearTimeout(debounceTimer);
+        const query = input.value.trim();
+        if (query.length < 2) return;
+        // Esperamos a que el usuario deje de teclear antes de pedir sugerencias
+        debounceTimer = setTimeout(() => loadSuggestions(query, suggestions), 150);
+    });
+    input.addEventListener('keydown', (event) => {
+        if (event.key === 'Enter') performSearch();
+    });
+}
+
+async function loadSuggestions(query, datalist) {
+    try {
+        const response = await fetch(`/api/search/?mode=prefix&q=${encodeURIComponent(query)}`);
+        const data = await response.json();
+        if (data.status !== 'success') return;
+        datalist.innerHTML = '';
+        data.results.forEach(product => {
+            const option = document.createElement('option');
+            option.value = product.name;
+            datalist.appendChild(option);
+        });
+    } catch (error) {
+        console.error('Error en loadSuggestions:', error);
+    }
+}
+
+function performSearch() {
+    const input = document.getElementById('searchInput');
+    const query = input ? input.value.trim() : '';
+    if (!query) return;
+    if (!document.getElementById('productGrid')) {
+        // Fuera de la página de inicio, mostramos los resultados allí
+        window.location.href = `/?q=${encodeURIComponent(query)}#products`;
+        return;
+    }
+    searchProducts(query);
+    document.getElementById('products').scrollIntoView({ behavior: 'smooth' });
+}
+
+async function searchProducts(query, page = 1) {
+    const requestId = ++catalogState.requestId;
+    try {
+        const response = await fetch(`/api/search/?q=${encodeURIComponent(query)}&page=${page}`);
+        const data = await response.json();
+        if (requestId !== catalogState.requestId) return;
+        if (data.status === 'success') {
+            catalogState.query = query;
+            catalogState.page = data.page;
+            renderProducts(data.results, page > 1);
+            const loadMoreBtn = document.getElementById('loadMoreBtn');
+            if (loadMoreBtn) loadMoreBtn.style.display = data.has_next ? 'inline-block' : 'none';
+        } else {
+            showNotification(data.message || 'No se pudo realizar la búsqueda.', 'error');
+        }
+    } catch (error) {
+        console.error('Error en searchProducts:', error);
+        showNotification('Error de conexión con el servidor.', 'error');
+    }
+}
+
+// Imagen de una tarjeta: con miniaturas generadas el navegador descarga la
+// más pequeña que cubre la tarjeta (y WebP si lo soporta).
+function productImageHtml(product) {
+    const src = product.image_url || 'https://via.placeholder.com/300x200';
+    if (!product.image_srcset) {
+        return `<img src="${src}" alt="${product.name}" loading="lazy"/>`;
+    }
+    const sizes = '(max-width: 768px) 100vw, 300px';
+    return `<picture>
+                <source type="image/webp" srcset="${product.image_webp_srcset}" sizes="${sizes}">
+                <img src="${src}" srcset="${product.image_srcset}" sizes="${sizes}" alt="${product.name}" loading="lazy"/>
+            </picture>`;
+}
+
+function renderProducts(products, append = false) {
     const productGrid = document.getElementById('productGrid');
     if (!productGrid) return;
-    productGrid.innerHTML = '';
-    const filteredProducts = categorySlug === 'all'
-        ? products
-        : products.filter(p => p.category_slug === categorySlug);
-    if (filteredProducts.length === 0) {
+    if (!append) productGrid.innerHTML = '';
+    if (!append && products.length === 0) {
         productGrid.innerHTML = '<p>No se encontraron productos en esta categoría.</p>';
         return;
     }
-    filteredProducts.forEach(product => {
+    products.forEach(product => {
         const card = document.createElement('div');
         card.className = 'product-card';
         card.innerHTML = `
             <a href="${product.detail_url}" style="text-decoration: none;">
                 <div class="product-image">
-                    <img src="${product.image_url || 'https://via.placeholder.com/300x200'}" alt="${product.name}" loading="lazy"/>
+                    ${productImageHtml(product)}
                 </div>
                 <div class="product-name" style="color: white;">${product.name}</div>
             </a>
@@ -86,29 +247,93 @@ function renderProducts(products, categorySlug = 'all') {
 // FUNCIONES PARA EL CARRITO DE COMPRAS
 // ============================================
 
-async function addToCart(productId) {
-    const cartIcon = document.getElementById('cart-count-badge');
-    if (!cartIcon) {
-        showNotification('Por favor, inicia sesión para añadir productos al carrito.', 'info');
-        return;
-    }
-    try {
-        const response = await fetch('/api/cart/add/', {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json', 'X-CSRFToken': getCookie('csrftoken') },
-            body: JSON.stringify({ product_id: productId })
-        });
-        const data = await response.json();
-        if (data.status === 'success') {
-            showNotification(data.message, 'success');
-            updateCartBadge(data.item_count);
+// Los clics se acumulan unos milisegundos y se envían juntos en una sola
+// petición a /api/cart/update/ ({product_id, delta | set_quantity} por producto)
+const CART_FLUSH_DELAY = 300;
+const CART_MAX_RETRIES = 3;
+let pendingCartOperations = new Map();
+let cartFlushTimer = null;
+let cartFlushing = Promise.resolve();
+
+function queueCartOperation(productId, operation) {
+    // Dos deltas se suman; un set_quantity descarta lo anterior y los deltas
+    // posteriores se suman a él
+    const previous = pendingCartOperations.get(productId);
+    if (previous && 'delta' in operation) {
+        if ('set_quantity' in previous) {
+            operation = { set_quantity: Math.max(0, previous.set_quantity + operation.delta) };
         } else {
-            showNotification(data.message || 'Hubo un error al añadir el producto.', 'error');
+            operation = { delta: previous.delta + operation.delta };
         }
-    } catch (error) {
-        console.error('Error en addToCart:', error);
-        showNotification('Error de conexión con el servidor.', 'error');
     }
+    pendingCartOperations.set(productId, operation);
+    clearTimeout(cartFlushTimer);
+    cartFlushTimer = setTimeout(flushCartOperations, CART_FLUSH_DELAY);
+}
+
+function newIdempotencyKey() {
+    if (window.crypto && crypto.randomUUID) return crypto.randomUUID();
+    return `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+}
+
+function flushCartOperations() {
+    // Una petición cada vez, en orden: la siguiente sale cuando acaba la anterior
+    cartFlushing = cartFlushing.then(sendCartOperations);
+    return cartFlushing;
+}
+
+async function sendCartOperations() {
+    if (pendingCartOperations.size === 0) return null;
+    const operations = Array.from(pendingCartOperations, ([productId, op]) => ({ product_id: productId, ...op }));
+    pendingCartOperations = new Map();
+    // La misma clave en todos los reintentos: el servidor aplica los cambios una sola vez
+    const idempotencyKey = newIdempotencyKey();
+    for (let attempt = 0; attempt <= CART_MAX_RETRIES; attempt++) {
+        try {
+            const response = await fetch('/api/cart/update/', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                    'X-CSRFToken': getCookie('csrftoken'),
+                    'Idempotency-Key': idempotencyKey
+                },
+                body: JSON.stringify({ operations })
+            });
+            // Errores del servidor o "petición en curso" (con Retry-After):
+            // esperamos y reintentamos con la misma clave
+            const retry = response.status >= 500 || response.headers.has('Retry-After');
+            if (!retry || attempt === CART_MAX_RETRIES) {
+                const data = await response.json();
+                if (data.status === 'success') {
+                    updateCartBadge(data.item_count);
+                    renderCartItems(data);
+                } else {
+                    showNotification(data.message || 'No se pudo actualizar el carrito.', 'error');
+                }
+                return data;
+            }
+        } catch (error) {
+            console.error('Error al actualizar el carrito:', error);
+        }
+        await new Promise(resolve => setTimeout(resolve, 500 * 2 ** attempt));
+    }
+    showNotification('Error de conexión con el servidor.', 'error');
+    return null;
+}
+
+function addToCart(productId) {
+    // Sin sesión iniciada el carrito se guarda en la sesión del visitante
+    queueCartOperation(productId, { delta: 1 });
+    showNotification('Producto añadido al carrito.', 'success');
+}
+
+function changeCartQuantity(productId, delta) {
+    queueCartOperation(productId, { delta });
+}
+
+function removeFromCart(productId) {
+    queueCartOperation(productId, { set_quantity: 0 });
+    flushCartOperations();
 }
 
 function updateCartBadge(count) {
@@ -119,33 +344,44 @@ function updateCartBadge(count) {
     }
 }
 
+function renderCartItems(data) {
+    const cartItemsContainer = document.getElementById('cartItems');
+    const cartTotalEl = document.getElementById('cartTotal');
+    if (!cartItemsContainer || !cartTotalEl) return;
+    cartItemsContainer.innerHTML = '';
+    if (data.items.length === 0) {
+        cartItemsContainer.innerHTML = '<p>Tu carrito está vacío.</p>';
+    } else {
+        data.items.forEach(item => {
+            const itemEl = document.createElement('div');
+            itemEl.innerHTML = `<div style="display: flex; gap: 1rem; align-items: center; border-bottom: 1px solid #444; padding-bottom: 1rem; margin-bottom: 1rem;">
+                                    <img src="${item.image_url}" alt="${item.name}" style="width: 60px; height: 60px; object-fit: cover; border-radius: 5px;">
+                                    <div style="flex-grow: 1;">
+                                        <div>${item.name}</div>
+                                        <small>${item.quantity} x $${item.price}</small>
+                                        <div>
+                                            <button class="btn-icon" onclick="changeCartQuantity(${item.product_id}, -1)" title="Quitar uno"><i class="fas fa-minus"></i></button>
+                                            <button class="btn-icon" onclick="changeCartQuantity(${item.product_id}, 1)" title="Añadir uno"><i class="fas fa-plus"></i></button>
+                                            <button class="btn-icon" onclick="removeFromCart(${item.product_id})" title="Eliminar"><i class="fas fa-trash"></i></button>
+                                        </div>
+                                    </div>
+                                    <strong>$${item.subtotal}</strong>
+                                </div>`;
+            cartItemsContainer.appendChild(itemEl);
+        });
+    }
+    cartTotalEl.textContent = `Total: $${data.total}`;
+}
+
 async function openCartModal(event) {
     event.preventDefault();
     try {
+        // Primero los clics pendientes, para no mostrar un carrito desfasado
+        await flushCartOperations();
         const response = await fetch('/api/cart/get/');
         const data = await response.json();
         if (data.status === 'success') {
-            const cartItemsContainer = document.getElementById('cartItems');
-            const cartTotalEl = document.getElementById('cartTotal');
-            if (!cartItemsContainer || !cartTotalEl) return;
-            cartItemsContainer.innerHTML = '';
-            if (data.items.length === 0) {
-                cartItemsContainer.innerHTML = '<p>Tu carrito está vacío.</p>';
-            } else {
-                data.items.forEach(item => {
-                    const itemEl = document.createElement('div');
-                    itemEl.innerHTML = `<div style="display: flex; gap: 1rem; align-items: center; border-bottom: 1px solid #444; padding-bottom: 1rem; margin-bottom: 1rem;">
-                                            <img src="${item.image_url}" alt="${item.name}" style="width: 60px; height: 60px; object-fit: cover; border-radius: 5px;">
-                                            <div style="flex-grow: 1;">
-                                                <div>${item.name}</div>
-                                                <small>${item.quantity} x $${item.price}</small>
-                                            </div>
-                                            <strong>$${item.subtotal}</strong>
-                                        </div>`;
-                    cartItemsContainer.appendChild(itemEl);
-                });
-            }
-            cartTotalEl.textContent = `Total: $${data.total}`;
+            renderCartItems(data);
             openModal('cartModal');
         } else {
             showNotification('No se pudo cargar el carrito.', 'error');
@@ -159,7 +395,7 @@ async function openCartModal(event) {
 function updateCartBadgeOnLoad() {
     const cartBadge = document.getElementById('cart-count-badge');
     if (cartBadge) {
-        fetch('/api/cart/get/')
+        fetch('/api/cart/summary/')
             .then(res => res.json())
             .then(data => {
                 if (data.status === 'success') {
@@ -310,6 +546,7 @@ function setupDeleteModal() {
 // --- ¡AÑADE ESTA NUEVA FUNCIÓN! ---
 async function checkout() {
     try {
+        await flushCartOperations();
         const response = await fetch('/api/cart/checkout/', {
             method: 'POST',
             headers: {
@@ -331,6 +568,10 @@ async function checkout() {
             //     window.location.href = '/';
             // }, 5000);
 
+        } else if (response.status === 401) {
+            // Visitante anónimo: tras iniciar sesión su carrito se conserva
+            showNotification(data.message, 'info');
+            window.location.href = '/login/';
         } else {
             // Si hubo un error (ej: carrito vacío)
             showNotification(data.message || 'No se pudo procesar la compra.', 'error');
@@ -0,0 +1,219 @@
+# tyzox/storage.py
+
+import gzip
+import hashlib
+import json
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.files.base import ContentFile
+from django.utils.functional import cached_property
+
+try:
+    import brotli
+except ImportError:  # sin el paquete Brotli solo se generan las copias .gz
+    brotli = None
+
+# Extensiones que merece la pena guardar también comprimidas
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.svg', '.json', '.txt', '.html', '.xml', '.map')
+
+_CSS_COMMENT = re.compile(r'/\*.*?\*/', re.S)
+_CSS_SPACES = re.compile(r'\s+')
+_CSS_PUNCTUATION = re.compile(r'\s*([{};,>])\s*')
+
+
+def minify_css(source):
+    # Quita comentarios y espacios sobrantes. No toca el espacio antes de ':'
+    # porque en un selector ("a :hover") cambia el significado.
+    source = _CSS_COMMENT.sub('', source)
+    source = _CSS_SPACES.sub(' ', source)
+    source = _CSS_PUNCTUATION.sub(r'\1', source)
+    source = source.replace(': ', ':').replace(';}', '}')
+    return source.strip()
+
+
+# Tras estos caracteres una '/' empieza una expresión regular, no una división
+_JS_REGEX_PREFIX = set('(,=:[!&|?{};+-*%<>~^')
+
+
+def _skip_string(source, i):
+    quote = source[i]
+    i += 1
+    while i < len(source) and source[i] != quote:
+        i += 2 if source[i] == '\\' else 1
+    return i + 1
+
+
+def _skip_braces(source, i):
+    # Interior de un ${ ... } de plantilla, que puede contener otras plantillas
+    depth = 1
+    while i < len(source):
+        ch = source[i]
+        if ch in '\'"':
+            i = _skip_string(source, i)
+            continue
+        if ch == '`':
+            i = _skip_template(source, i)
+            continue
+        if ch == '{':
+            depth += 1
+        elif ch == '}':
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    return i
+
+
+def _skip_template(source, i):
+    i += 1
+    while i < len(source):
+        ch = source[i]
+        if ch == '\\':
+            i += 2
+        elif ch == '`':
+            return i + 1
+        elif source.startswith('${', i):
+            i = _skip_braces(source, i + 2)
+        else:
+            i += 1
+    return i
+
+
+def _skip_regex(source, i):
+    i += 1
+    in_class = False
+    while i < len(source) and source[i] != '\n':
+        ch = source[i]
+        if ch == '\\':
+            i += 2
+            continue
+        if ch == '[':
+            in_class = True
+        elif ch == ']':
+            in_class = False
+        elif ch == '/' and not in_class:
+            i += 1
+            break
+        i += 1
+    while i < len(source) and source[i].isalpha():
+        i += 1
+    return i
+
+
+def minify_js(source):
+    """
+    Minificación conservadora: quita comentarios, sangrías y líneas vacías
+    y junta espacios, pero conserva los saltos de línea (la inserción
+    automática de ';' depende de ellos). Cadenas, plantillas y expresiones
+    regulares se copian tal cual.
+    """
+    out = []
+
+    def separator(newline):
+        # Un solo separador entre dos trozos de código; nunca al principio de línea
+        if out and out[-1] == ' ':
+            out.pop()
+        if not out or out[-1].endswith('\n'):
+            return
+        out.append('\n' if newline else ' ')
+
+    last = ''
+    i, n = 0, len(source)
+    while i < n:
+        ch = source[i]
+        if ch in '\'"`' or (ch == '/' and source[i + 1:i + 2] not in ('/', '*') and (not last or last in _JS_REGEX_PREFIX)):
+            if ch == '`':
+                end = _skip_template(source, i)
+            elif ch == '/':
+                end = _skip_regex(source, i)
+            else:
+                end = _skip_string(source, i)
+            out.append(source[i:end])
+            last, i = source[end - 1], end
+        elif source.startswith('//', i):
+            end = source.find('\n', i)
+            i = n if end == -1 else end
+        elif source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            end = n if end == -1 else end + 2
+            separator('\n' in source[i:end])
+            i = end
+        elif ch.isspace():
+            end = i
+            while end < n and source[end].isspace():
+                end += 1
+            separator('\n' in source[i:end])
+            i = end
+        else:
+            out.append(ch)
+            last, i = ch, i + 1
+    if out and out[-1] in (' ', '\n'):
+        out.pop()
+    return ''.join(out)
+
+
+class MinifiedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    collectstatic con nombres con hash (ManifestStaticFilesStorage) que
+    además minifica el CSS y JS propios antes de calcular el hash y guarda
+    junto a cada archivo con hash sus versiones .gz y .br, que sirve
+    tyzox.middleware.PrecompressedStaticMiddleware.
+
+    Sin manifest (tests, o antes del primer collectstatic) {% static %}
+    devuelve los nombres originales en lugar de fallar.
+    """
+    def stored_name(self, name):
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
+
+    @cached_property
+    def manifest_version(self):
+        # Huella del manifest: cambia en cuanto cambia el hash de un estático
+        manifest = json.dumps(self.hashed_files, sort_keys=True).encode('utf-8')
+        return hashlib.md5(manifest).hexdigest()[:12]
+
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            for name in list(paths):
+                if self._should_minify(name):
+                    self._minify(name)
+                    # El hash se calcula sobre la copia ya minificada de STATIC_ROOT
+                    paths[name] = (self, name)
+        yield from super().post_process(paths, dry_run, **options)
+        if not dry_run:
+            for hashed_name in set(self.hashed_files.values()):
+                if hashed_name.endswith(COMPRESSIBLE_EXTENSIONS):
+                    self._compress(hashed_name)
+
+    def _should_minify(self, name):
+        if '.min.' in name or not name.endswith(('.css', '.js')):
+            return False
+        return name.startswith(tuple(settings.STATIC_MINIFY_PREFIXES))
+
+    def _minify(self, name):
+        with self.open(name) as f:
+            source = f.read().decode('utf-8')
+        minified = minify_css(source) if name.endswith('.css') else minify_js(source)
+        self.delete(name)
+        self._save(name, ContentFile(minified.encode('utf-8')))
+
+    def _compress(self, name):
+        with self.open(name) as f:
+            content = f.read()
+        variants = [('.gz', gzip.compress(content, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            variants.append(('.br', brotli.compress(content, quality=11)))
+        for suffix, compressed in variants:
+            # Solo si comprimir compensa (archivos diminutos pueden crecer)
+            if len(compressed) < len(content):
+                if self.exists(name + suffix):
+                    self.delete(name + suffix)
+                self._save(name + suffix, ContentFile(compressed))
+
+
+def release_version():
+    # Versión del despliegue para los ETag de las páginas HTML
+    return f"{settings.RELEASE_ID}:{getattr(staticfiles_storage, 'manifest_version', '')}"
@@ -0,0 +1,193 @@
+# tyzox/tests/test_api.py
+
+import json
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from tyzox.cart import apply_operations, parse_operations
+from tyzox.models import Cart, CartItem, Category, Order, Product
+from tyzox.pagination import encode_cursor
+
+
+class StoreTestCase(TestCase):
+    def setUp(self):
+        # La caché (LocMem) sobrevive al rollback de cada test
+        cache.clear()
+        self.category = Category.objects.create(name='Guantes', slug='guantes')
+        self.products = [
+            Product.objects.create(
+                category=self.category, name=f'Producto {i:02d}', slug=f'producto-{i}', price=10 + i, stock=20,
+            )
+            for i in range(12)
+        ]
+
+
+class CatalogApiTests(StoreTestCase):
+    def test_cursor_pagination_visits_every_product_once(self):
+        for sort in ('name', 'price', '-price'):
+            with self.subTest(sort=sort):
+                seen, params = [], {'limit': 5, 'sort': sort}
+                while True:
+                    page = self.client.get('/api/products/', params).json()
+                    seen += [row['id'] for row in page['products']]
+                    if not page['next_cursor']:
+                        break
+                    params['cursor'] = page['next_cursor']
+                self.assertEqual(sorted(seen), sorted(p.pk for p in self.products))
+                self.assertEqual(len(seen), len(set(seen)))
+
+    def test_invalid_parameters(self):
+        for params in ({'cursor': 'zzz'}, {'limit': 'x'}, {'sort': 'stock'}, {'min_price': 'nan'}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get('/api/products/', params).status_code, 400)
+
+    def test_tampered_cursor_is_rejected(self):
+        cases = [
+            ('name', ['Producto 01', 'x']), ('name', [None, 1]),
+            ('price', ['abc', 1]), ('price', ['NaN', 1]), ('-price', ['10.00', 'x']), ('-price', [[], 1]),
+        ]
+        for sort, values in cases:
+            with self.subTest(sort=sort, values=values):
+                params = {'sort': sort, 'cursor': encode_cursor(values)}
+                self.assertEqual(self.client.get('/api/products/', params).status_code, 400)
+
+    def test_conditional_requests(self):
+        for url in ('/', '/api/products/', f'/product/{self.products[0].slug}/'):
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        # Un cambio en el catálogo (al confirmarse) cambia el ETag
+        etag = self.client.get('/api/products/')['ETag']
+        self.products[0].name = 'Renombrado'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.products[0].save()
+        self.assertEqual(self.client.get('/api/products/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+    def test_html_etag_changes_with_release(self):
+        url = f'/product/{self.products[0].slug}/'
+        etag = self.client.get(url)['ETag']
+        with override_settings(RELEASE_ID='nueva-version'):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        # Un collectstatic con otros hashes también invalida el HTML
+        with mock.patch('tyzox.storage.staticfiles_storage', mock.Mock(manifest_version='otro-manifest')):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+
+class CartApiTests(StoreTestCase):
+    def _update(self, operations, key=None):
+        headers = {'HTTP_IDEMPOTENCY_KEY': key} if key else {}
+        return self.client.post(
+            '/api/cart/update/', json.dumps({'operations': operations}), content_type='application/json', **headers,
+        )
+
+    def test_idempotent_update_is_applied_once(self):
+        user = User.objects.create_user('a@x.com', 'a@x.com', 'pw12345!')
+        self.client.force_login(user)
+        operations = [{'product_id': self.products[0].pk, 'delta': 2}]
+        first = self._update(operations, key='k1')
+        replay = self._update(operations, key='k1')
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(replay['Idempotent-Replayed'], 'true')
+        self.assertEqual(replay.json(), first.json())
+        self.assertEqual(CartItem.objects.get(cart__user=user).quantity, 2)
+        self._update(operations, key='k2')
+        self.assertEqual(CartItem.objects.get(cart__user=user).quantity, 4)
+        self.products[0].refresh_from_db()
+        self.assertEqual(self.products[0].stock, 16)
+
+    def test_item_count_is_recomputed_from_lines(self):
+        user = User.objects.create_user('a@x.com', 'a@x.com', 'pw12345!')
+        cart = Cart.objects.create(user=user)
+        # Línea que otra petición insertó a la vez sin que este lote la viera
+        CartItem.objects.create(cart=cart, product=self.products[1], quantity=3)
+        apply_operations(user, parse_operations([{'product_id': self.products[0].pk, 'delta': 2}]))
+        cart.refresh_from_db()
+        self.assertEqual(cart.item_count, 5)
+
+    def test_session_cart_is_merged_on_login(self):
+        User.objects.create_user('a@x.com', 'a@x.com', 'pw12345!')
+        add = lambda product: self.client.post(
+            '/api/cart/add/', json.dumps({'product_id': product.pk}), content_type='application/json',
+        )
+        add(self.products[0])
+        add(self.products[0])
+        add(self.products[1])
+        self.assertEqual(self.client.get('/api/cart/summary/').json()['item_count'], 3)
+        response = self.client.post('/login/', {'form_type': 'login', 'email': 'a@x.com', 'password': 'pw12345!'})
+        self.assertEqual(response.status_code, 302)
+        cart = self.client.get('/api/cart/get/').json()
+        self.assertEqual(cart['item_count'], 3)
+        self.assertEqual(
+            {item['product_id']: item['quantity'] for item in cart['items']},
+            {self.products[0].pk: 2, self.products[1].pk: 1},
+        )
+
+
+    def test_async_endpoints_match_sync_for_anonymous_users(self):
+        for prefix in ('/api/cart/', '/api/async/cart/'):
+            with self.subTest(prefix=prefix):
+                self.client.cookies.clear()
+                response = self.client.post(
+                    prefix + 'add/', json.dumps({'product_id': self.products[0].pk}), content_type='application/json',
+                )
+                self.assertEqual((response.status_code, response.json()['item_count']), (200, 1))
+                self.assertEqual(self.client.get(prefix + 'summary/').json()['item_count'], 1)
+                cart = self.client.get(prefix + 'get/').json()
+                self.assertEqual([item['product_id'] for item in cart['items']], [self.products[0].pk])
+                self.assertEqual(self.client.post(prefix + 'checkout/').status_code, 401)
+
+
+class OrderHistoryApiTests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('cliente', 'cliente@example.com', 'secreta123')
+        Order.objects.bulk_create([Order(user=self.user, total_price=10 * i) for i in range(1, 6)])
+        self.client.force_login(self.user)
+
+    def test_pages_cover_every_order(self):
+        seen, params = [], {'limit': 2}
+        while True:
+            page = self.client.get('/api/orders/', params).json()
+            seen += [order['id'] for order in page['orders']]
+            if not page['next_cursor']:
+                break
+            params['cursor'] = page['next_cursor']
+        self.assertEqual(sorted(seen), sorted(Order.objects.values_list('id', flat=True)))
+
+    def test_tampered_cursor_is_rejected(self):
+        for values in (['abc', 1], ['2024-01-01T00:00:00+00:00', 'x'], [1, 2], [None, 1], [[], {}]):
+            with self.subTest(values=values):
+                response = self.client.get('/api/orders/', {'cursor': encode_cursor(values)})
+                self.assertEqual(response.status_code, 400)
+
+
+class RelatedProductsTests(StoreTestCase):
+    def test_detail_etag_changes_with_related_products(self):
+        from tyzox.recommendations import build_neighbours, record_co_purchases
+        product, other, third = self.products[:3]
+        url = f'/product/{product.slug}/'
+        response = self.client.get(url)
+        etag = response['ETag']
+        third_etag = self.client.get(f'/product/{third.slug}/')['ETag']
+        self.assertEqual(response.context['related_products'], [])
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # Una compra conjunta cambia los relacionados sin tocar el catálogo
+        with self.captureOnCommitCallbacks(execute=True):
+            record_co_purchases([product.pk, other.pk])
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['id'] for row in response.context['related_products']], [other.pk])
+        etag = response['ETag']
+        # Las fichas de otros productos siguen validando
+        self.assertEqual(self.client.get(f'/product/{third.slug}/', HTTP_IF_NONE_MATCH=third_etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            build_neighbours(min_support=1)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        self.assertNotEqual(self.client.get(f'/product/{third.slug}/')['ETag'], third_etag)
@@ -0,0 +1,43 @@
+# tyzox/tests/test_benchmark.py
+
+import io
+import json
+import os
+import tempfile
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+
+ENDPOINTS = {
+    'index', 'catalog_api', 'search_api', 'product_detail', 'cart_add', 'cart_get', 'cart_summary',
+    'checkout', 'dashboard', 'reports',
+}
+
+
+class BenchmarkScenarioTests(TestCase):
+    """
+    Los escenarios de manage.py benchmark a tamaño mínimo: cada endpoint
+    responde sin errores y sus consultas no crecen con el catálogo.
+    """
+    def setUp(self):
+        cache.clear()
+
+    def test_endpoints_respond_with_constant_queries(self):
+        fd, path = tempfile.mkstemp(suffix='.json')
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+        call_command(
+            'benchmark', '--sizes', '30', '120', '--repeat', '2', '--warmup', '1', '--save', path,
+            stdout=io.StringIO(),
+        )
+        with open(path, encoding='utf-8') as f:
+            results = json.load(f)
+
+        small, large = results['30'], results['120']
+        self.assertEqual(set(small), ENDPOINTS)
+        for name in sorted(ENDPOINTS):
+            with self.subTest(endpoint=name):
+                self.assertEqual(small[name]['errors'], 0)
+                self.assertEqual(large[name]['errors'], 0)
+                self.assertEqual(small[name]['queries'], large[name]['queries'])
@@ -0,0 +1,62 @@
+# tyzox/tests/test_catalog_io.py
+
+import io
+import json
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.test import TestCase
+from django.utils import timezone
+
+from tyzox.catalog_io import import_categories, import_products, read_rows
+from tyzox.inventory import reclaim_expired, reserve
+from tyzox.models import Cart, Category, Product, StockReservation
+
+
+class ImportProductsTests(TestCase):
+    def _import(self, rows, importer=import_products):
+        errors = []
+        stats = importer(rows, batch_size=4, on_error=lambda line, error: errors.append(line))
+        return stats, errors
+
+    def test_bad_rows_are_reported_not_fatal(self):
+        lines = [
+            {'name': 'Guantes', 'category': 'Boxeo', 'price': '49.90', 'stock': '3'},
+            {'name': 'NaN', 'category': 'Boxeo', 'price': 'NaN'},
+            {'name': 'Infinito', 'category': 'Boxeo', 'price': 'Infinity'},
+            {'name': 'Caro', 'category': 'Boxeo', 'price': '100000000'},
+            {'name': 'Muchos', 'category': 'Boxeo', 'price': '1', 'stock': 2 ** 40},
+            {'name': 'Negativo', 'category': 'Boxeo', 'price': '-1'},
+            ['no', 'es', 'un', 'objeto'],
+            {'name': 'Sin categoría', 'price': '1'},
+            {'name': 'Vendas', 'category': 'Boxeo', 'price': '99999999.99', 'is_available': 'no'},
+        ]
+        stream = io.StringIO('\n'.join(json.dumps(line) for line in lines) + '\n{roto\n')
+        stats, errors = self._import(read_rows(stream, 'jsonl'))
+        self.assertEqual(stats, {'created': 2, 'updated': 0, 'errors': 8})
+        self.assertEqual(errors, [2, 3, 4, 5, 6, 7, 8, 10])
+        vendas = Product.objects.get(slug='vendas')
+        self.assertEqual((str(vendas.price), vendas.is_available), ('99999999.99', False))
+        self.assertEqual(Category.objects.get().name, 'Boxeo')
+
+    def test_upsert_by_slug(self):
+        self._import([{'name': 'Guantes', 'category': 'Boxeo', 'price': '10'}])
+        stats, _ = self._import([{'slug': 'guantes', 'name': 'Guantes Pro', 'category': 'boxeo', 'price': '12'}])
+        self.assertEqual((stats['created'], stats['updated']), (0, 1))
+        self.assertEqual(Product.objects.get().name, 'Guantes Pro')
+
+    def test_update_keeps_stock_and_reservations(self):
+        self._import([{'name': 'Guantes', 'category': 'Boxeo', 'price': '10', 'stock': '5'}])
+        cart = Cart.objects.create(user=User.objects.create_user('cliente'))
+        with transaction.atomic():
+            reserve(cart, {Product.objects.get().pk: 2}, {})
+        StockReservation.objects.update(expires_at=timezone.now())
+        self._import([{'name': 'Guantes', 'category': 'Boxeo', 'price': '10', 'stock': '5'}])
+        self.assertEqual(Product.objects.get().stock, 3)
+        # Al caducar, la reserva devuelve sus unidades sin inflar el inventario
+        reclaim_expired()
+        self.assertEqual(Product.objects.get().stock, 5)
+
+    def test_categories(self):
+        stats, errors = self._import([{'name': 'Boxeo'}, 'x', {'slug': ''}], importer=import_categories)
+        self.assertEqual((stats['created'], stats['errors'], errors), (1, 2, [2, 3]))
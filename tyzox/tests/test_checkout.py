@@ -0,0 +1,41 @@
+# tyzox/tests/test_checkout.py
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from tyzox.cart import add_product
+from tyzox.checkout import place_order
+from tyzox.models import Category, Order, Product
+
+
+class CheckoutQueryCountTests(TestCase):
+    """
+    El checkout es un pipeline por conjuntos: el número de consultas no
+    depende de cuántas líneas tenga el carrito.
+    """
+    def setUp(self):
+        category = Category.objects.create(name='Guantes', slug='guantes')
+        self.products = Product.objects.bulk_create([
+            Product(category=category, name=f'Producto {i}', slug=f'producto-{i}', price=10 + i, stock=50)
+            for i in range(100)
+        ])
+
+    def _cart(self, size):
+        user = User.objects.create_user(f'buyer{size}', f'buyer{size}@example.com')
+        for product in self.products[:size]:
+            add_product(user, product, 2)
+        return user
+
+    def test_query_count_is_constant_in_cart_size(self):
+        user = self._cart(1)
+        with CaptureQueriesContext(connection) as baseline:
+            place_order(user)
+        for size in (10, 100):
+            user = self._cart(size)
+            with self.subTest(size=size), self.assertNumQueries(len(baseline)):
+                order = place_order(user)
+            self.assertEqual(order.items.count(), size)
+        self.assertEqual(Product.objects.get(pk=self.products[0].pk).stock, 44)
+        self.assertEqual(Order.objects.count(), 3)
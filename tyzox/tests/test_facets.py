@@ -0,0 +1,43 @@
+# tyzox/tests/test_facets.py
+
+from decimal import Decimal
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from tyzox.models import Category, CategoryFacet, Product
+
+
+class ProductFacetSignalTests(TestCase):
+    def setUp(self):
+        self.boxeo = Category.objects.create(name='Boxeo', slug='boxeo')
+        self.mma = Category.objects.create(name='MMA', slug='mma')
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.create(category=self.boxeo, name='Guantes', slug='guantes', price=Decimal('40'))
+
+    def _facet(self, category):
+        facet = CategoryFacet.objects.get(category=category)
+        return facet.product_count, facet.min_price
+
+    def test_moving_product_refreshes_both_categories(self):
+        product = Product.objects.get(slug='guantes')
+        product.category = self.mma
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+        self.assertEqual(self._facet(self.boxeo), (0, None))
+        self.assertEqual(self._facet(self.mma), (1, Decimal('40')))
+
+        # Un segundo cambio sobre la misma instancia parte de la categoría ya guardada
+        product.category = self.boxeo
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+        self.assertEqual(self._facet(self.boxeo), (1, Decimal('40')))
+        self.assertEqual(self._facet(self.mma), (0, None))
+
+    def test_save_does_not_read_previous_category(self):
+        product = Product.objects.get(slug='guantes')
+        product.price = Decimal('45')
+        with CaptureQueriesContext(connection) as queries:
+            product.save()
+        self.assertFalse([q['sql'] for q in queries if q['sql'].startswith('SELECT')])
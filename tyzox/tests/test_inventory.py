@@ -0,0 +1,205 @@
+# tyzox/tests/test_inventory.py
+
+import threading
+import time
+from collections import Counter
+from unittest import skipUnless
+
+from django.contrib.auth.models import User
+from django.db import OperationalError, connection, transaction
+from django.db.models import Sum
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from tyzox.cart import add_product
+from tyzox.checkout import CheckoutError, place_order
+from tyzox.forms import ProductForm
+from tyzox.inventory import StockError, adjust_stock, reclaim_expired, set_stock_shards
+from tyzox.models import Category, OrderItem, Product, StockReservation, StockShard
+
+
+def stock_counts(product):
+    product.refresh_from_db()
+    if product.stock_shards:
+        available = StockShard.objects.filter(product=product).aggregate(n=Sum('stock'))['n'] or 0
+    else:
+        available = product.stock
+    return {
+        'sold': OrderItem.objects.filter(product=product).aggregate(n=Sum('quantity'))['n'] or 0,
+        'reserved': StockReservation.objects.filter(product=product).aggregate(n=Sum('quantity'))['n'] or 0,
+        'available': available,
+    }
+
+
+class ReservationConcurrencyTests(TransactionTestCase):
+    """
+    Varios hilos (cada uno con su conexión) reservan y compran el mismo
+    producto hasta agotarlo; la mitad abandona el carrito. Ninguna unidad se
+    vende dos veces ni se pierde: vendidas + reservadas + disponibles es
+    siempre el stock inicial.
+    """
+    INITIAL_STOCK = 30
+    WORKERS = 8
+    # SQLite serializa las escrituras y a veces responde "database is locked";
+    # cuentan como intentos fallidos, no como errores del inventario
+    MAX_ATTEMPTS = 60
+
+    def setUp(self):
+        category = Category.objects.create(name='Stock', slug='stock')
+        self.product = Product.objects.create(
+            category=category, name='Muy demandado', slug='muy-demandado', price=10, stock=self.INITIAL_STOCK,
+        )
+        self.users = [User.objects.create_user(f'buyer{i}', f'buyer{i}@example.com') for i in range(self.WORKERS)]
+
+    def _shop(self):
+        outcomes = Counter()
+        lock = threading.Lock()
+
+        def attempt(call):
+            try:
+                call()
+                result = 'ok'
+            except (StockError, CheckoutError) as e:
+                result = 'busy' if e.status == 503 else 'sold_out'
+            except OperationalError:
+                if connection.vendor != 'sqlite':
+                    raise
+                result = 'db_error'
+            with lock:
+                outcomes[result] += 1
+            return result
+
+        def shopper(index):
+            user = self.users[index]
+            try:
+                for _ in range(self.MAX_ATTEMPTS):
+                    if attempt(lambda: add_product(user, self.product)) == 'sold_out':
+                        return
+                    if index % 2 == 0:
+                        attempt(lambda: place_order(user))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=shopper, args=(i,)) for i in range(self.WORKERS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return outcomes
+
+    def _assert_no_oversell(self, shards=0):
+        if shards:
+            set_stock_shards(self.product.pk, shards)
+            self.product.refresh_from_db()
+        outcomes = self._shop()
+        self.assertTrue(outcomes['sold_out'], outcomes)
+
+        counts = stock_counts(self.product)
+        self.assertGreater(counts['sold'], 0)
+        self.assertGreaterEqual(counts['available'], 0)
+        self.assertEqual(counts['sold'] + counts['reserved'] + counts['available'], self.INITIAL_STOCK, counts)
+
+        # Con el stock agotado nadie más puede reservar
+        if not counts['available']:
+            late = User.objects.create_user('late', 'late@example.com')
+            with self.assertRaises(StockError) as raised:
+                add_product(late, self.product)
+            self.assertEqual(raised.exception.status, 409)
+
+        # Los carritos abandonados caducan y sus unidades vuelven al stock
+        StockReservation.objects.update(expires_at=timezone.now())
+        reclaim_expired()
+        after = stock_counts(self.product)
+        self.assertEqual(after['reserved'], 0)
+        self.assertEqual(after['sold'], counts['sold'])
+        self.assertEqual(after['sold'] + after['available'], self.INITIAL_STOCK, after)
+
+    def test_no_oversell(self):
+        self._assert_no_oversell()
+
+    def test_no_oversell_sharded(self):
+        self._assert_no_oversell(shards=4)
+
+    def test_checkout_after_reclaim_cannot_oversell(self):
+        # La reserva caduca, otro comprador se lleva las unidades y el
+        # checkout del primero ya no encuentra stock
+        Product.objects.filter(pk=self.product.pk).update(stock=2)
+        first, second = self.users[:2]
+        add_product(first, self.product, 2)
+        StockReservation.objects.update(expires_at=timezone.now())
+        self.assertEqual(reclaim_expired(), 1)
+        add_product(second, self.product, 2)
+        with self.assertRaises(CheckoutError) as raised:
+            place_order(first)
+        self.assertEqual(raised.exception.status, 409)
+        place_order(second)
+        counts = stock_counts(self.product)
+        self.assertEqual((counts['sold'], counts['reserved'], counts['available']), (2, 0, 0))
+
+    @skipUnless(connection.vendor == 'postgresql', 'lock_timeout solo existe en PostgreSQL')
+    @override_settings(STOCK_LOCK_TIMEOUT_MS=200)
+    def test_lock_wait_is_bounded(self):
+        locked, done = threading.Event(), threading.Event()
+
+        def hold_lock():
+            try:
+                with transaction.atomic():
+                    Product.objects.select_for_update().get(pk=self.product.pk)
+                    locked.set()
+                    done.wait(10)
+            finally:
+                connection.close()
+
+        holder = threading.Thread(target=hold_lock)
+        holder.start()
+        try:
+            locked.wait(10)
+            start = time.perf_counter()
+            with self.assertRaises(StockError) as raised:
+                add_product(self.users[0], self.product)
+            waited = time.perf_counter() - start
+        finally:
+            done.set()
+            holder.join()
+        self.assertEqual(raised.exception.status, 503)
+        self.assertLess(waited, 2)
+        # La reserva fallida no dejó nada a medias
+        self.assertEqual(stock_counts(self.product), {'sold': 0, 'reserved': 0, 'available': self.INITIAL_STOCK})
+
+
+class AdjustStockTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Stock', slug='stock')
+        self.product = Product.objects.create(category=category, name='Guantes', slug='guantes', price=10, stock=10)
+        self.user = User.objects.create_user('buyer', 'buyer@example.com')
+
+    def test_form_save_keeps_concurrent_reservations(self):
+        # El formulario se abre con stock 10, alguien reserva 3 y se guarda
+        form_data = {
+            'category': self.product.category_id, 'name': 'Guantes pro', 'description': 'x',
+            'price': '12.00', 'is_available': 'on', 'stock_delta': '5',
+        }
+        loaded = Product.objects.get(pk=self.product.pk)
+        add_product(self.user, self.product, 3)
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'pw12345!')
+        self.client.force_login(admin)
+        response = self.client.post(f'/dashboard/product/edit/{loaded.pk}/', form_data)
+        self.assertEqual(response.status_code, 302)
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.name, self.product.stock), ('Guantes pro', 12))
+        self.assertNotIn('stock', ProductForm.base_fields)
+
+    def test_cannot_remove_more_than_available(self):
+        add_product(self.user, self.product, 8)
+        with self.assertRaises(StockError):
+            adjust_stock(self.product.pk, -3)
+        adjust_stock(self.product.pk, -2)
+        self.assertEqual(stock_counts(self.product)['available'], 0)
+
+    def test_sharded(self):
+        set_stock_shards(self.product.pk, 3)
+        adjust_stock(self.product.pk, 5)
+        adjust_stock(self.product.pk, -12)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 3)
+        self.assertEqual(stock_counts(self.product)['available'], 3)
@@ -0,0 +1,75 @@
+# tyzox/tests/test_jobs.py
+
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from tyzox import jobs
+from tyzox.cart import add_product
+from tyzox.checkout import place_order
+from tyzox.models import Category, CoPurchase, Job, Product, ProductSalesDaily
+from tyzox.reports import rebuild_sales_rollups
+
+
+def drain():
+    while batch := jobs.claim():
+        for job in batch:
+            jobs.run(job)
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Guantes', slug='guantes')
+        self.products = [
+            Product.objects.create(category=category, name=f'P{i}', slug=f'p{i}', price=10, stock=10) for i in range(2)
+        ]
+        self.user = User.objects.create_user('a@x.com', 'a@x.com')
+
+    def _order(self):
+        for product in self.products:
+            add_product(self.user, product)
+        return place_order(self.user)
+
+    def test_redelivered_jobs_do_not_count_twice(self):
+        self._order()
+        drain()
+        # Un worker lento: requeue_stale devuelve sus tareas a la cola y se
+        # ejecutan otra vez
+        Job.objects.update(status=Job.RUNNING, started_at=timezone.now() - timedelta(days=1))
+        self.assertEqual(jobs.requeue_stale(), 2)
+        drain()
+        self.assertEqual(Job.objects.filter(status=Job.DONE).count(), 2)
+        self.assertEqual(list(ProductSalesDaily.objects.values_list('units', flat=True)), [1, 1])
+        self.assertEqual(list(CoPurchase.objects.values_list('weight', flat=True)), [1, 1])
+
+    def test_rebuild_marks_pending_orders(self):
+        self._order()
+        rebuild_sales_rollups()
+        drain()
+        self.assertEqual(list(ProductSalesDaily.objects.values_list('units', flat=True)), [1, 1])
+
+    @override_settings(JOB_MAX_ATTEMPTS=2)
+    def test_failed_job_is_retried_then_marked_failed(self):
+        calls = []
+
+        @jobs.job('test_flaky')
+        def flaky():
+            calls.append(1)
+            raise RuntimeError('boom')
+        self.addCleanup(jobs.handlers.pop, 'test_flaky')
+
+        job = jobs.enqueue('test_flaky')
+        with self.assertLogs('tyzox.jobs', 'WARNING'):
+            drain()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertIn('boom', job.last_error)
+
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        with self.assertLogs('tyzox.jobs', 'ERROR'):
+            drain()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, len(calls)), (Job.FAILED, 2, 2))
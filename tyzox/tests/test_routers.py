@@ -0,0 +1,77 @@
+# tyzox/tests/test_routers.py
+
+from unittest import skipUnless
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import router
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase
+
+from tyzox.cache import bump_catalog_version
+from tyzox.catalog import cached_catalog_page
+from tyzox.models import Category, Product
+from tyzox.routers import STICKY_COOKIE, ReplicaStickinessMiddleware, replica_reads
+
+
+@skipUnless(
+    'replica1' in settings.DATABASES,
+    'Necesita una réplica: --settings=tyzox_project.settings_replica_test',
+)
+class ReplicaRoutingTests(TestCase):
+    """
+    Primario y réplica son dos bases distintas y la réplica nunca recibe
+    los datos (como una réplica con retraso infinito): lo que se lee de ella
+    no incluye el producto creado en el test.
+    """
+    # Sin réplica configurada la clase se salta, pero el runner igualmente
+    # prepararía las bases que declara
+    databases = {'default'} | ({'replica1'} & settings.DATABASES.keys())
+
+    def setUp(self):
+        category = Category.objects.create(name='Guantes', slug='guantes')
+        self.product = Product.objects.create(category=category, name='Nuevo', slug='nuevo', price=10, stock=5)
+        bump_catalog_version()
+
+    def _route(self, **cookies):
+        # Dónde lee una vista de solo lectura tras pasar por el middleware
+        seen = {}
+
+        def view(request):
+            with replica_reads():
+                seen['db'] = router.db_for_read(Product)
+                seen['visible'] = Product.objects.filter(pk=self.product.pk).exists()
+            return HttpResponse()
+
+        request = RequestFactory().get('/')
+        request.COOKIES.update(cookies)
+        ReplicaStickinessMiddleware(view)(request)
+        return seen
+
+    def test_reads_go_to_replica(self):
+        self.assertEqual(self._route(), {'db': 'replica1', 'visible': False})
+        self.assertEqual(router.db_for_read(Product), 'default')
+        self.assertEqual(router.db_for_write(Product), 'default')
+        with replica_reads():
+            # Usuarios y sesiones siempre del primario
+            self.assertEqual(router.db_for_read(User), 'default')
+
+    def test_sticky_cookie_pins_to_primary(self):
+        self.assertEqual(self._route(**{STICKY_COOKIE: '1'}), {'db': 'default', 'visible': True})
+
+    def test_writes_set_sticky_cookie(self):
+        response = self.client.post(
+            '/api/cart/add/', {'product_id': self.product.pk, 'quantity': 1}, content_type='application/json',
+        )
+        self.assertLess(response.status_code, 400)
+        self.assertIn(STICKY_COOKIE, response.cookies)
+        self.assertNotIn(STICKY_COOKIE, self.client.get('/api/products/').cookies)
+
+    def test_cache_is_filled_from_primary(self):
+        # Sin cookie: la petición lee de la réplica, pero lo que entra en la
+        # caché (y verá también quien escribió) sale del primario
+        with replica_reads():
+            page = cached_catalog_page()
+        self.assertEqual([row['id'] for row in page['products']], [self.product.pk])
+        response = self.client.get('/api/products/')
+        self.assertEqual([row['id'] for row in response.json()['products']], [self.product.pk])
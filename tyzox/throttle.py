@@ -0,0 +1,50 @@
+# tyzox/throttle.py
+
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+
+THROTTLE_KEY_PREFIX = 'tyzox:login'
+
+
+def _client_ip(request):
+    # REMOTE_ADDR y no X-Forwarded-For: esa cabecera la puede inventar el cliente
+    return request.META.get('REMOTE_ADDR') or 'unknown'
+
+
+def _keys(request, email):
+    email_hash = hashlib.md5(str(email or '').strip().lower().encode('utf-8')).hexdigest()
+    return (
+        (f'{THROTTLE_KEY_PREFIX}:ip:{_client_ip(request)}', settings.LOGIN_THROTTLE_IP_ATTEMPTS),
+        (f'{THROTTLE_KEY_PREFIX}:email:{email_hash}', settings.LOGIN_THROTTLE_EMAIL_ATTEMPTS),
+    )
+
+
+def _hit(key):
+    # Ventana fija: la clave nace con el contador a 0 y caduca con la ventana
+    cache.add(key, 0, timeout=settings.LOGIN_THROTTLE_WINDOW)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Caducó entre add e incr: este intento abre una ventana nueva
+        cache.set(key, 1, timeout=settings.LOGIN_THROTTLE_WINDOW)
+        return 1
+
+
+def login_throttled(request, email):
+    """
+    Cuenta el intento de login por IP y por email y devuelve True si alguno
+    supera su límite en la ventana. Se llama antes de autenticar, así que un
+    intento rechazado no llega a calcular el hash de la contraseña.
+    """
+    throttled = False
+    for key, limit in _keys(request, email):
+        if _hit(key) > limit:
+            throttled = True
+    return throttled
+
+
+def reset_login_throttle(request, email):
+    # Tras un login correcto el email parte de cero; la IP conserva su cuenta
+    cache.delete(_keys(request, email)[1][0])
@@ -10,11 +10,26 @@ urlpatterns = [
     path('logout/', views.logout_view, name='logout'),
     path('product/<slug:product_slug>/', views.product_detail_view, name='product_detail'),
 
+    # API del catálogo (paginada por cursor)
+    path('api/products/', views.catalog_api, name='api_catalog'),
+    path('api/search/', views.search_api, name='api_search'),
+
     # --- NUEVAS RUTAS PARA LA API DEL CARRITO ---
     path('api/cart/add/', views.add_to_cart_api, name='api_add_to_cart'),
+    path('api/cart/update/', views.update_cart_api, name='api_update_cart'),
     path('api/cart/get/', views.get_cart_api, name='api_get_cart'),
+    path('api/cart/summary/', views.cart_summary_api, name='api_cart_summary'),
     path('api/cart/checkout/', views.checkout_api, name='api_checkout'),
 
+    # Historial de pedidos del cliente (paginado por cursor)
+    path('api/orders/', views.order_history_api, name='api_order_history'),
+
+    # Misma API en versión asíncrona (para despliegues ASGI)
+    path('api/async/cart/add/', views.add_to_cart_async_api, name='api_async_add_to_cart'),
+    path('api/async/cart/get/', views.get_cart_async_api, name='api_async_get_cart'),
+    path('api/async/cart/summary/', views.cart_summary_async_api, name='api_async_cart_summary'),
+    path('api/async/cart/checkout/', views.checkout_async_api, name='api_async_checkout'),
+
     # URLs del Dashboard de Administración
     path('dashboard/', views.dashboard_view, name='dashboard'),
     path('dashboard/product/add/', views.product_add_view, name='product_add'),
@@ -22,6 +37,10 @@ urlpatterns = [
     path('dashboard/product/delete/<int:product_id>/', views.product_delete_view, name='product_delete'),
     path('dashboard/reports/', views.reports_view, name='reports'),
     path('dashboard/reports/export/', views.export_sales_csv, name='export_sales_csv'),
+    path('dashboard/reports/export/orders/', views.export_orders_csv, name='export_orders_csv'),
+    path('dashboard/reports/export/order-items/', views.export_order_items_csv, name='export_order_items_csv'),
+    path('dashboard/cache/stats/', views.cache_stats_api, name='cache_stats'),
+    path('dashboard/metrics/', views.metrics_view, name='metrics'),
 
     
 ]
\ No newline at end of file
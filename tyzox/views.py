@@ -1,53 +1,155 @@
 # tyzox/views.py
 
+from datetime import datetime, timezone as dt_timezone
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.models import User
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponse
 from django.db import transaction
-from django.db.models import Sum
-from .models import Product, Category, Order, OrderItem, Cart, CartItem
+from django.http import JsonResponse, HttpResponse, Http404
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+from .models import Product, Category
 from .forms import ProductForm
-from itertools import combinations
-import csv
+from .catalog import (
+    CATALOG_SORTS, cached_catalog_page, cached_product_detail, catalog_etag, catalog_last_modified, parse_price,
+)
+from .facets import category_facets
+from .cache import cache_stats
+from .checkout import CheckoutError, place_order
+from .cart import (
+    CartError, acart_item_count, acart_snapshot, add_product, apply_operations, cart_item_count, cart_snapshot,
+    merge_session_cart, parse_operations, session_add_product, session_apply_operations, session_cart_snapshot,
+    session_item_count,
+)
+from .dashboard import dashboard_page
+from .inventory import StockError, adjust_stock
+from .jobs import job_stats
+from .storage import release_version
+from .reports import category_sales_report, parse_date_range, product_sales_report
+from .idempotency import IN_PROGRESS, begin, finish, idempotency_cache_key
+from .exports import CHUNK_SIZE, ORDER_HEADER, ORDER_ITEM_HEADER, csv_response, order_item_rows, order_rows
+from .metrics import request_metrics
+from .orders import ORDER_HISTORY_PAGE_SIZE, order_history_page
+from .pagination import PaginationError, parse_limit
+from .routers import read_from_replica
+from .search import AUTOCOMPLETE_LIMIT, MAX_SEARCH_PAGE, SEARCH_PAGE_SIZE, cached_search
+from .throttle import login_throttled, reset_login_throttle
 import json
 
 # tyzox/views.py
 
+def _has_messages(request):
+    return bool(len(messages.get_messages(request)))
+
+
+def _page_etag(request, *parts):
+    # Las páginas HTML cambian también con el usuario (cabecera), con el
+    # despliegue (plantillas y nombres con hash de los estáticos) y con los
+    # mensajes pendientes: con mensajes no hay validadores y se renderiza.
+    if _has_messages(request):
+        return None
+    return catalog_etag(*parts, release_version(), request.user.pk or 'anon')
+
+
+def _index_last_modified(request):
+    return None if _has_messages(request) else catalog_last_modified()
+
+
+def _product_detail(request, product_slug):
+    # Sale de la ficha cacheada (en un acierto no hay consultas) y se guarda
+    # en la petición para que validadores y vista no vuelvan a leer la caché
+    if not hasattr(request, 'product_detail'):
+        request.product_detail = cached_product_detail(product_slug)
+    return request.product_detail
+
+
+def _product_etag(request, product_slug):
+    context = _product_detail(request, product_slug)
+    if context is None:
+        return None
+    return _page_etag(request, 'detail', product_slug, context['related_version'])
+
+
+def _product_last_modified(request, product_slug):
+    # La ficha cambia con el producto y con sus relacionados (related_version
+    # es la marca de tiempo de su último cambio)
+    context = _product_detail(request, product_slug)
+    if context is None or _has_messages(request):
+        return None
+    related_changed = datetime.fromtimestamp(context['related_version'] / 1000, tz=dt_timezone.utc)
+    return max(context['product']['updated_at'], related_changed)
+
+
+# Respuestas condicionales: si el ETag o la fecha coinciden se devuelve un 304
+# sin renderizar la plantilla ni leer productos. no-cache obliga al navegador
+# a revalidar en cada visita, lo que con un 304 apenas cuesta.
+@read_from_replica
+@cache_control(no_cache=True)
+@condition(etag_func=lambda request: _page_etag(request, 'index'), last_modified_func=_index_last_modified)
 def index(request):
-    products_queryset = Product.objects.filter(is_available=True).select_related('category')
-    
-    print("--- DEBUG: Verificando slugs de productos ---") # Mensaje para orientarnos
-    
-    products_list = []
-    for product in products_queryset:
-        # --- AÑADE ESTA LÍNEA DE DEBUG ---
-        print(f"Producto: '{product.name}', Slug: '{product.slug}'")
-        
-        products_list.append({
-            'id': product.id,
-            'name': product.name,
-            'price': str(product.price),
-            'image_url': product.image_url,
-            'category_slug': product.category.slug,
-            'detail_url': product.get_absolute_url()
-        })
+    # Los productos ya no se incrustan en la página: script.js los pide
+    # por páginas a catalog_api según la categoría seleccionada. Las
+    # tarjetas de categoría salen de las facetas precalculadas (cacheadas).
+    return render(request, 'tyzox/Index.html', {'category_facets': category_facets()})
 
-    print("--- FIN DEBUG ---")
-    
-    context = { 'products': products_list }
-    return render(request, 'tyzox/index.html', context)
 
+@read_from_replica
+@cache_control(no_cache=True)
+@condition(
+    etag_func=lambda request: catalog_etag('api', request.GET.urlencode()),
+    last_modified_func=lambda request: catalog_last_modified(),
+)
+def catalog_api(request):
+    sort = request.GET.get('sort') or 'name'
+    if sort not in CATALOG_SORTS:
+        return JsonResponse({'status': 'error', 'message': f"Orden no válido (usa {', '.join(CATALOG_SORTS)})."}, status=400)
+    try:
+        limit = parse_limit(request.GET.get('limit'))
+        page = cached_catalog_page(
+            category_slug=request.GET.get('category') or None,
+            cursor=request.GET.get('cursor') or None,
+            limit=limit,
+            min_price=parse_price(request.GET.get('min_price')),
+            max_price=parse_price(request.GET.get('max_price')),
+            sort=sort,
+        )
+    except ValueError as e:
+        # PaginationError es un ValueError: cursor (sus valores se convierten
+        # al tipo del campo del orden), limit o precio inválidos
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+    return JsonResponse({'status': 'success', **page})
 
+
+@read_from_replica
+def search_api(request):
+    query = request.GET.get('q', '').strip()
+    # mode=prefix: autocompletado mientras se escribe (pocas sugerencias)
+    prefix = request.GET.get('mode') == 'prefix'
+    try:
+        page = int(request.GET.get('page') or 1)
+        limit = parse_limit(request.GET.get('limit'), default=AUTOCOMPLETE_LIMIT if prefix else SEARCH_PAGE_SIZE)
+    except (ValueError, PaginationError):
+        return JsonResponse({'status': 'error', 'message': 'Parámetros de búsqueda inválidos.'}, status=400)
+    page = max(1, min(page, MAX_SEARCH_PAGE))
+    return JsonResponse({'status': 'success', 'query': query, **cached_search(query, page, limit, prefix)})
+
+
+@read_from_replica
+@cache_control(no_cache=True)
+@condition(
+    etag_func=_product_etag,
+    last_modified_func=_product_last_modified,
+)
 def product_detail_view(request, product_slug):
-    product = get_object_or_404(Product, slug=product_slug, is_available=True)
-    related_products = product.related_products.filter(is_available=True).exclude(id=product.id)[:4]
-    context = {
-        'product': product,
-        'related_products': related_products,
-    }
+    # El producto y sus relacionados se sirven ya serializados desde la caché
+    context = _product_detail(request, product_slug)
+    if context is None:
+        raise Http404('Producto no encontrado.')
     return render(request, 'tyzox/product_detail.html', context)
 
 # ... (El resto de tus vistas: login, logout, dashboard, etc., van aquí sin cambios) ...
@@ -71,14 +173,18 @@ def login_register_view(request):
         elif form_type == 'login':
             email = request.POST.get('email')
             password = request.POST.get('password')
-            try:
-                username = User.objects.get(email=email).username
-            except User.DoesNotExist:
-                messages.error(request, 'El email o la contraseña son incorrectos.')
-                return redirect('login_register')
-            user = authenticate(request, username=username, password=password)
+            # El límite se comprueba antes de autenticar: una ráfaga rechazada no calcula hashes
+            if login_throttled(request, email):
+                messages.error(request, 'Demasiados intentos de inicio de sesión. Espera unos minutos e inténtalo de nuevo.')
+                response = render(request, 'tyzox/login.html', status=429)
+                response['Retry-After'] = str(settings.LOGIN_THROTTLE_WINDOW)
+                return response
+            user = authenticate(request, email=email, password=password)
             if user is not None:
+                reset_login_throttle(request, email)
                 login(request, user)
+                # Lo añadido sin sesión iniciada pasa a su carrito
+                merge_session_cart(request.session, user)
                 return redirect('index')
             else:
                 messages.error(request, 'El email o la contraseña son incorrectos.')
@@ -92,17 +198,40 @@ def logout_view(request):
 @login_required
 def dashboard_view(request):
     if not request.user.is_superuser: return redirect('index')
-    products = Product.objects.all().order_by('name')
-    context = { 'products': products }
+    page_obj, sort, filters = dashboard_page(request.GET)
+    context = {
+        'page_obj': page_obj,
+        'products': page_obj.object_list,
+        'categories': Category.objects.only('id', 'name'),
+        'sort': sort,
+        'filters': filters,
+        'low_stock_threshold': settings.LOW_STOCK_THRESHOLD,
+    }
     return render(request, 'tyzox/dashboard.html', context)
 
+def _save_product(form, update_fields=None):
+    """
+    Guarda el formulario sin tocar el stock: al editar solo se escriben los
+    campos del formulario y el ajuste de inventario va como suma relativa.
+    Devuelve False (con el error en el formulario) si no hay stock que restar.
+    """
+    try:
+        with transaction.atomic():
+            product = form.save(commit=False)
+            product.save(update_fields=update_fields)
+            if form.cleaned_data.get('stock_delta'):
+                adjust_stock(product.pk, form.cleaned_data['stock_delta'])
+    except StockError as e:
+        form.add_error('stock_delta', str(e))
+        return False
+    return True
+
 @login_required
 def product_add_view(request):
     if not request.user.is_superuser: return redirect('index')
     if request.method == 'POST':
-        form = ProductForm(request.POST)
-        if form.is_valid():
-            form.save()
+        form = ProductForm(request.POST, request.FILES)
+        if form.is_valid() and _save_product(form):
             messages.success(request, f"El producto '{form.cleaned_data['name']}' ha sido creado exitosamente.")
             return redirect('dashboard')
     else:
@@ -115,9 +244,8 @@ def product_edit_view(request, product_id):
     if not request.user.is_superuser: return redirect('index')
     product = get_object_or_404(Product, id=product_id)
     if request.method == 'POST':
-        form = ProductForm(request.POST, instance=product)
-        if form.is_valid():
-            form.save()
+        form = ProductForm(request.POST, request.FILES, instance=product)
+        if form.is_valid() and _save_product(form, update_fields=[*ProductForm.Meta.fields, 'updated_at']):
             messages.success(request, f"El producto '{product.name}' ha sido actualizado.")
             return redirect('dashboard')
     else:
@@ -136,29 +264,80 @@ def product_delete_view(request, product_id):
     return JsonResponse({'status': 'error', 'message': 'Petición no válida.'}, status=400)
 
 @login_required
+def cache_stats_api(request):
+    if not request.user.is_superuser: return JsonResponse({'status': 'error', 'message': 'No tienes permiso.'}, status=403)
+    return JsonResponse({'status': 'success', **cache_stats()})
+
+@login_required
+def metrics_view(request):
+    # Formato de texto de Prometheus: métricas de peticiones y de la caché del catálogo
+    if not request.user.is_superuser: return HttpResponse('No tienes permiso.', status=403)
+    stats = cache_stats()
+    jobs = job_stats().values()
+    body = request_metrics.render(extra=[
+        ('tyzox_catalog_cache_hits_total', 'counter', 'Aciertos de la caché del catálogo.', stats['hits']),
+        ('tyzox_catalog_cache_misses_total', 'counter', 'Fallos de la caché del catálogo.', stats['misses']),
+        ('tyzox_catalog_cache_hit_ratio', 'gauge', 'Proporción de aciertos de la caché del catálogo.', stats['hit_ratio']),
+        # Cola de tareas (compartida por todos los procesos: se lee de la base de datos)
+        ('tyzox_jobs_due', 'gauge', 'Tareas en cola listas para ejecutarse.', sum(row['due'] for row in jobs)),
+        ('tyzox_jobs_failed', 'gauge', 'Tareas fallidas definitivamente.', sum(row['failed'] for row in jobs)),
+        ('tyzox_jobs_oldest_due_age_seconds', 'gauge', 'Espera de la tarea pendiente más antigua.',
+         max((row['oldest_due_age'] for row in jobs), default=0)),
+    ])
+    return HttpResponse(body, content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@login_required
+@read_from_replica
 def reports_view(request):
     if not request.user.is_superuser: return redirect('index')
-    sales_report = OrderItem.objects.values('product__name', 'product__category__name').annotate(total_sold=Sum('quantity'), total_revenue=Sum('price')).order_by('-total_sold')
-    context = { 'sales_report': sales_report }
+    try:
+        start, end = parse_date_range(request.GET)
+    except ValueError as e:
+        messages.error(request, str(e))
+        start = end = None
+    context = {
+        'sales_report': product_sales_report(start, end),
+        'category_report': category_sales_report(start, end),
+        'start': start,
+        'end': end,
+    }
     return render(request, 'tyzox/reports.html', context)
 
 @login_required
 def export_sales_csv(request):
     if not request.user.is_superuser: return redirect('index')
-    response = HttpResponse(content_type='text/csv', headers={'Content-Disposition': 'attachment; filename="reporte_ventas.csv"'})
-    response.write(u'\ufeff'.encode('utf8'))
-    writer = csv.writer(response)
-    writer.writerow(['Producto', 'Categoría', 'Unidades Vendidas', 'Ingresos Totales'])
-    sales_report = OrderItem.objects.values('product__name', 'product__category__name').annotate(total_sold=Sum('quantity'), total_revenue=Sum('price')).order_by('-total_sold')
-    for item in sales_report:
-        writer.writerow([item['product__name'], item['product__category__name'], item['total_sold'], item['total_revenue']])
-    return response
+    try:
+        start, end = parse_date_range(request.GET)
+    except ValueError as e:
+        return HttpResponse(str(e), status=400)
+    rows = (
+        (item['product__name'], item['product__category__name'], item['total_sold'], item['total_revenue'])
+        for item in product_sales_report(start, end).iterator(chunk_size=CHUNK_SIZE)
+    )
+    return csv_response('reporte_ventas.csv', ['Producto', 'Categoría', 'Unidades Vendidas', 'Ingresos Totales'], rows)
+
+@login_required
+def export_orders_csv(request):
+    if not request.user.is_superuser: return redirect('index')
+    try:
+        start, end = parse_date_range(request.GET)
+    except ValueError as e:
+        return HttpResponse(str(e), status=400)
+    return csv_response('ordenes.csv', ORDER_HEADER, order_rows(start, end))
+
+@login_required
+def export_order_items_csv(request):
+    if not request.user.is_superuser: return redirect('index')
+    try:
+        start, end = parse_date_range(request.GET)
+    except ValueError as e:
+        return HttpResponse(str(e), status=400)
+    return csv_response('items_ordenes.csv', ORDER_ITEM_HEADER, order_item_rows(start, end))
 
 # ============================================
 # --- VISTAS DE LA API PARA EL CARRITO DE COMPRAS ---
 # ============================================
 
-@login_required
 def add_to_cart_api(request):
     # Solo aceptamos peticiones POST
     if request.method == 'POST':
@@ -170,26 +349,24 @@ def add_to_cart_api(request):
             # Verificamos que el producto exista y esté disponible
             product = get_object_or_404(Product, id=product_id, is_available=True)
             
-            # Obtenemos el carrito del usuario actual
-            cart, created = Cart.objects.get_or_create(user=request.user)
-            
-            # Buscamos si el producto ya está en el carrito para solo aumentar la cantidad
-            cart_item, created = CartItem.objects.get_or_create(
-                cart=cart,
-                product=product
-            )
-            
-            if not created:
-                # Si el item ya existía, incrementamos la cantidad
-                cart_item.quantity += 1
-            
-            cart_item.save()
-            
+            # Añadimos una unidad: en la base de datos si hay sesión iniciada
+            # (carrito, línea, contador y reserva de stock en una transacción) o
+            # en la sesión si no
+            if request.user.is_authenticated:
+                try:
+                    add_product(request.user, product)
+                except StockError as e:
+                    return JsonResponse({'status': 'error', 'message': str(e)}, status=e.status)
+                item_count = cart_item_count(request.user)
+            else:
+                session_add_product(request.session, product)
+                item_count = session_item_count(request.session)
+
             # Devolvemos una respuesta de éxito con el nuevo total de items
             return JsonResponse({
                 'status': 'success',
                 'message': f"'{product.name}' añadido al carrito.",
-                'item_count': cart.item_count
+                'item_count': item_count
             })
 
         except Exception as e:
@@ -199,78 +376,167 @@ def add_to_cart_api(request):
     return JsonResponse({'status': 'error', 'message': 'Petición no válida'}, status=400)
 
 
-@login_required
+def _update_cart(request):
+    try:
+        operations = parse_operations(json.loads(request.body).get('operations'))
+        if request.user.is_authenticated:
+            apply_operations(request.user, operations)
+            snapshot = cart_snapshot(request.user)
+        else:
+            session_apply_operations(request.session, operations)
+            snapshot = session_cart_snapshot(request.session)
+    except (ValueError, AttributeError):
+        return 400, {'status': 'error', 'message': 'JSON inválido.'}
+    except (CartError, StockError) as e:
+        return e.status, {'status': 'error', 'message': str(e)}
+    return 200, {'status': 'success', 'message': 'Carrito actualizado.', **snapshot}
+
+
+def update_cart_api(request):
+    # Varias operaciones {product_id, delta | set_quantity} en una transacción.
+    # Con la cabecera Idempotency-Key un reintento devuelve la respuesta
+    # original en vez de aplicar otra vez los cambios.
+    if request.method != 'POST':
+        return JsonResponse({'status': 'error', 'message': 'Petición no válida'}, status=400)
+    cache_key = idempotency_cache_key(request, 'cart')
+    if cache_key:
+        previous = begin(cache_key)
+        if previous == IN_PROGRESS:
+            response = JsonResponse({'status': 'error', 'message': 'Esta petición ya se está procesando.'}, status=409)
+            response['Retry-After'] = '1'
+            return response
+        if previous:
+            status, body = previous
+            response = JsonResponse(body, status=status)
+            response['Idempotent-Replayed'] = 'true'
+            return response
+    try:
+        status, body = _update_cart(request)
+    except Exception:
+        # Un error inesperado no debe dejar la clave bloqueada como "en curso"
+        if cache_key:
+            finish(cache_key, 500, None)
+        raise
+    if cache_key:
+        finish(cache_key, status, body)
+    return JsonResponse(body, status=status)
+
+
 def get_cart_api(request):
-    cart, created = Cart.objects.get_or_create(user=request.user)
-    
-    # Preparamos los datos del carrito para enviarlos como JSON
-    items_list = []
-    for item in cart.items.all():
-        items_list.append({
-            'name': item.product.name,
-            'quantity': item.quantity,
-            'price': str(item.product.price),
-            'subtotal': str(item.subtotal),
-            'image_url': item.product.image_url
-        })
-        
-    return JsonResponse({
-        'status': 'success',
-        'items': items_list,
-        'total': str(cart.total),
-        'item_count': cart.item_count
-    })
+    # Líneas, subtotales y totales en una sola consulta
+    if not request.user.is_authenticated:
+        return JsonResponse({'status': 'success', **session_cart_snapshot(request.session)})
+    return JsonResponse({'status': 'success', **cart_snapshot(request.user)})
+
+
+def cart_summary_api(request):
+    # Endpoint ligero para el contador del header: no carga las líneas
+    if not request.user.is_authenticated:
+        return JsonResponse({'status': 'success', 'item_count': session_item_count(request.session)})
+    return JsonResponse({'status': 'success', 'item_count': cart_item_count(request.user)})
+
+@read_from_replica
+def order_history_api(request):
+    # Tras una compra la cookie de ReplicaStickinessMiddleware lleva la
+    # lectura al primario, así que el pedido nuevo ya aparece
+    if not request.user.is_authenticated:
+        return JsonResponse({'status': 'error', 'message': 'Inicia sesión para ver tus pedidos.'}, status=401)
+    try:
+        limit = parse_limit(request.GET.get('limit'), default=ORDER_HISTORY_PAGE_SIZE)
+        page = order_history_page(request.user, request.GET.get('cursor') or None, limit)
+    except PaginationError as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+    return JsonResponse({'status': 'success', **page})
+
 
 # ============================================
 # --- VISTA DE API PARA FINALIZAR LA COMPRA ---
 # ============================================
-@login_required
-@transaction.atomic
 def checkout_api(request):
+    # Un visitante anónimo conserva su carrito en la sesión hasta iniciar sesión
+    if not request.user.is_authenticated:
+        return JsonResponse({'status': 'error', 'message': 'Inicia sesión para finalizar la compra.'}, status=401)
     if request.method == 'POST':
         try:
-            cart = Cart.objects.get(user=request.user)
-            cart_items = cart.items.all()
-            products_in_order = [item.product for item in cart_items] # Obtenemos los productos ANTES de borrar los items
-
-            if not cart_items.exists():
-                return JsonResponse({'status': 'error', 'message': 'Tu carrito está vacío.'}, status=400)
-
-            # 1. Crear la Orden principal
-            new_order = Order.objects.create(
-                user=request.user,
-                total_price=cart.total
-            )
-
-            # 2. Mover cada item del carrito a un item de la orden
-            for item in cart_items:
-                OrderItem.objects.create(
-                    order=new_order,
-                    product=item.product,
-                    quantity=item.quantity,
-                    price=item.product.price * item.quantity # Guardamos el precio total del item
-                )
-
-            # 3. Vaciar el carrito de compras
-            cart_items.delete()
-
-            # --- ¡LÓGICA DEL GRAFO MOVIDA AQUÍ! ---
-            # 4. Ahora que la orden está completa, actualizamos el grafo.
-            if len(products_in_order) >= 2:
-                product_pairs = combinations(products_in_order, 2)
-                for p1, p2 in product_pairs:
-                    p1.related_products.add(p2)
-            # --- FIN DE LA LÓGICA DEL GRAFO ---
-            
-            return JsonResponse({
-                'status': 'success',
-                'message': f'¡Compra completada! Tu número de orden es #{new_order.id}.',
-                'order_id': new_order.id
-            })
-
-        except Cart.DoesNotExist:
-             return JsonResponse({'status': 'error', 'message': 'No se encontró tu carrito.'}, status=404)
+            new_order = place_order(request.user)
+        except CheckoutError as e:
+            return JsonResponse({'status': 'error', 'message': str(e)}, status=e.status)
         except Exception as e:
             return JsonResponse({'status': 'error', 'message': f'Ocurrió un error inesperado: {str(e)}'}, status=500)
 
-    return JsonResponse({'status': 'error', 'message': 'Petición no válida'}, status=400)
\ No newline at end of file
+        return JsonResponse({
+            'status': 'success',
+            'message': f'¡Compra completada! Tu número de orden es #{new_order.id}.',
+            'order_id': new_order.id
+        })
+
+    return JsonResponse({'status': 'error', 'message': 'Petición no válida'}, status=400)
+
+
+# ============================================
+# --- VERSIONES ASÍNCRONAS DE LA API DEL CARRITO ---
+# ============================================
+# Pensadas para servirse con ASGI (tyzox_project/asgi.py): mientras esperan a
+# la base de datos no ocupan un hilo del servidor. Lo que necesita una
+# transacción (el ORM asíncrono aún no las soporta) se ejecuta con
+# sync_to_async reutilizando el mismo código que las vistas síncronas.
+
+async def add_to_cart_async_api(request):
+    if request.method != 'POST':
+        return JsonResponse({'status': 'error', 'message': 'Petición no válida'}, status=400)
+    try:
+        product_id = json.loads(request.body).get('product_id')
+        user = await request.auser()
+        product = await Product.objects.filter(id=product_id, is_available=True).only('id', 'name', 'stock_shards').afirst()
+        if product is None:
+            return JsonResponse({'status': 'error', 'message': 'Producto no encontrado.'}, status=404)
+        # Como en add_to_cart_api: sin sesión iniciada el carrito vive en la sesión
+        if user.is_authenticated:
+            try:
+                await sync_to_async(add_product)(user, product)
+            except StockError as e:
+                return JsonResponse({'status': 'error', 'message': str(e)}, status=e.status)
+            item_count = await acart_item_count(user)
+        else:
+            await sync_to_async(session_add_product)(request.session, product)
+            item_count = await sync_to_async(session_item_count)(request.session)
+        return JsonResponse({
+            'status': 'success',
+            'message': f"'{product.name}' añadido al carrito.",
+            'item_count': item_count,
+        })
+    except Exception as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+
+
+async def get_cart_async_api(request):
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({'status': 'success', **await sync_to_async(session_cart_snapshot)(request.session)})
+    return JsonResponse({'status': 'success', **await acart_snapshot(user)})
+
+
+async def cart_summary_async_api(request):
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({'status': 'success', 'item_count': await sync_to_async(session_item_count)(request.session)})
+    return JsonResponse({'status': 'success', 'item_count': await acart_item_count(user)})
+
+
+async def checkout_async_api(request):
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({'status': 'error', 'message': 'Inicia sesión para finalizar la compra.'}, status=401)
+    if request.method != 'POST':
+        return JsonResponse({'status': 'error', 'message': 'Petición no válida'}, status=400)
+    try:
+        new_order = await sync_to_async(place_order)(user)
+    except CheckoutError as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=e.status)
+    except Exception as e:
+        return JsonResponse({'status': 'error', 'message': f'Ocurrió un error inesperado: {str(e)}'}, status=500)
+    return JsonResponse({
+        'status': 'success',
+        'message': f'¡Compra completada! Tu número de orden es #{new_order.id}.',
+        'order_id': new_order.id
+    })
@@ -51,12 +51,18 @@ INSTALLED_APPS = [
 # Capas de procesamiento que manejan las peticiones y respuestas.
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Estáticos de STATIC_ROOT precomprimidos y con caché de larga duración
+    'tyzox.middleware.PrecompressedStaticMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Tras una escritura, las lecturas de ese navegador van al primario
+    'tyzox.routers.ReplicaStickinessMiddleware',
+    # Tiempos y consultas SQL por vista, publicados en /dashboard/metrics/
+    'tyzox.middleware.PerformanceMiddleware',
 ]
 
 
@@ -84,9 +90,78 @@ DATABASES = {
         'PASSWORD': '1234',   # ¡RECUERDA CAMBIAR ESTO EN PRODUCCIÓN!
         'HOST': 'localhost',
         'PORT': '5432',
+        # Conexiones persistentes: cada worker reutiliza su conexión durante
+        # CONN_MAX_AGE segundos en vez de abrir una por petición, y comprueba
+        # que sigue viva antes de reutilizarla
+        'CONN_MAX_AGE': int(os.environ.get('DATABASE_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Pool de conexiones de psycopg 3 (requiere psycopg[pool]) en lugar de
+# conexiones persistentes: DATABASE_POOL_SIZE=10. Django no admite ambos a la vez.
+if os.environ.get('DATABASE_POOL_SIZE'):
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default']['OPTIONS'] = {
+        'pool': {'min_size': 2, 'max_size': int(os.environ['DATABASE_POOL_SIZE']), 'timeout': 10},
+    }
+
+# Réplicas de solo lectura para catálogo, fichas de producto e informes
+# (tyzox.routers.ReplicaRouter): DATABASE_REPLICA_HOSTS=10.0.0.2,10.0.0.3
+REPLICA_DATABASES = []
+for i, host in enumerate(filter(None, os.environ.get('DATABASE_REPLICA_HOSTS', '').split(','))):
+    alias = f'replica{i + 1}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': host.strip(),
+        # En los tests la réplica es la propia base de datos de pruebas
+        'TEST': {'MIRROR': 'default'},
+    }
+    REPLICA_DATABASES.append(alias)
+
+DATABASE_ROUTERS = ['tyzox.routers.ReplicaRouter']
+
+# Segundos que un navegador lee del primario tras escribir (el retraso de
+# replicación que toleramos)
+REPLICA_STICKY_SECONDS = 5
+
+
+# ==============================================================================
+# CONFIGURACIÓN DE CACHÉ
+# ==============================================================================
+
+# LocMemCache es por proceso: sirve para desarrollo y pruebas. En producción,
+# con varios workers, usa un backend compartido (Redis o Memcached) para que
+# la versión del catálogo y su invalidación sean comunes a todos.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'tyzox',
+    }
+}
+
+# Segundos que vive una página de catálogo o ficha de producto en caché
+# (los cambios de productos la invalidan antes mediante señales).
+CATALOG_CACHE_TIMEOUT = 60 * 15
+
+# El total de productos del dashboard se cachea poco tiempo: el stock cambia
+# con cada compra sin invalidar el catálogo.
+DASHBOARD_COUNT_CACHE_TIMEOUT = 60
+
+# Un producto con este stock o menos aparece en el filtro "Stock bajo".
+LOW_STOCK_THRESHOLD = 5
+
+# Minutos que un producto añadido al carrito queda reservado. Cada cambio en
+# el carrito renueva el plazo de todas sus reservas.
+STOCK_RESERVATION_MINUTES = 15
+# Espera máxima (ms) por el bloqueo de la fila de stock de un producto muy
+# demandado antes de responder 503 (solo PostgreSQL; 0 = sin límite)
+STOCK_LOCK_TIMEOUT_MS = 2000
+
+# Una petición que ejecuta la misma consulta este número de veces o más se
+# cuenta (y se registra en el log 'tyzox.performance') como posible N+1.
+N_PLUS_ONE_THRESHOLD = 5
+
 
 # ==============================================================================
 # CONFIGURACIÓN DE PLANTILLAS (TEMPLATES)
@@ -145,6 +220,26 @@ STATICFILES_DIRS = [
     BASE_DIR / "tyzox/static",
 ]
 
+# Destino de `manage.py collectstatic`, que en producción debe ejecutarse en
+# cada despliegue: minifica el CSS/JS propios, añade un hash del contenido al
+# nombre de cada archivo y guarda copias .gz y .br. Las plantillas enlazan
+# con {% static %} los nombres con hash (con DEBUG = True, los originales).
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'tyzox.storage.MinifiedManifestStaticFilesStorage'},
+}
+
+# Identificador del despliegue (p. ej. el commit). Junto con la huella del
+# manifest de estáticos entra en el ETag de las páginas HTML: tras desplegar
+# plantillas o estáticos nuevos nadie recibe un 304 con el HTML anterior.
+RELEASE_ID = os.environ.get('RELEASE_ID', '')
+
+# Solo se minifican los estáticos propios; los de terceros (admin) ya vienen
+# preparados y se copian tal cual.
+STATIC_MINIFY_PREFIXES = ['tyzox/']
+
 
 # ==============================================================================
 # CONFIGURACIÓN DE AUTENTICACIÓN
@@ -154,6 +249,26 @@ STATICFILES_DIRS = [
 # Django lo redirigirá a la URL con el nombre 'login_register'.
 LOGIN_URL = 'login_register'
 
+# El login es por email (tyzox.backends.EmailBackend); ModelBackend se
+# mantiene para el admin, que usa el nombre de usuario.
+AUTHENTICATION_BACKENDS = [
+    'tyzox.backends.EmailBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
+# Límite de intentos de login por ventana (en segundos), contados en la
+# caché por IP y por email. Con varios workers la caché debe ser compartida
+# para que el límite sea global.
+LOGIN_THROTTLE_WINDOW = 60 * 5
+LOGIN_THROTTLE_EMAIL_ATTEMPTS = 5
+LOGIN_THROTTLE_IP_ATTEMPTS = 20
+
+# Segundos que se recuerda la respuesta de una petición con Idempotency-Key
+# (reintentos del cliente tras un corte de red)
+IDEMPOTENCY_TTL = 60 * 60
+# Operaciones como máximo en una petición de /api/cart/update/
+CART_MAX_OPERATIONS = 100
+
 
 # ==============================================================================
 # CONFIGURACIÓN POR DEFECTO DE CLAVE PRIMARIA
@@ -162,4 +277,18 @@ LOGIN_URL = 'login_register'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 MEDIA_URL = '/media/'
-MEDIA_ROOT = BASE_DIR / 'media'
\ No newline at end of file
+MEDIA_ROOT = BASE_DIR / 'media'
+
+# Anchos (px) de las miniaturas que se generan para cada imagen de producto
+# subida, en JPEG y WebP, y hilos que las generan en segundo plano.
+PRODUCT_IMAGE_WIDTHS = (320, 640, 1280)
+PRODUCT_IMAGE_WORKERS = 2
+
+# Cola de tareas en segundo plano (tyzox.jobs, manage.py run_jobs)
+JOB_MAX_ATTEMPTS = 5
+# Reintentos con espera exponencial: 10 s, 20 s, 40 s... hasta JOB_MAX_BACKOFF
+JOB_BACKOFF_SECONDS = 10
+JOB_MAX_BACKOFF = 3600
+# Una tarea "en ejecución" más tiempo que esto se da por perdida (worker caído)
+JOB_TIMEOUT_SECONDS = 600
+JOB_RETENTION_HOURS = 24
\ No newline at end of file
@@ -0,0 +1,13 @@
+# tyzox_project/settings_replica_test.py
+# Primario y réplica como dos bases SQLite separadas, para los tests de
+# tyzox.routers:
+#
+#   python manage.py test tyzox.tests.test_routers --settings=tyzox_project.settings_replica_test
+
+from .settings import *
+
+DATABASES = {
+    'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': BASE_DIR / 'primary.sqlite3'},
+    'replica1': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': BASE_DIR / 'replica1.sqlite3'},
+}
+REPLICA_DATABASES = ['replica1']